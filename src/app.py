@@ -1,48 +1,40 @@
-import streamlit as st
-import numpy as np
-import spacy
-import nltk
 from pathlib import Path
-import os
+import contextlib
 import sys
-import random
 
 # Add the src directory to Python path
 current_dir = Path(__file__).parent
 sys.path.append(str(current_dir))
 
-# Import utility modules
-from utils.text_processing import preprocess_text
-from utils.response_evaluator import evaluate_response
-from utils.question_generator import generate_question
-from utils.chat_agents import create_interview_agents, get_rule_based_chat_response
-from utils.references import get_domain_references, get_topic_references, format_reference_for_display, get_improvement_suggestions
+# Thread budgets must be in place before numpy/torch start their thread pools
+from utils.resource_config import configure_resources, format_resource_report
+configure_resources()
 
-# Initialize NLP components
-@st.cache_resource
-def load_nlp_models():
-    # Download necessary NLTK data
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt')
-    try:
-        nltk.data.find('taggers/averaged_perceptron_tagger')
-    except LookupError:
-        nltk.download('averaged_perceptron_tagger')
-    try:
-        nltk.data.find('corpora/wordnet')
-    except LookupError:
-        nltk.download('wordnet')
+import streamlit as st
+import numpy as np
 
-    # Load spaCy model
-    try:
-        nlp = spacy.load('en_core_web_sm')
-    except OSError:
-        spacy.cli.download('en_core_web_sm')
-        nlp = spacy.load('en_core_web_sm')
-    
-    return nlp
+# Import utility modules
+from utils.references import (get_topic_references, format_reference_for_display,
+                              get_improvement_suggestions)
+from utils.content_packs import get_content_registry, get_content_snapshot
+from utils.session_store import MessageRecord, SessionStore
+from utils.interview_session import (MAX_CHAT_TURNS, InterviewSession, SessionStateError,
+                                     get_session_manager)
+from utils.persistence import get_database
+from utils.prefetch import SUGGESTED_QUESTIONS
+from utils.live_coverage import LiveCoverage
+from utils.profiling import get_profiler
+from utils.analytics import get_analytics
+from utils.near_duplicate import get_near_duplicate_index
+from utils.nlp_resources import NLPResourceError, get_nlp_resources
+from utils.model_manager import get_model_manager
+from utils.scheduler import get_scheduler_stats
+
+def check_nlp_resources():
+    # Resolve NLTK data and the spaCy model from the local bundle (no downloads);
+    # raises NLPResourceError naming anything that is missing. The models themselves
+    # are loaded on first use by the model manager, which may evict them when idle
+    return get_nlp_resources()
 
 # Define domains
 DOMAINS = {
@@ -53,48 +45,80 @@ DOMAINS = {
 
 def initialize_session_state():
     """Initialize session state variables"""
-    if 'messages' not in st.session_state:
-        st.session_state.messages = []
-    if 'current_question' not in st.session_state:
-        st.session_state.current_question = None
-    if 'question_history' not in st.session_state:
-        st.session_state.question_history = []
-    if 'scores' not in st.session_state:
-        st.session_state.scores = []
-    if 'agents' not in st.session_state:
-        st.session_state.agents = None
-    if 'interview_started' not in st.session_state:
-        st.session_state.interview_started = False
-    if 'current_question_messages' not in st.session_state:
-        st.session_state.current_question_messages = 0
-    if 'evaluation_done' not in st.session_state:
-        st.session_state.evaluation_done = False
-    if 'chat_mode' not in st.session_state:
-        st.session_state.chat_mode = False
-    if 'models' not in st.session_state:
-        st.session_state.models = None
-    if 'chat_count' not in st.session_state:
-        st.session_state.chat_count = 0
-    if 'current_topic' not in st.session_state:
-        st.session_state.current_topic = None
+    if 'history_pages' not in st.session_state:
+        st.session_state.history_pages = 1
 
-def display_chat_message(role: str, content: str, score: float = None):
-    """Display a chat message with appropriate styling"""
-    if role == "assistant":
-        st.markdown(f"🤖 **Interviewer:** {content}")
-    elif role == "user":
-        st.markdown(f"👤 **You:** {content}")
-    elif role == "system":
+@contextlib.contextmanager
+def current_session():
+    """
+    The interview session of this browser tab, pinned in the process-wide manager
+    for the rerun; this tab only keeps the id. A session evicted while idle is
+    restored transparently, and `?session=` in the URL resumes a persisted one.
+    """
+    session_id = st.session_state.get("session_id") or st.query_params.get("session")
+    with get_session_manager().use(session_id) as session:
+        st.session_state.session_id = session.session_id
+        if st.query_params.get("profile") == "1":
+            # Profile every answer of this session (files under $INTERVIEW_PROFILE_DIR)
+            get_profiler().enable_session(session.session_id)
+        yield session
+
+# Number of most recent messages always shown; older ones are collapsed and paged
+RECENT_MESSAGES = 12
+HISTORY_PAGE_SIZE = 20
+
+# Fragments (Streamlit >= 1.33) rerun only their own body on widget interaction
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+ROLE_PREFIXES = {
+    "assistant": "🤖 **Interviewer:** ",
+    "user": "👤 **You:** ",
+    "improvement": "🔍 **Improvement Tips:** ",
+    "references": "📚 **Learning Resources:** ",
+    "chat": "🤖 **Assistant:** "
+}
+
+def render_chat_message(role: str, content: str, score: float = None) -> str:
+    """Render a chat message to its final markdown"""
+    if role == "system":
+        rendered = ""
         if score is not None:
             color = "green" if score >= 7 else "orange" if score >= 5 else "red"
-            st.markdown(f"📊 **Evaluation:** Score: <span style='color:{color}'>{score:.1f}/10</span>", unsafe_allow_html=True)
-        st.markdown(f"💡 **Feedback:** {content}")
-    elif role == "improvement":
-        st.markdown(f"🔍 **Improvement Tips:** {content}")
-    elif role == "references":
-        st.markdown(f"📚 **Learning Resources:** {content}")
-    elif role == "chat":
-        st.markdown(f"🤖 **Assistant:** {content}")
+            rendered = f"📊 **Evaluation:** Score: :{color}[{score:.1f}/10]\n\n"
+        return rendered + f"💡 **Feedback:** {content}"
+    prefix = ROLE_PREFIXES.get(role)
+    return prefix + content if prefix else ""
+
+def rendered_markdown(message: MessageRecord) -> str:
+    """Markdown for a stored message, rendered once and cached on the message"""
+    if message.rendered is None:
+        message.rendered = render_chat_message(message.role, message.content, message.score)
+    return message.rendered
+
+def display_chat_message(role: str, content: str, score: float = None):
+    """Display a chat message with appropriate styling"""
+    rendered = render_chat_message(role, content, score)
+    if rendered:
+        st.markdown(rendered)
+
+def display_transcript(messages: SessionStore):
+    """Show the latest messages; older turns are collapsed and loaded a page at a time"""
+    recent_start = max(0, len(messages) - RECENT_MESSAGES)
+    if recent_start:
+        if st.toggle(f"Show earlier conversation ({recent_start} messages)", key="show_history"):
+            visible_from = max(0, recent_start - st.session_state.history_pages * HISTORY_PAGE_SIZE)
+            if visible_from and st.button(f"Load earlier messages ({visible_from} more)"):
+                st.session_state.history_pages += 1
+                st.rerun()
+            # One markdown element for the whole page instead of one per message
+            page = [rendered_markdown(message) for message in messages[visible_from:recent_start]]
+            st.markdown("\n\n".join(m for m in page if m))
+            st.markdown("---")
+    
+    for message in messages[recent_start:]:
+        rendered = rendered_markdown(message)
+        if rendered:
+            st.markdown(rendered)
 
 def display_references(domain: str, topic: str = None, score: float = None):
     """Display relevant references and learning resources."""
@@ -119,112 +143,70 @@ def display_references(domain: str, topic: str = None, score: float = None):
     if reference_text:
         display_chat_message("references", reference_text)
 
-def extract_topic_from_question(question):
-    """Extract the main topic from a question for better reference matching"""
-    # Simple extraction based on keywords
-    question_lower = question.lower()
-    
-    # Common topics by domain
-    topics = {
-        "Software Development": ["microservices", "design patterns", "architecture", "testing", 
-                              "refactoring", "clean code", "agile", "version control", 
-                              "api", "database", "interface", "debugging", "solid", "object-oriented",
-                              "framework", "library", "dependency", "exception", "distributed system"],
-        "Data Science": ["machine learning", "algorithm", "data", "features", "model", 
-                      "classification", "regression", "clustering", "neural", "statistics",
-                      "visualization", "prediction", "training", "supervised", "unsupervised",
-                      "overfitting", "normalization", "exploratory", "missing data", "bias-variance",
-                      "deep learning", "random forest", "sentiment analysis"],
-        "Marketing": ["campaign", "audience", "segmentation", "brand", "digital", 
-                   "content", "strategy", "social media", "analytics", "conversion",
-                   "inbound", "outbound", "marketing funnel", "swot", "roi", 
-                   "a/b testing", "retention", "competitive analysis", "b2b", "b2c",
-                   "omnichannel"]
-    }
-    
-    # Search for multi-word topics first (more specific)
-    found_topics = []
-    for domain, domain_topics in topics.items():
-        for topic in domain_topics:
-            if " " in topic:  # Multi-word topic
-                if topic in question_lower:
-                    found_topics.append(topic)
-    
-    # If no multi-word topics found, try single words
-    if not found_topics:
-        for domain, domain_topics in topics.items():
-            for topic in domain_topics:
-                if " " not in topic and topic in question_lower:
-                    found_topics.append(topic)
-    
-    # If still no topics found, extract key nouns based on common patterns in questions
-    if not found_topics:
-        # Extract topic after "concept of", "principles of", etc.
-        patterns = ["concept of ", "purpose of ", "principles of ", "difference between ", "explain ", "describe "]
-        for pattern in patterns:
-            if pattern in question_lower:
-                # Get the words following the pattern
-                after_pattern = question_lower.split(pattern)[1].split()
-                # Take first 2-3 words as potential topic
-                potential_topic = " ".join(after_pattern[:3])
-                found_topics.append(potential_topic)
-                break
-    
-    # If all else fails, use longest words in the question as they're often domain-specific terms
-    if not found_topics:
-        words = question_lower.split()
-        # Filter out short words and get the longest ones
-        long_words = [word for word in words if len(word) > 5]
-        if long_words:
-            # Sort by length (descending) and take the top 2
-            long_words.sort(key=len, reverse=True)
-            found_topics = long_words[:2]
-    
-    return " ".join(found_topics) if found_topics else None
+def ask_follow_up(session: InterviewSession, question: str):
+    """Send a follow-up question to the chat, or show why it can't be asked"""
+    try:
+        session.ask(question)
+    except SessionStateError as e:
+        st.error(str(e))
+        return
+    st.rerun()
 
-def format_references_as_text(domain, topic=None, score=None):
-    """Format references as text to be included directly in feedback"""
-    # Get references
-    refs = get_topic_references(domain, topic)
-    
-    # Get improvement suggestions
-    suggestions = get_improvement_suggestions(domain, topic, score)
-    
-    # Format the text
-    result = ""
-    
-    # Add improvement suggestions
-    if suggestions:
-        result += "\n\n🔍 **Improvement Tips:**\n" + "\n".join(suggestions)
-    
-    # Add references
-    result += "\n\n📚 **Learning Resources:**"
-    
-    # Check if there are any references to display
-    has_references = False
-    
-    for category, items in refs.items():
-        if items:  # Only show categories with items
-            has_references = True
-            result += f"\n**{category.replace('_', ' ').title()}**:\n"
-            for item in items[:2]:  # Limit to 2 items per category
-                result += format_reference_for_display(item) + "\n"
-    
-    # If no specific references found, include some general domain references
-    if not has_references:
-        # Add default references based on domain
-        result += "\n**Recommended Resources**:\n"
-        if domain == "Software Development":
-            result += "- [Clean Code by Robert C. Martin](https://www.amazon.com/Clean-Code-Handbook-Software-Craftsmanship/dp/0132350882)\n"
-            result += "- [Design Patterns: Elements of Reusable Object-Oriented Software](https://www.amazon.com/Design-Patterns-Elements-Reusable-Object-Oriented/dp/0201633612)\n"
-        elif domain == "Data Science":
-            result += "- [Python for Data Analysis by Wes McKinney](https://www.amazon.com/Python-Data-Analysis-Wrangling-IPython/dp/1491957662)\n"
-            result += "- [Hands-On Machine Learning with Scikit-Learn, Keras, and TensorFlow](https://www.amazon.com/Hands-Machine-Learning-Scikit-Learn-TensorFlow/dp/1492032646)\n"
-        elif domain == "Marketing":
-            result += "- [Marketing Management by Philip Kotler](https://www.amazon.com/Marketing-Management-15th-Philip-Kotler/dp/0133856461)\n"
-            result += "- [Digital Marketing Strategy by Simon Kingsnorth](https://www.amazon.com/Digital-Marketing-Strategy-Integrated-Approach/dp/0749484225)\n"
-    
-    return result
+def display_live_coverage(session: InterviewSession, text: str):
+    """Key concepts and length of the answer so far; only the edited part is re-examined"""
+    tracker = st.session_state.get("live_coverage")
+    if tracker is None or tracker.domain != session.domain:
+        tracker = st.session_state.live_coverage = LiveCoverage(session.domain)
+    summary = tracker.update(text).summary()
+    if not summary["word_count"]:
+        return
+    found = summary["found_keywords"]
+    st.progress(summary["relevance_score"],
+                f"Key concepts mentioned: {', '.join(found) if found else 'none yet'}")
+    st.caption(f"{summary['word_count']} words · ~{summary['sentence_count']} sentences · "
+               f"{summary['unique_words']} distinct words")
+
+@fragment
+def display_input_area():
+    """Answer/chat input; runs as a fragment so its widgets don't re-render the transcript"""
+    # Fragment reruns skip main(), so the session is looked up and pinned here too
+    with current_session() as session, st.container():
+        # Show different prompts based on mode
+        if session.chat_mode:
+            prompt = "Ask a question about this topic:"
+            button_text = "Ask"
+            
+            # Add suggested questions to help the user
+            st.write("Suggested questions you could ask:")
+            question_cols = st.columns(2)
+            
+            # Replies to these are prefetched while the candidate reads the feedback
+            for i, question in enumerate(SUGGESTED_QUESTIONS):
+                with question_cols[i % 2]:
+                    if st.button(question, key=f"suggest_{i}"):
+                        ask_follow_up(session, question)
+        else:
+            prompt = "Your Answer:"
+            button_text = "Submit"
+        
+        user_response = st.text_area(prompt, key="user_input", height=100)
+        if not session.chat_mode and session.domain:
+            display_live_coverage(session, user_response)
+        
+        if st.button(button_text, use_container_width=True):
+            if user_response:
+                if session.chat_mode:
+                    # Handle chat mode - follow-up questions
+                    ask_follow_up(session, user_response)
+                else:
+                    # Score the answer; feedback, references and the chat prompt are added to the transcript
+                    session.submit_answer(user_response)
+                    st.rerun()
+        
+        # Show next question button when in chat mode
+        if session.chat_mode and st.button("Next Question", use_container_width=True):
+            session.next_question()
+            st.rerun()
 
 def main():
     st.title("Rule-based Technical Interview Assistant")
@@ -232,20 +214,27 @@ def main():
     # Initialize session state
     initialize_session_state()
     
-    # Load NLP models
-    nlp = load_nlp_models()
-    st.session_state.models = {"nlp": nlp}
+    # Pick up added or edited content packs without restarting the worker
+    get_content_registry().maybe_reload()
     
-    # Create interview agents if not already created
-    if not st.session_state.agents:
-        st.session_state.agents = create_interview_agents()
+    # Check NLP resources (models load on first use)
+    try:
+        check_nlp_resources()
+    except NLPResourceError as e:
+        st.error(str(e))
+        st.stop()
     
+    with current_session() as session:
+        interview_page(session)
+
+def interview_page(session: InterviewSession):
+    """Sidebar, transcript and input area of the tab's session"""
     # Sidebar for domain selection and controls
     st.sidebar.title("Interview Settings")
     
     domain = st.sidebar.selectbox(
         "Select Domain",
-        ["Software Development", "Data Science", "Marketing"]
+        list(DOMAINS.keys()) + [d for d in get_content_snapshot().domains() if d not in DOMAINS]
     )
     
     difficulty = st.sidebar.select_slider(
@@ -253,204 +242,75 @@ def main():
         options=["Beginner", "Intermediate", "Advanced"]
     )
     
+    with st.sidebar.expander("Runtime Resources"):
+        st.text(format_resource_report(configure_resources()))
+        st.caption("Session memory")
+        st.json(session.store.memory_report())
+        st.caption("Sessions in this process")
+        st.json(get_session_manager().get_stats())
+        st.caption("Near-duplicate answers")
+        st.json(get_near_duplicate_index().get_stats())
+        st.caption("Models")
+        st.json(get_model_manager().get_stats(events=5))
+        st.caption("Profiling")
+        st.json(get_profiler().get_stats())
+        st.caption("Scheduler")
+        st.json(get_scheduler_stats())
+    
+    db = get_database()
+    if db is not None:
+        with st.sidebar.expander("Cohort Analytics"):
+            analytics = get_analytics()
+            analytics.refresh(db)
+            cohort = analytics.summary(domain=domain, difficulty=difficulty)
+            if cohort:
+                st.caption(f"{domain} / {difficulty}: {cohort[0]['count']} answers")
+                st.write(f"Mean score {cohort[0]['score_mean']:.1f}, median {cohort[0]['score_p50']:.1f}, "
+                         f"90th percentile {cohort[0]['score_p90']:.1f}")
+                st.caption("Most covered concepts")
+                st.dataframe(analytics.concept_frequencies(domain=domain, difficulty=difficulty, top=8),
+                             hide_index=True)
+            else:
+                st.caption("No stored answers for this domain and difficulty yet")
+
+    if db is not None and not session.interview_started:
+        st.sidebar.text_input("Candidate ID (optional)", key="candidate_id_input")
+    
     # Display interview progress in sidebar if interview started
-    if st.session_state.scores:
+    if session.store.scores:
         st.sidebar.write("### Progress")
-        avg_score = np.mean(st.session_state.scores)
+        avg_score = np.mean(session.store.scores)
         st.sidebar.progress(min(avg_score/10, 1.0), f"Average Score: {avg_score:.1f}/10")
-        st.sidebar.write(f"Questions Answered: {len(st.session_state.scores)}")
-        if st.session_state.chat_mode:
-            st.sidebar.write(f"Chat Exchanges: {st.session_state.chat_count}/8")
+        st.sidebar.write(f"Questions Answered: {len(session.store.scores)}")
+        if session.chat_mode:
+            st.sidebar.write(f"Chat Exchanges: {session.chat_count}/{MAX_CHAT_TURNS}")
     
     # Start interview button
-    if not st.session_state.interview_started and st.sidebar.button("Start Interview"):
-        st.session_state.interview_started = True
-        st.session_state.current_question = generate_question(
-            domain,
-            difficulty,
-            st.session_state.question_history
-        )
-        st.session_state.question_history.append(st.session_state.current_question)
-        st.session_state.current_topic = extract_topic_from_question(st.session_state.current_question)
-        
-        # Add welcome message
-        welcome_msg = (
-            f"Welcome to your {domain} interview! "
-            f"I'll be asking you questions about {domain}. "
-            "Let's begin with your first question:"
-        )
-        st.session_state.messages.append({"role": "assistant", "content": welcome_msg})
-        st.session_state.messages.append({"role": "assistant", "content": st.session_state.current_question})
+    if not session.interview_started and st.sidebar.button("Start Interview"):
+        session.start(domain, difficulty, st.session_state.get("candidate_id_input", "").strip())
+        if db is not None:
+            # Keep the session id in the URL so a reload (or another worker) can resume it
+            st.query_params["session"] = session.session_id
         st.rerun()
     
     # Reset interview button
-    if st.session_state.interview_started and st.sidebar.button("Reset Interview"):
-        st.session_state.messages = []
-        st.session_state.current_question = None
-        st.session_state.question_history = []
-        st.session_state.scores = []
-        st.session_state.interview_started = False
-        st.session_state.evaluation_done = False
-        st.session_state.chat_mode = False
-        st.session_state.chat_count = 0
-        st.session_state.current_topic = None
+    if session.interview_started and st.sidebar.button("Reset Interview"):
+        get_session_manager().reset(session)
+        st.session_state.session_id = session.session_id
+        if "session" in st.query_params:
+            del st.query_params["session"]
+        st.session_state.history_pages = 1
         st.rerun()
     
     # Main chat interface
     chat_container = st.container()
     with chat_container:
-        # Display all messages
-        for message in st.session_state.messages:
-            role = message.get("role", "assistant")
-            content = message.get("content", "")
-            score = message.get("score", None)
-            display_chat_message(role, content, score)
+        display_transcript(session.store)
     
     # Input area at the bottom
     st.markdown("---")
-    if st.session_state.interview_started:
-        # Create a container for input at the bottom
-        with st.container():
-            # Show different prompts based on mode
-            if st.session_state.chat_mode:
-                prompt = "Ask a question about this topic:"
-                button_text = "Ask"
-                
-                # Add suggested questions to help the user
-                st.write("Suggested questions you could ask:")
-                question_cols = st.columns(2)
-                
-                suggested_questions = [
-                    "Can you explain this concept in simpler terms?",
-                    "What are the key best practices?",
-                    "Can you provide a concrete example?",
-                    "What are common challenges or pitfalls?"
-                ]
-                
-                for i, question in enumerate(suggested_questions):
-                    with question_cols[i % 2]:
-                        if st.button(question, key=f"suggest_{i}"):
-                            user_response = question
-                            st.session_state.messages.append({"role": "user", "content": user_response})
-                            
-                            # Get chat response
-                            chat_response = get_rule_based_chat_response(
-                                user_response,
-                                st.session_state.current_question,
-                                domain
-                            )
-                            
-                            # Add response to messages
-                            st.session_state.messages.append({"role": "chat", "content": chat_response})
-                            
-                            # Increment chat count
-                            st.session_state.chat_count += 1
-                            
-                            st.rerun()
-            else:
-                prompt = "Your Answer:"
-                button_text = "Submit"
-            
-            user_response = st.text_area(prompt, key="user_input", height=100)
-            
-            if st.button(button_text, use_container_width=True):
-                if user_response:
-                    if st.session_state.chat_mode:
-                        # Check if we've reached the chat limit
-                        if st.session_state.chat_count >= 8:
-                            st.error("You've reached the maximum number of chat exchanges (8). Submit your final answer or move to the next question.")
-                            st.rerun()
-                        
-                        # Handle chat mode - follow-up questions
-                        st.session_state.messages.append({"role": "user", "content": user_response})
-                        
-                        # Get chat response
-                        chat_response = get_rule_based_chat_response(
-                            user_response,
-                            st.session_state.current_question,
-                            domain
-                        )
-                        
-                        # Add response to messages
-                        st.session_state.messages.append({"role": "chat", "content": chat_response})
-                        
-                        # Increment chat count
-                        st.session_state.chat_count += 1
-                        
-                        # Check if we've reached the maximum chat exchanges
-                        if st.session_state.chat_count >= 8:
-                            st.session_state.messages.append({
-                                "role": "assistant", 
-                                "content": "You've reached the maximum number of chat exchanges. Please submit your final answer or move to the next question."
-                            })
-                        
-                        st.rerun()
-                    else:
-                        # Handle answer submission mode
-                        st.session_state.messages.append({"role": "user", "content": user_response})
-                        
-                        # Evaluate the response
-                        score, feedback = evaluate_response(
-                            st.session_state.current_question,
-                            user_response,
-                            domain,
-                            nlp
-                        )
-                        
-                        # Store results
-                        st.session_state.scores.append(score)
-                        st.session_state.evaluation_done = True
-                        
-                        # Combine feedback with references
-                        references_text = format_references_as_text(domain, st.session_state.current_topic, score)
-                        combined_feedback = feedback + references_text
-                        
-                        # Add evaluation and feedback
-                        st.session_state.messages.append({
-                            "role": "system",
-                            "content": combined_feedback,
-                            "score": score
-                        })
-                        
-                        # Add option to ask questions
-                        st.session_state.chat_mode = True
-                        st.session_state.chat_count = 0
-                        st.session_state.messages.append({
-                            "role": "chat",
-                            "content": "You can now ask up to 8 follow-up questions about this topic to better understand it."
-                        })
-                        
-                        st.rerun()
-            
-            # Show next question button when in chat mode
-            if st.session_state.chat_mode and st.button("Next Question", use_container_width=True):
-                # Reset chat mode and generate new question
-                st.session_state.chat_mode = False
-                st.session_state.chat_count = 0
-                st.session_state.evaluation_done = False
-                
-                # Generate new question
-                st.session_state.current_question = generate_question(
-                    domain,
-                    difficulty,
-                    st.session_state.question_history
-                )
-                st.session_state.question_history.append(st.session_state.current_question)
-                
-                # Extract topic from new question
-                st.session_state.current_topic = extract_topic_from_question(st.session_state.current_question)
-                
-                # Add to messages
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": "Moving on to the next question:"
-                })
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": st.session_state.current_question
-                })
-                
-                st.rerun()
+    if session.interview_started:
+        display_input_area()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
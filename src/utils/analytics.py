@@ -0,0 +1,408 @@
+"""
+Cohort analytics over persisted interview results.
+
+Answers are read incrementally from the database (everything after the last
+answer id seen) into columnar numpy arrays. Alongside the raw columns, additive
+aggregates are kept in dense cubes indexed by (domain, difficulty): counts,
+sums and sums of squares of every score component, a fine-grained score
+histogram, and per-concept hit counts. Any group-by over domain, difficulty or
+concept is a sum over cube axes, so dashboard queries never rescan history and
+new results update the cubes with a handful of vectorized `np.add.at` calls.
+
+With INTERVIEW_ANALYTICS_DIR set, every refresh also appends its rows as a
+compressed `.npz` chunk, so a restarted worker rebuilds its state from the
+chunks and only reads newer answers from the database.
+"""
+
+import glob
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+ANALYTICS_DIR_ENV = "INTERVIEW_ANALYTICS_DIR"
+
+# Score components, in cube order
+COMPONENTS = ("score", "semantic_similarity", "relevance_score", "quality_score")
+# Histogram resolution for total scores on the 0-10 scale
+SCORE_BINS = 200
+MAX_SCORE = 10.0
+GROUP_DIMENSIONS = ("domain", "difficulty")
+
+
+class _Vocabulary:
+    """Stable integer codes for category values"""
+
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for value in values or []:
+            self.code(value)
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.codes[value] = code
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+class _Column:
+    """Append-only numpy column with amortized growth"""
+
+    def __init__(self, dtype, width: int = 0):
+        self.width = width
+        shape = (1024, width) if width else (1024,)
+        self._data = np.zeros(shape, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values: np.ndarray):
+        needed = self.size + len(values)
+        if needed > len(self._data):
+            capacity = max(needed, 2 * len(self._data))
+            grown = np.zeros((capacity,) + self._data.shape[1:], dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:needed] = values
+        self.size = needed
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self.size]
+
+
+class _Batch:
+    """One block of answers in column form, as ingested or stored in a chunk file"""
+
+    __slots__ = ("ids", "sessions", "positions", "domains", "difficulties", "created", "components",
+                 "hit_rows", "hit_concepts")
+
+    def __init__(self, ids, sessions, positions, domains, difficulties, created, components,
+                 hit_rows, hit_concepts):
+        self.ids = ids
+        self.sessions = sessions
+        self.positions = positions
+        self.domains = domains
+        self.difficulties = difficulties
+        self.created = created
+        self.components = components
+        self.hit_rows = hit_rows
+        self.hit_concepts = hit_concepts
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class CohortAnalytics:
+    """Columnar store of scored answers with incrementally maintained group-by aggregates"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self.domains = _Vocabulary()
+        self.difficulties = _Vocabulary(["Beginner", "Intermediate", "Advanced"])
+        self.concepts = _Vocabulary()
+        self.watermark = 0
+        self._lock = threading.RLock()
+
+        # Raw columns
+        self._ids = _Column(np.int64)
+        self._domain = _Column(np.int16)
+        self._difficulty = _Column(np.int8)
+        self._created = _Column(np.float64)
+        self._components = _Column(np.float32, len(COMPONENTS))
+        self._valid = _Column(np.bool_)
+        self._hit_rows = _Column(np.int64)
+        self._hit_concepts = _Column(np.int32)
+        # (session_id, question_position) -> row, so a re-scored answer replaces the old one
+        self._rows_by_key: Dict[Tuple[str, int], int] = {}
+
+        # Additive aggregate cubes, grown as new categories appear
+        self._counts = np.zeros((4, 4), dtype=np.int64)
+        self._component_counts = np.zeros((4, 4, len(COMPONENTS)), dtype=np.int64)
+        self._sums = np.zeros((4, 4, len(COMPONENTS)), dtype=np.float64)
+        self._sumsq = np.zeros((4, 4, len(COMPONENTS)), dtype=np.float64)
+        self._histogram = np.zeros((4, 4, SCORE_BINS), dtype=np.int64)
+        self._concept_hits = np.zeros((4, 4, 16), dtype=np.int64)
+        self._concept_score_sums = np.zeros((4, 4, 16), dtype=np.float64)
+
+        if directory:
+            self._load_chunks()
+
+    # Ingestion
+
+    def refresh(self, db, batch_size: int = 5000) -> int:
+        """Ingest answers stored since the last refresh; returns the number of new rows"""
+        with self._lock:
+            added = 0
+            rows: List[dict] = []
+            for row in db.iter_answers(self.watermark, batch_size):
+                rows.append(row)
+                if len(rows) >= batch_size:
+                    added += self._ingest_rows(rows)
+                    rows = []
+            if rows:
+                added += self._ingest_rows(rows)
+            return added
+
+    def _ingest_rows(self, rows: List[dict]) -> int:
+        n = len(rows)
+        components = np.full((n, len(COMPONENTS)), np.nan, dtype=np.float32)
+        hit_rows, hit_concepts = [], []
+        for i, row in enumerate(rows):
+            for j, name in enumerate(COMPONENTS):
+                if row.get(name) is not None:
+                    components[i, j] = row[name]
+            for concept in json.loads(row.get("found_concepts") or "[]"):
+                hit_rows.append(i)
+                hit_concepts.append(self.concepts.code(concept))
+        batch = _Batch(
+            ids=np.fromiter((r["id"] for r in rows), dtype=np.int64, count=n),
+            sessions=np.array([r["session_id"] for r in rows], dtype=np.str_),
+            positions=np.fromiter((r["question_position"] for r in rows), dtype=np.int32, count=n),
+            domains=np.fromiter((self.domains.code(r["domain"]) for r in rows), dtype=np.int16, count=n),
+            difficulties=np.fromiter((self.difficulties.code(r["difficulty"]) for r in rows), dtype=np.int8, count=n),
+            created=np.fromiter((r["created_at"] for r in rows), dtype=np.float64, count=n),
+            components=components,
+            hit_rows=np.array(hit_rows, dtype=np.int64),
+            hit_concepts=np.array(hit_concepts, dtype=np.int32)
+        )
+        self._append(batch)
+        if self.directory:
+            self._save_chunk(batch)
+        return n
+
+    def _ensure_capacity(self):
+        d, l, c = len(self.domains), len(self.difficulties), len(self.concepts)
+        cur_d, cur_l, cur_c = self._concept_hits.shape
+        if d <= cur_d and l <= cur_l and c <= cur_c:
+            return
+        new_d, new_l, new_c = max(d, 2 * cur_d if d > cur_d else cur_d), max(l, cur_l), \
+            max(c, 2 * cur_c if c > cur_c else cur_c)
+
+        def grow(cube: np.ndarray, *shape) -> np.ndarray:
+            pad = [(0, target - size) for size, target in zip(cube.shape, shape)]
+            pad += [(0, 0)] * (cube.ndim - len(pad))
+            return np.pad(cube, pad)
+
+        self._counts = grow(self._counts, new_d, new_l)
+        self._component_counts = grow(self._component_counts, new_d, new_l)
+        self._sums = grow(self._sums, new_d, new_l)
+        self._sumsq = grow(self._sumsq, new_d, new_l)
+        self._histogram = grow(self._histogram, new_d, new_l)
+        self._concept_hits = grow(self._concept_hits, new_d, new_l, new_c)
+        self._concept_score_sums = grow(self._concept_score_sums, new_d, new_l, new_c)
+
+    def _accumulate(self, domains: np.ndarray, difficulties: np.ndarray, components: np.ndarray,
+                    hit_rows: np.ndarray, hit_concepts: np.ndarray, sign: int):
+        """Add (sign=1) or remove (sign=-1) rows from every aggregate cube"""
+        cells = (domains.astype(np.intp), difficulties.astype(np.intp))
+        present = ~np.isnan(components)
+        values = np.where(present, components, 0.0).astype(np.float64)
+        np.add.at(self._counts, cells, sign)
+        np.add.at(self._component_counts, cells, sign * present.astype(np.int64))
+        np.add.at(self._sums, cells, sign * values)
+        np.add.at(self._sumsq, cells, sign * values * values)
+        scores = values[:, 0]
+        bins = np.clip((scores / MAX_SCORE * SCORE_BINS).astype(np.intp), 0, SCORE_BINS - 1)
+        np.add.at(self._histogram, cells + (bins,), sign)
+        if len(hit_rows):
+            hit_cells = (cells[0][hit_rows], cells[1][hit_rows], hit_concepts.astype(np.intp))
+            np.add.at(self._concept_hits, hit_cells, sign)
+            np.add.at(self._concept_score_sums, hit_cells, sign * scores[hit_rows])
+
+    def _append(self, batch: _Batch):
+        self._ensure_capacity()
+        base = self._ids.size
+
+        # Answers re-scored for the same question replace their earlier row
+        replaced = []
+        for i, key in enumerate(zip(batch.sessions.tolist(), batch.positions.tolist())):
+            previous = self._rows_by_key.get(key)
+            if previous is not None and previous < base and self._valid.values[previous]:
+                replaced.append(previous)
+            self._rows_by_key[key] = base + i
+        if replaced:
+            self._retract(np.array(replaced, dtype=np.int64))
+
+        self._ids.extend(batch.ids)
+        self._domain.extend(batch.domains)
+        self._difficulty.extend(batch.difficulties)
+        self._created.extend(batch.created)
+        self._components.extend(batch.components)
+        self._valid.extend(np.ones(len(batch), dtype=np.bool_))
+        self._hit_rows.extend(batch.hit_rows + base)
+        self._hit_concepts.extend(batch.hit_concepts)
+        self._accumulate(batch.domains, batch.difficulties, batch.components,
+                         batch.hit_rows, batch.hit_concepts, 1)
+        if len(batch):
+            self.watermark = max(self.watermark, int(batch.ids.max()))
+
+    def _retract(self, rows: np.ndarray):
+        all_hit_rows = self._hit_rows.values
+        hit_mask = np.isin(all_hit_rows, rows)
+        # Re-index hits relative to `rows` for _accumulate
+        local = np.searchsorted(np.sort(rows), all_hit_rows[hit_mask])
+        order = np.argsort(rows)
+        self._accumulate(self._domain.values[rows][order], self._difficulty.values[rows][order],
+                         self._components.values[rows][order], local, self._hit_concepts.values[hit_mask], -1)
+        self._valid.values[rows] = False
+
+    # Chunk files
+
+    def _save_chunk(self, batch: _Batch):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"chunk-{int(batch.ids.min()):012d}.npz")
+        np.savez_compressed(path, ids=batch.ids, sessions=batch.sessions, positions=batch.positions,
+                            domains=batch.domains, difficulties=batch.difficulties, created=batch.created,
+                            components=batch.components, hit_rows=batch.hit_rows, hit_concepts=batch.hit_concepts)
+        # Codes in chunks index these vocabularies, which only ever grow
+        vocab_path = os.path.join(self.directory, "vocabulary.json")
+        with open(vocab_path + ".tmp", "w") as f:
+            json.dump({"domains": self.domains.values, "difficulties": self.difficulties.values,
+                       "concepts": self.concepts.values}, f)
+        os.replace(vocab_path + ".tmp", vocab_path)
+
+    def _load_chunks(self):
+        vocab_path = os.path.join(self.directory, "vocabulary.json")
+        if not os.path.exists(vocab_path):
+            return
+        with open(vocab_path) as f:
+            vocab = json.load(f)
+        self.domains = _Vocabulary(vocab["domains"])
+        self.difficulties = _Vocabulary(vocab["difficulties"])
+        self.concepts = _Vocabulary(vocab["concepts"])
+        for path in sorted(glob.glob(os.path.join(self.directory, "chunk-*.npz"))):
+            with np.load(path) as chunk:
+                self._append(_Batch(**{name: chunk[name] for name in _Batch.__slots__}))
+
+    # Queries
+
+    def _selection(self, domain: Optional[str], difficulty: Optional[str]) -> Optional[Tuple[slice, slice]]:
+        """Cube index for one domain/difficulty (or all of them); None if the value was never seen"""
+        selection = []
+        for value, vocabulary in ((domain, self.domains), (difficulty, self.difficulties)):
+            if value is None:
+                selection.append(slice(0, len(vocabulary)))
+            elif value in vocabulary.codes:
+                code = vocabulary.codes[value]
+                selection.append(slice(code, code + 1))
+            else:
+                return None
+        return selection[0], selection[1]
+
+    def summary(self, by: Sequence[str] = GROUP_DIMENSIONS, domain: Optional[str] = None,
+                difficulty: Optional[str] = None, percentiles: Iterable[float] = (25, 50, 75, 90)) -> List[dict]:
+        """
+        Score distribution per group: count, mean and std of every component and
+        score percentiles (from the histogram, accurate to 0.05 points)
+        """
+        for dimension in by:
+            if dimension not in GROUP_DIMENSIONS:
+                raise ValueError(f"cannot group by {dimension!r}; use {GROUP_DIMENSIONS}")
+        percentiles = list(percentiles)
+        with self._lock:
+            selection = self._selection(domain, difficulty)
+            if selection is None:
+                return []
+            # Sum the additive cubes over every dimension that is not grouped on
+            collapsed = tuple(axis for axis, name in enumerate(GROUP_DIMENSIONS) if name not in by)
+            counts, n, sums, sumsq, histogram = (
+                cube[selection].sum(axis=collapsed, keepdims=True)
+                for cube in (self._counts, self._component_counts, self._sums, self._sumsq, self._histogram)
+            )
+            vocabularies = (self.domains, self.difficulties)
+            results = []
+            for cell in np.ndindex(counts.shape):
+                if not counts[cell]:
+                    continue
+                row = {name: vocabularies[axis].values[selection[axis].start + cell[axis]]
+                       for axis, name in enumerate(GROUP_DIMENSIONS) if name in by}
+                row["count"] = int(counts[cell])
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    means = np.where(n[cell] > 0, sums[cell] / n[cell], np.nan)
+                    variances = np.where(n[cell] > 0, sumsq[cell] / n[cell] - means ** 2, np.nan)
+                stds = np.sqrt(np.maximum(variances, 0.0))
+                for j, component in enumerate(COMPONENTS):
+                    row[f"{component}_mean"] = float(means[j])
+                    row[f"{component}_std"] = float(stds[j])
+                for pct, value in zip(percentiles, _histogram_percentiles(histogram[cell], percentiles)):
+                    row[f"score_p{pct:g}"] = value
+                results.append(row)
+            return results
+
+    def concept_frequencies(self, domain: Optional[str] = None, difficulty: Optional[str] = None,
+                            top: Optional[int] = None) -> List[dict]:
+        """How often each concept is hit in the selected answers, with the mean score of those answers"""
+        with self._lock:
+            selection = self._selection(domain, difficulty)
+            if selection is None:
+                return []
+            total = int(self._counts[selection].sum())
+            hits = self._concept_hits[selection].sum(axis=(0, 1))
+            score_sums = self._concept_score_sums[selection].sum(axis=(0, 1))
+            order = np.argsort(-hits, kind="stable")
+            order = order[hits[order] > 0][:top]
+            return [{"concept": self.concepts.values[c], "hits": int(hits[c]),
+                     "frequency": float(hits[c] / total) if total else 0.0,
+                     "mean_score": float(score_sums[c] / hits[c])} for c in order]
+
+    def exact_percentiles(self, percentiles: Iterable[float] = (50, 90), domain: Optional[str] = None,
+                          difficulty: Optional[str] = None, component: str = "score",
+                          since: Optional[float] = None) -> Dict[str, float]:
+        """Exact percentiles from the raw columns, optionally restricted to answers since a timestamp"""
+        with self._lock:
+            mask = self._valid.values.copy()
+            if domain is not None:
+                mask &= self._domain.values == self.domains.codes.get(domain, -1)
+            if difficulty is not None:
+                mask &= self._difficulty.values == self.difficulties.codes.get(difficulty, -1)
+            if since is not None:
+                mask &= self._created.values >= since
+            values = self._components.values[mask, COMPONENTS.index(component)]
+            values = values[~np.isnan(values)]
+            percentiles = list(percentiles)
+            if not len(values):
+                return {f"p{p:g}": float("nan") for p in percentiles}
+            return {f"p{p:g}": float(v) for p, v in zip(percentiles, np.percentile(values, percentiles))}
+
+    @property
+    def row_count(self) -> int:
+        return int(self._counts.sum())
+
+
+def _histogram_percentiles(histogram: np.ndarray, percentiles: List[float]) -> List[float]:
+    """Percentiles of the 0-10 score distribution, interpolating linearly within bins"""
+    total = histogram.sum()
+    if not total:
+        return [float("nan")] * len(percentiles)
+    cumulative = np.cumsum(histogram)
+    width = MAX_SCORE / SCORE_BINS
+    values = []
+    for pct in percentiles:
+        target = pct / 100 * total
+        b = int(np.searchsorted(cumulative, target, side="left"))
+        b = min(b, SCORE_BINS - 1)
+        before = cumulative[b - 1] if b else 0
+        fraction = (target - before) / histogram[b] if histogram[b] else 0.0
+        values.append(float((b + fraction) * width))
+    return values
+
+
+_analytics: Optional[CohortAnalytics] = None
+_analytics_lock = threading.Lock()
+
+
+def get_analytics() -> CohortAnalytics:
+    """Process-wide analytics store (chunk files under INTERVIEW_ANALYTICS_DIR when set)"""
+    global _analytics
+    if _analytics is None:
+        with _analytics_lock:
+            if _analytics is None:
+                _analytics = CohortAnalytics(os.environ.get(ANALYTICS_DIR_ENV))
+    return _analytics
@@ -0,0 +1,478 @@
+"""
+Headless JSON API over the interview engine.
+
+A small asyncio HTTP/1.1 server (no web framework) exposing question
+generation, single and batch answer evaluation, follow-up chat and reference
+lookup. Models are loaded once at startup and shared by every request.
+Connections are kept alive between requests. Handlers run on a thread pool,
+so the event loop only parses requests and writes responses. Work is admitted
+through a bounded queue; when it is full the server answers 503 with
+Retry-After straight away instead of letting latency grow without bound.
+
+    cd src && python -m utils.api_server --port 8080 --workers 4 --queue-size 64
+
+    curl -s localhost:8080/questions -d '{"domain": "Data Science", "difficulty": "Beginner"}'
+    curl -s localhost:8080/evaluate -d '{"domain": "Data Science", "question": "...", "response": "..."}'
+
+Endpoints (all JSON):
+
+    GET  /health             liveness, queue depth
+    GET  /stats              request counts and latencies per endpoint, model residency,
+                             embedding store size, scheduler queues and wait times
+    POST /questions          {domain, difficulty, previous_questions?, seed?} -> question and its metadata
+    POST /evaluate           {domain, question, response, seed?, profile?, priority?}
+    POST /evaluate/batch     {items: [{domain, question, response, seed?}, ...], profile?, priority?}
+    POST /chat               {domain, question, message}
+    POST /references         {domain, question? | topic?, score?}
+
+With `"profile": true` the evaluation is profiled (see utils/profiling.py) and
+the response carries the path prefix of the profile files under "profile".
+Regrading and other background jobs should send `"priority": "batch"`, so
+their evaluations queue behind live candidates (see utils/scheduler.py).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .content_packs import DIFFICULTIES
+from .embedding_store import get_embedding_store
+from .model_manager import ENCODER, get_model_manager
+from .profiling import get_profiler
+from .resource_config import configure_resources
+from .scheduler import PRIORITY_CLASSES, current_priority, get_scheduler_stats, priority
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+MAX_BATCH_ITEMS = 64
+KEEPALIVE_TIMEOUT = 15.0
+RETRY_AFTER_SECONDS = 1
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+    413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+    501: "Not Implemented", 503: "Service Unavailable"
+}
+
+
+class HTTPError(Exception):
+    """An error response with a status code and a client-facing message"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _require(body: dict, *fields: str) -> List[object]:
+    missing = [f for f in fields if not isinstance(body.get(f), str) or not body[f].strip()]
+    if missing:
+        raise HTTPError(400, f"missing or empty field(s): {', '.join(missing)}")
+    return [body[f] for f in fields]
+
+
+def _domain(body: dict) -> str:
+    """The request's domain, which must be a built-in or content-pack domain"""
+    from .response_evaluator import get_domain_concepts
+    domain, = _require(body, "domain")
+    domains = get_domain_concepts()
+    if domain not in domains:
+        raise HTTPError(400, f"unknown domain {domain!r}; use one of {', '.join(domains)}")
+    return domain
+
+
+def _rng(body: dict) -> Optional[random.Random]:
+    seed = body.get("seed")
+    if seed is None:
+        return None
+    if isinstance(seed, bool) or not isinstance(seed, (int, str)):
+        raise HTTPError(400, "seed must be an integer or a string")
+    return random.Random(seed)
+
+
+def _priority(body: dict) -> str:
+    """The request's priority class; batch requests pass theirs on to their items"""
+    name = body.get("priority", current_priority())
+    if name not in PRIORITY_CLASSES:
+        raise HTTPError(400, f"priority must be one of {', '.join(PRIORITY_CLASSES)}")
+    return name
+
+
+def _json_default(value):
+    # numpy scalars and arrays in evaluation results
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class InterviewAPI:
+    """Request handlers; each takes a decoded JSON body and returns a JSON-serializable dict"""
+
+    def __init__(self):
+        self.nlp = None
+        self.evaluator = None
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        """Create the shared evaluator and load the sentence encoder (once)"""
+        if self.evaluator is not None:
+            return
+        with self._load_lock:
+            if self.evaluator is None:
+                configure_resources()
+                from .response_evaluator import ResponseEvaluator
+                # Scoring doesn't parse with spaCy, so only the encoder is loaded up front;
+                # the model manager may still evict it when idle or over budget
+                get_model_manager().get(ENCODER)
+                self.evaluator = ResponseEvaluator()
+
+    def routes(self) -> Dict[Tuple[str, str], Callable[[dict], dict]]:
+        return {
+            ("POST", "/questions"): self.questions,
+            ("POST", "/evaluate"): self.evaluate,
+            ("POST", "/evaluate/batch"): self.evaluate_batch,
+            ("POST", "/chat"): self.chat,
+            ("POST", "/references"): self.references
+        }
+
+    def questions(self, body: dict) -> dict:
+        from .question_generator import generate_question_record
+        domain = _domain(body)
+        difficulty, = _require(body, "difficulty")
+        if difficulty not in DIFFICULTIES:
+            raise HTTPError(400, f"difficulty must be one of {', '.join(DIFFICULTIES)}")
+        previous = body.get("previous_questions") or []
+        if not isinstance(previous, list):
+            raise HTTPError(400, "previous_questions must be a list")
+        question = generate_question_record(domain, difficulty, previous, rng=_rng(body))
+        return {"question": question.text, **question.to_dict()}
+
+    def evaluate(self, body: dict, quality_score: Optional[float] = None) -> dict:
+        from .response_evaluator import evaluate_response_components
+        domain = _domain(body)
+        question, response = _require(body, "question", "response")
+        rng = _rng(body)
+        self.load()
+        with priority(_priority(body)), \
+                get_profiler().profile("api_evaluate", force=body.get("profile") is True) as run:
+            result = evaluate_response_components(question, response, domain, self.nlp, rng=rng,
+                                                  evaluator=self.evaluator, quality_score=quality_score)
+        if run is not None:
+            result["profile"] = run.path
+        return result
+
+    def evaluate_batch(self, body: dict) -> dict:
+        items = body.get("items")
+        if not isinstance(items, list) or not items:
+            raise HTTPError(400, "items must be a non-empty list")
+        if len(items) > MAX_BATCH_ITEMS:
+            raise HTTPError(413, f"at most {MAX_BATCH_ITEMS} items per batch")
+        for item in items:
+            if not isinstance(item, dict):
+                raise HTTPError(400, "every item must be an object")
+            _domain(item)
+            _require(item, "question", "response")
+            _rng(item)
+        from .response_evaluator import response_quality_batch
+        with priority(_priority(body)), \
+                get_profiler().profile("api_evaluate_batch", force=body.get("profile") is True) as run:
+            # Quality features for the whole batch in one pass
+            quality = response_quality_batch([item["response"] for item in items])
+            results = {"results": [self.evaluate(item, float(score)) for item, score in zip(items, quality)]}
+        if run is not None:
+            results["profile"] = run.path
+        return results
+
+    def chat(self, body: dict) -> dict:
+        from .chat_agents import get_rule_based_chat_response
+        domain, question, message = _require(body, "domain", "question", "message")
+        return {"response": get_rule_based_chat_response(message, question, domain)}
+
+    def references(self, body: dict) -> dict:
+        from .references import extract_topic_from_question, format_references_as_text, get_topic_references
+        domain, = _require(body, "domain")
+        topic = body.get("topic")
+        if topic is None and body.get("question"):
+            topic = extract_topic_from_question(body["question"])
+        return {
+            "topic": topic,
+            "references": get_topic_references(domain, topic),
+            "text": format_references_as_text(domain, topic, body.get("score"))
+        }
+
+
+class _Job:
+    __slots__ = ("handler", "body", "future")
+
+    def __init__(self, handler: Callable[[dict], dict], body: dict, future: asyncio.Future):
+        self.handler = handler
+        self.body = body
+        self.future = future
+
+
+class APIServer:
+    """asyncio HTTP/1.1 front end with a bounded work queue drained onto a thread pool"""
+
+    def __init__(self, api: InterviewAPI, host: str = "127.0.0.1", port: int = 8080,
+                 workers: int = 4, queue_size: int = 64):
+        self.api = api
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.routes = api.routes()
+        self.queue: Optional[asyncio.Queue] = None
+        self.queue_size = queue_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="interview-api")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._consumers: List[asyncio.Task] = []
+        self.started = time.time()
+        self.connections = 0
+        self.rejected = 0
+        self.in_flight = 0
+        # Admitted jobs not yet finished (queued or running)
+        self.pending = 0
+        # endpoint -> [count, errors, total seconds, max seconds]
+        self._latency: Dict[str, List[float]] = {}
+
+    # Lifecycle
+
+    async def start(self, preload: bool = True):
+        loop = asyncio.get_running_loop()
+        if preload:
+            await loop.run_in_executor(self.executor, self.api.load)
+        self.queue = asyncio.Queue(maxsize=self.queue_size + self.workers)
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        # Port 0 picks a free port; report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self.executor.shutdown(wait=False)
+
+    # Work queue
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.future.cancelled():
+                    continue
+                self.in_flight += 1
+                try:
+                    result = await loop.run_in_executor(self.executor, job.handler, job.body)
+                except Exception as e:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    if not job.future.done():
+                        job.future.set_result(result)
+                finally:
+                    self.in_flight -= 1
+            finally:
+                self.pending -= 1
+                self.queue.task_done()
+
+    async def submit(self, handler: Callable[[dict], dict], body: dict) -> dict:
+        """
+        Queue a handler call; raises HTTPError(503) when every worker is busy
+        and `queue_size` further requests are already waiting
+        """
+        if self.pending >= self.workers + self.queue_size:
+            self.rejected += 1
+            raise HTTPError(503, "server busy, retry later")
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait(_Job(handler, body, future))
+        self.pending += 1
+        return await future
+
+    # HTTP
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str], bytes]]:
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise HTTPError(400, "incomplete request")
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "request headers too large")
+        except asyncio.TimeoutError:
+            return None
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        if not version.startswith("HTTP/1."):
+            raise HTTPError(400, "unsupported HTTP version")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, sep, value = line.partition(":")
+                if not sep:
+                    raise HTTPError(400, "malformed header")
+                headers[name.strip().lower()] = value.strip()
+
+        if "transfer-encoding" in headers:
+            raise HTTPError(501, "chunked request bodies are not supported")
+        body = b""
+        if method == "POST":
+            if "content-length" not in headers:
+                raise HTTPError(411, "Content-Length required")
+            try:
+                length = int(headers["content-length"])
+            except ValueError:
+                raise HTTPError(400, "invalid Content-Length")
+            if length > MAX_BODY_BYTES:
+                raise HTTPError(413, f"request body over {MAX_BODY_BYTES} bytes")
+            try:
+                body = await reader.readexactly(length)
+            except asyncio.IncompleteReadError:
+                raise HTTPError(400, "incomplete request body")
+        return method, target.split("?", 1)[0], version, headers, body
+
+    def _response(self, status: int, payload: dict, keep_alive: bool) -> bytes:
+        body = json.dumps(payload, default=_json_default).encode("utf-8")
+        headers = [
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"
+        ]
+        if keep_alive:
+            headers.append(f"Keep-Alive: timeout={int(KEEPALIVE_TIMEOUT)}")
+        if status == 503:
+            headers.append(f"Retry-After: {RETRY_AFTER_SECONDS}")
+        return ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    writer.write(self._response(e.status, {"error": e.message}, keep_alive=False))
+                    await writer.drain()
+                    return
+                if request is None:
+                    return
+                method, path, version, headers, body = request
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                status, payload = await self._dispatch(method, path, body)
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, raw_body: bytes) -> Tuple[int, dict]:
+        start = time.perf_counter()
+        status = 200
+        try:
+            if (method, path) == ("GET", "/health"):
+                return status, {"status": "ok", "queued": self.pending - self.in_flight, "in_flight": self.in_flight,
+                                "models_loaded": self.api.evaluator is not None}
+            if (method, path) == ("GET", "/stats"):
+                return status, self.stats()
+            handler = self.routes.get((method, path))
+            if handler is None:
+                if any(route_path == path for _, route_path in self.routes):
+                    raise HTTPError(405, f"{method} not allowed on {path}")
+                raise HTTPError(404, f"no endpoint {path}")
+            try:
+                body = json.loads(raw_body or b"{}")
+            except ValueError:
+                raise HTTPError(400, "request body is not valid JSON")
+            if not isinstance(body, dict):
+                raise HTTPError(400, "request body must be a JSON object")
+            return status, await self.submit(handler, body)
+        except HTTPError as e:
+            status = e.status
+            return status, {"error": e.message}
+        except Exception as e:
+            status = 500
+            return status, {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self._record(path, status, time.perf_counter() - start)
+
+    def _record(self, path: str, status: int, seconds: float):
+        entry = self._latency.setdefault(path, [0, 0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += status >= 400
+        entry[2] += seconds
+        entry[3] = max(entry[3], seconds)
+
+    def stats(self) -> dict:
+        store = get_embedding_store()
+        return {
+            "uptime_s": time.time() - self.started,
+            "connections": self.connections,
+            "queued": self.pending - self.in_flight,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "workers": self.workers,
+            "rejected": self.rejected,
+            "endpoints": {
+                path: {"count": int(count), "errors": int(errors), "mean_ms": 1000 * total / count,
+                       "max_ms": 1000 * longest}
+                for path, (count, errors, total, longest) in self._latency.items() if count
+            },
+            "models": get_model_manager().get_stats(events=0),
+            "embeddings": store.get_stats() if store is not None else None,
+            "scheduler": get_scheduler_stats()
+        }
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8080, workers: int = 4, queue_size: int = 64,
+                preload: bool = True):
+    server = APIServer(InterviewAPI(), host, port, workers, queue_size)
+    await server.start(preload)
+    print(f"Interview API listening on http://{server.host}:{server.port}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve the interview engine as a JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4, help="handler threads")
+    parser.add_argument("--queue-size", type=int, default=64,
+                        help="requests allowed to wait for a busy worker before answering 503")
+    parser.add_argument("--lazy", action="store_true", help="load models on the first evaluation request")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.queue_size, not args.lazy))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Compile interview content into a versioned artifact directory.
+
+The artifact holds everything workers would otherwise derive at runtime:
+enumerated questions, keyword automata, inverted indexes and embedding
+matrices. Embeddings are stored as `.npy` files and loaded with
+`mmap_mode='r'`, so worker processes on one host share the pages.
+
+Build it with:
+
+    cd src && python -m utils.content_compiler
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .keyword_automaton import KeywordAutomaton
+
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_ENV = "INTERVIEW_CONTENT_ARTIFACT"
+DEFAULT_ARTIFACT_DIR = Path(__file__).resolve().parents[2] / "build" / "content"
+CURRENT_POINTER = "CURRENT"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_loaded_artifacts: Dict[str, "ContentArtifact"] = {}
+# Seconds between re-reads of an artifact root's CURRENT pointer
+POINTER_CHECK_INTERVAL = 2.0
+# Artifact root -> (monotonic time of the last pointer read, artifact it named)
+_current_artifacts: Dict[str, Tuple[float, Optional["ContentArtifact"]]] = {}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens used by the inverted indexes"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def collect_content() -> dict:
+    """
+    Gather the content tables from the modules that define them
+    """
+    from .question_generator import QuestionGenerator
+    from .response_evaluator import get_domain_concepts
+    from .chat_agents import DOMAIN_KNOWLEDGE, DOMAIN_SPECIFIC_CONCEPTS, TOPIC_EXAMPLES, TOPIC_BEST_PRACTICES
+    from .references import REFERENCES
+    from .content_packs import get_content_snapshot
+
+    generator = QuestionGenerator()
+    agent_concepts = dict(DOMAIN_SPECIFIC_CONCEPTS)
+    chat_knowledge = dict(DOMAIN_KNOWLEDGE)
+    chat_examples = dict(TOPIC_EXAMPLES)
+    chat_best_practices = dict(TOPIC_BEST_PRACTICES)
+    references = dict(REFERENCES)
+    # Content packs override built-in domains of the same name
+    for pack in get_content_snapshot().packs.values():
+        agent_concepts[pack.domain] = pack.agent_concepts
+        chat_knowledge[pack.domain] = pack.knowledge
+        chat_examples.update(pack.examples)
+        chat_best_practices.update(pack.best_practices)
+        references[pack.domain] = pack.references
+
+    return {
+        "question_templates": generator.question_templates,
+        "question_concepts": {
+            domain: {
+                "concepts": list(data["concepts"]),
+                "related_pairs": [list(pair) for pair in data["related_pairs"]]
+            }
+            for domain, data in generator.domain_concepts.items()
+        },
+        "questions": generator.enumerate_questions(),
+        "evaluator_concepts": get_domain_concepts(),
+        "agent_concepts": agent_concepts,
+        "chat_knowledge": chat_knowledge,
+        "chat_examples": chat_examples,
+        "chat_best_practices": chat_best_practices,
+        "references": references
+    }
+
+
+def content_version(content: dict, embedding_model: Optional[str] = EMBEDDING_MODEL) -> str:
+    """Stable hash of the source content, embedding model and artifact format"""
+    payload = json.dumps({"format": ARTIFACT_FORMAT_VERSION, "model": embedding_model, "content": content}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def build_automata(content: dict) -> Dict[str, dict]:
+    """Keyword automata for every concept vocabulary, keyed by '<vocabulary>/<domain>'"""
+    automata = {}
+    for vocabulary in ("evaluator_concepts", "agent_concepts"):
+        for domain, keywords in content[vocabulary].items():
+            automata[f"{vocabulary}/{domain}"] = KeywordAutomaton(keywords).to_dict()
+    for domain, topics in content["chat_knowledge"].items():
+        automata[f"chat_topics/{domain}"] = KeywordAutomaton(list(topics.keys())).to_dict()
+    return automata
+
+
+def build_indexes(content: dict) -> dict:
+    """Inverted indexes over questions and reference titles"""
+    question_tokens: Dict[str, List[int]] = {}
+    question_by_text: Dict[str, int] = {}
+    for question_id, question in enumerate(content["questions"]):
+        question_by_text.setdefault(question["text"], question_id)
+        for token in sorted(set(tokenize(question["text"]))):
+            question_tokens.setdefault(token, []).append(question_id)
+
+    reference_tokens: Dict[str, Dict[str, List[List]]] = {}
+    for domain, categories in content["references"].items():
+        domain_index = reference_tokens.setdefault(domain, {})
+        for category, refs in categories.items():
+            for position, ref in enumerate(refs):
+                for token in sorted(set(tokenize(ref["title"]))):
+                    domain_index.setdefault(token, []).append([category, position])
+
+    return {
+        "question_by_text": question_by_text,
+        "question_tokens": question_tokens,
+        "reference_tokens": reference_tokens
+    }
+
+
+def _concept_groups(content: dict) -> Dict[str, List[str]]:
+    groups = {}
+    for domain, keywords in content["evaluator_concepts"].items():
+        groups[f"evaluator_concepts/{domain}"] = list(keywords)
+    for domain, data in content["question_concepts"].items():
+        groups[f"question_concepts/{domain}"] = list(data["concepts"])
+    return groups
+
+
+def _encode(encoder, texts: List[str]) -> np.ndarray:
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    embeddings = encoder.encode(texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+def _write_json(path: Path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def compile_content(output_dir: Optional[str] = None, encoder=None, with_embeddings: bool = True) -> Path:
+    """
+    Compile all content into `<output_dir>/<version>/` and point CURRENT at it.
+    Returns the path of the compiled version directory.
+    """
+    root = Path(output_dir or os.environ.get(ARTIFACT_ENV) or DEFAULT_ARTIFACT_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+
+    content = collect_content()
+    version = content_version(content, EMBEDDING_MODEL if with_embeddings else None)
+    target = root / version
+
+    if not target.exists():
+        staging = Path(tempfile.mkdtemp(prefix=f".{version}-", dir=root))
+        try:
+            _write_json(staging / "content.json", content)
+            _write_json(staging / "questions.json", content["questions"])
+            _write_json(staging / "automata.json", build_automata(content))
+            _write_json(staging / "indexes.json", build_indexes(content))
+
+            concept_index = {}
+            if with_embeddings:
+                if encoder is None:
+                    from sentence_transformers import SentenceTransformer
+                    encoder = SentenceTransformer(EMBEDDING_MODEL)
+                question_texts = [q["text"] for q in content["questions"]]
+                np.save(staging / "question_embeddings.npy", _encode(encoder, question_texts))
+
+                # All concept vocabularies share one matrix; the manifest records each group's row range
+                concept_texts = []
+                for group, concepts in _concept_groups(content).items():
+                    concept_index[group] = [len(concept_texts), len(concept_texts) + len(concepts)]
+                    concept_texts.extend(concepts)
+                np.save(staging / "concept_embeddings.npy", _encode(encoder, concept_texts))
+                _write_json(staging / "concept_texts.json", concept_texts)
+
+            manifest = {
+                "format": ARTIFACT_FORMAT_VERSION,
+                "version": version,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "embedding_model": EMBEDDING_MODEL if with_embeddings else None,
+                "question_count": len(content["questions"]),
+                "concept_index": concept_index
+            }
+            _write_json(staging / "manifest.json", manifest)
+            os.replace(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    # Swap the pointer atomically so running workers never see a half-written version
+    pointer_tmp = root / f".{CURRENT_POINTER}.{os.getpid()}"
+    pointer_tmp.write_text(version, encoding="utf-8")
+    os.replace(pointer_tmp, root / CURRENT_POINTER)
+    # Pick the new version up on the next load, however the root was spelled
+    _current_artifacts.clear()
+    return target
+
+
+class ContentArtifact:
+    """Read-only view over a compiled content version"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / "manifest.json", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported content artifact format in {self.path}")
+        self.version = self.manifest["version"]
+
+        with open(self.path / "questions.json", encoding="utf-8") as f:
+            self.questions = json.load(f)
+        with open(self.path / "indexes.json", encoding="utf-8") as f:
+            self.indexes = json.load(f)
+        with open(self.path / "automata.json", encoding="utf-8") as f:
+            self._automata_data = json.load(f)
+        self._automata: Dict[str, KeywordAutomaton] = {}
+        self._content = None
+
+        self.question_embeddings = None
+        self.concept_embeddings = None
+        if (self.path / "question_embeddings.npy").exists():
+            self.question_embeddings = np.load(self.path / "question_embeddings.npy", mmap_mode="r")
+            self.concept_embeddings = np.load(self.path / "concept_embeddings.npy", mmap_mode="r")
+
+    @property
+    def content(self) -> dict:
+        """Raw content tables (loaded on first use)"""
+        if self._content is None:
+            with open(self.path / "content.json", encoding="utf-8") as f:
+                self._content = json.load(f)
+        return self._content
+
+    def automaton(self, name: str) -> Optional[KeywordAutomaton]:
+        if name not in self._automata:
+            data = self._automata_data.get(name)
+            if data is None:
+                return None
+            self._automata[name] = KeywordAutomaton.from_dict(data)
+        return self._automata[name]
+
+    def question_id(self, text: str) -> Optional[int]:
+        return self.indexes["question_by_text"].get(text)
+
+    def question_embedding(self, text: str) -> Optional[np.ndarray]:
+        question_id = self.question_id(text)
+        if question_id is None or self.question_embeddings is None:
+            return None
+        return self.question_embeddings[question_id]
+
+    def concept_matrix(self, group: str) -> Optional[np.ndarray]:
+        span = self.manifest["concept_index"].get(group)
+        if span is None or self.concept_embeddings is None:
+            return None
+        return self.concept_embeddings[span[0]:span[1]]
+
+    def search_questions(self, text: str) -> List[int]:
+        """Question ids sharing the most tokens with the text"""
+        counts: Dict[int, int] = {}
+        for token in set(tokenize(text)):
+            for question_id in self.indexes["question_tokens"].get(token, []):
+                counts[question_id] = counts.get(question_id, 0) + 1
+        return sorted(counts, key=lambda question_id: (-counts[question_id], question_id))
+
+
+def load_content_artifact(root: Optional[str] = None) -> Optional[ContentArtifact]:
+    """
+    Load the current compiled artifact, or None if content has not been compiled.
+    Called on every scored answer, so the CURRENT pointer is re-read at most once
+    per POINTER_CHECK_INTERVAL; a newly compiled version is picked up after that.
+    """
+    key = str(root or os.environ.get(ARTIFACT_ENV) or DEFAULT_ARTIFACT_DIR)
+    now = time.monotonic()
+    cached = _current_artifacts.get(key)
+    if cached is not None and now - cached[0] < POINTER_CHECK_INTERVAL:
+        return cached[1]
+
+    root = Path(key)
+    artifact = None
+    try:
+        version = (root / CURRENT_POINTER).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        version = None
+    if version:
+        version_dir = root / version
+        if str(version_dir) not in _loaded_artifacts:
+            _loaded_artifacts[str(version_dir)] = ContentArtifact(version_dir)
+        artifact = _loaded_artifacts[str(version_dir)]
+    _current_artifacts[key] = (now, artifact)
+    return artifact
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compile interview content into a versioned artifact")
+    parser.add_argument("--output", help=f"artifact root (default: ${ARTIFACT_ENV} or {DEFAULT_ARTIFACT_DIR})")
+    parser.add_argument("--no-embeddings", action="store_true", help="skip embedding matrices")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    target = compile_content(args.output, with_embeddings=not args.no_embeddings)
+    print(f"Compiled content {target.name} into {target} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+External content packs: interview domains defined in YAML, JSON or TOML files.
+
+A pack describes one domain (templates, concepts, related pairs, evaluator
+keywords, chat knowledge, topics and references). Packs are validated and
+compiled into the same indexed structures the built-in content uses, then
+published as an immutable snapshot. `reload()` only recompiles packs whose
+files changed and swaps the snapshot in one assignment, so in-flight sessions
+keep working and no models are reloaded.
+"""
+
+import json
+import logging
+import os
+import string
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .keyword_automaton import KeywordAutomaton
+
+logger = logging.getLogger(__name__)
+
+PACKS_ENV = "INTERVIEW_CONTENT_PACKS"
+DEFAULT_PACKS_DIR = Path(__file__).resolve().parents[2] / "content_packs"
+PACK_SUFFIXES = (".json", ".toml", ".yaml", ".yml")
+DIFFICULTIES = ("Beginner", "Intermediate", "Advanced")
+REFERENCE_CATEGORIES = ("books", "papers", "online_resources")
+# Placeholders QuestionGenerator fills in
+TEMPLATE_FIELDS = ("concept", "related_concept")
+
+_FORMATTER = string.Formatter()
+
+
+class ContentPackError(ValueError):
+    """Raised when a content pack cannot be parsed or fails validation"""
+
+    def __init__(self, path, message: str):
+        super().__init__(f"{path}: {message}")
+        self.path = str(path)
+
+
+def _parse_file(path: Path) -> dict:
+    suffix = path.suffix.lower()
+    try:
+        if suffix == ".json":
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        if suffix == ".toml":
+            try:
+                import tomllib
+            except ImportError:
+                import tomli as tomllib
+            with open(path, "rb") as f:
+                return tomllib.load(f)
+        try:
+            import yaml
+        except ImportError:
+            raise ContentPackError(path, "PyYAML is required to load YAML content packs")
+        with open(path, encoding="utf-8") as f:
+            return yaml.safe_load(f)
+    except ContentPackError:
+        raise
+    except Exception as e:
+        raise ContentPackError(path, f"could not parse file ({e})")
+
+
+def _require_str_list(path, data: dict, key: str, required: bool = True) -> List[str]:
+    value = data.get(key)
+    if value is None:
+        if required:
+            raise ContentPackError(path, f"missing '{key}'")
+        return []
+    if not isinstance(value, list) or not all(isinstance(v, str) and v.strip() for v in value):
+        raise ContentPackError(path, f"'{key}' must be a list of non-empty strings")
+    if required and not value:
+        raise ContentPackError(path, f"'{key}' must not be empty")
+    return list(value)
+
+
+def _require_str_dict(path, data: dict, key: str) -> Dict[str, str]:
+    value = data.get(key) or {}
+    if not isinstance(value, dict) or not all(isinstance(v, str) for v in value.values()):
+        raise ContentPackError(path, f"'{key}' must map topics to text")
+    return {topic.lower(): text for topic, text in value.items()}
+
+
+def _template_fields(path, template: str) -> set:
+    """Placeholders of a question template; anything QuestionGenerator couldn't format is refused"""
+    try:
+        fields = {field for _, field, _, _ in _FORMATTER.parse(template) if field is not None}
+    except ValueError as e:
+        raise ContentPackError(path, f"invalid template {template!r} ({e})")
+    unknown = sorted(fields - set(TEMPLATE_FIELDS))
+    if unknown:
+        raise ContentPackError(path, f"template uses unknown placeholders {unknown}: {template!r}")
+    try:
+        # Catches bad conversions and format specs as well
+        template.format(**{field: "x" for field in TEMPLATE_FIELDS})
+    except ValueError as e:
+        raise ContentPackError(path, f"invalid template {template!r} ({e})")
+    return fields
+
+
+def validate_pack(path, data) -> dict:
+    """
+    Validate raw pack data and return it in normalized form
+    """
+    if not isinstance(data, dict):
+        raise ContentPackError(path, "pack must be a mapping")
+
+    domain = data.get("domain")
+    if not isinstance(domain, str) or not domain.strip():
+        raise ContentPackError(path, "missing 'domain'")
+
+    templates = data.get("templates")
+    if not isinstance(templates, dict):
+        raise ContentPackError(path, "'templates' must map difficulty levels to template lists")
+    missing = [d for d in DIFFICULTIES if d not in templates]
+    if missing:
+        raise ContentPackError(path, f"'templates' is missing difficulty levels: {', '.join(missing)}")
+    normalized_templates = {}
+    uses_pairs = False
+    for difficulty, items in templates.items():
+        items = _require_str_list(path, templates, difficulty)
+        for template in items:
+            fields = _template_fields(path, template)
+            if "concept" not in fields:
+                raise ContentPackError(path, f"template without {{concept}} placeholder: {template!r}")
+            uses_pairs = uses_pairs or "related_concept" in fields
+        normalized_templates[difficulty] = items
+
+    pairs = []
+    for pair in data.get("related_pairs") or []:
+        if not isinstance(pair, (list, tuple)) or len(pair) != 2 or not all(isinstance(p, str) for p in pair):
+            raise ContentPackError(path, f"related pair must be two strings: {pair!r}")
+        pairs.append((pair[0], pair[1]))
+    if uses_pairs and not pairs:
+        raise ContentPackError(path, "templates use {related_concept} but no 'related_pairs' are defined")
+
+    knowledge = data.get("knowledge") or {}
+    if not isinstance(knowledge, dict) or not all(
+            isinstance(lines, list) and all(isinstance(line, str) for line in lines) for lines in knowledge.values()):
+        raise ContentPackError(path, "'knowledge' must map topics to lists of lines")
+
+    references = data.get("references") or {}
+    if not isinstance(references, dict):
+        raise ContentPackError(path, "'references' must map categories to lists")
+    for category, refs in references.items():
+        if category not in REFERENCE_CATEGORIES:
+            raise ContentPackError(path, f"unknown reference category '{category}'")
+        if not isinstance(refs, list) or not all(isinstance(r, dict) and r.get("title") for r in refs):
+            raise ContentPackError(path, f"every entry in references.{category} needs a 'title'")
+
+    rubrics = data.get("rubrics") or {}
+    if not isinstance(rubrics, dict):
+        raise ContentPackError(path, "'rubrics' must map concepts to rubric entries")
+    for concept, entry in rubrics.items():
+        entries = [entry] + list((entry.get("templates") or {}).values() if isinstance(entry, dict) else [])
+        for item in entries:
+            if not isinstance(item, dict) or not isinstance(item.get("reference_answer"), str):
+                raise ContentPackError(path, f"rubric for '{concept}' needs a 'reference_answer'")
+            _require_str_list(path, item, "points", required=False)
+
+    concepts = _require_str_list(path, data, "concepts")
+    evaluator_concepts = _require_str_list(path, data, "evaluator_concepts", required=False) or concepts
+    return {
+        "domain": domain.strip(),
+        "templates": normalized_templates,
+        "concepts": concepts,
+        "related_pairs": pairs,
+        "evaluator_concepts": evaluator_concepts,
+        "agent_concepts": [c.lower() for c in _require_str_list(path, data, "agent_concepts", required=False)]
+                          or [c.lower() for c in evaluator_concepts],
+        "topics": [t.lower() for t in _require_str_list(path, data, "topics", required=False)]
+                  or [c.lower() for c in concepts],
+        "knowledge": {topic.lower(): list(lines) for topic, lines in knowledge.items()},
+        "examples": _require_str_dict(path, data, "examples"),
+        "best_practices": _require_str_dict(path, data, "best_practices"),
+        "references": {category: [dict(r) for r in refs] for category, refs in references.items()},
+        "rubrics": rubrics
+    }
+
+
+class CompiledPack:
+    """Runtime structures for one pack, built once per file version"""
+
+    def __init__(self, path: Path, mtime_ns: int, data: dict):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.domain = data["domain"]
+        self.question_templates = data["templates"]
+        self.question_concepts = {"concepts": data["concepts"], "related_pairs": data["related_pairs"]}
+        self.evaluator_concepts = data["evaluator_concepts"]
+        self.agent_concepts = data["agent_concepts"]
+        self.topics = data["topics"]
+        self.knowledge = data["knowledge"]
+        self.examples = data["examples"]
+        self.best_practices = data["best_practices"]
+        self.references = data["references"]
+        self.rubrics = data["rubrics"]
+
+        # Indexed structures shared by every consumer of this pack
+        self.evaluator_automaton = KeywordAutomaton(self.evaluator_concepts)
+        self.topic_automaton = KeywordAutomaton(self.topics)
+        self.knowledge_automaton = KeywordAutomaton(list(self.knowledge.keys()))
+
+
+def compile_pack(path: Path) -> CompiledPack:
+    """Parse, validate and compile a single pack file"""
+    mtime_ns = path.stat().st_mtime_ns
+    return CompiledPack(path, mtime_ns, validate_pack(path, _parse_file(path)))
+
+
+class ContentSnapshot:
+    """Immutable view of all loaded packs, keyed by domain"""
+
+    def __init__(self, packs: Dict[str, CompiledPack], generation: int):
+        self.packs = packs
+        self.generation = generation
+
+    def get(self, domain: str) -> Optional[CompiledPack]:
+        return self.packs.get(domain)
+
+    def domains(self) -> List[str]:
+        return list(self.packs.keys())
+
+    def __bool__(self):
+        return bool(self.packs)
+
+
+class ContentRegistry:
+    """Loads packs from a directory and hot-swaps them when files change"""
+
+    def __init__(self, directory: Optional[str] = None, check_interval: float = 2.0):
+        self.directory = Path(directory or os.environ.get(PACKS_ENV) or DEFAULT_PACKS_DIR)
+        self.check_interval = check_interval
+        self._files: Dict[Path, CompiledPack] = {}
+        self._errors: Dict[str, str] = {}
+        self._rejected: Dict[Path, int] = {}
+        self._snapshot = ContentSnapshot({}, 0)
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+
+    def snapshot(self) -> ContentSnapshot:
+        return self._snapshot
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        """Validation errors from the last reload, keyed by file path"""
+        return dict(self._errors)
+
+    def _pack_files(self) -> List[Tuple[Path, int]]:
+        if not self.directory.is_dir():
+            return []
+        files = []
+        for path in sorted(self.directory.iterdir()):
+            if path.suffix.lower() in PACK_SUFFIXES and path.is_file():
+                files.append((path, path.stat().st_mtime_ns))
+        return files
+
+    def reload(self) -> List[str]:
+        """
+        Recompile changed packs and publish a new snapshot.
+        Returns the paths of packs that were (re)compiled or removed.
+        """
+        with self._lock:
+            current = self._pack_files()
+            changed = []
+            files = {}
+            for path, mtime_ns in current:
+                existing = self._files.get(path)
+                if existing is not None and existing.mtime_ns == mtime_ns:
+                    files[path] = existing
+                    continue
+                if self._rejected.get(path) == mtime_ns:
+                    # Unchanged broken file: don't re-parse or re-log it
+                    if existing is not None:
+                        files[path] = existing
+                    continue
+                try:
+                    files[path] = compile_pack(path)
+                    self._errors.pop(str(path), None)
+                    self._rejected.pop(path, None)
+                    changed.append(str(path))
+                except (ContentPackError, OSError) as e:
+                    # Keep serving the last good version of a broken pack
+                    logger.error("Content pack rejected: %s", e)
+                    self._errors[str(path)] = str(e)
+                    self._rejected[path] = mtime_ns
+                    if existing is not None:
+                        files[path] = existing
+            removed = [str(path) for path in self._files if path not in files]
+            changed.extend(removed)
+            self._last_check = time.monotonic()
+
+            if not changed and len(files) == len(self._files):
+                return []
+
+            packs = {}
+            for path, pack in files.items():
+                if pack.domain in packs:
+                    logger.warning("Content pack %s redefines domain %r; keeping %s",
+                                   path, pack.domain, packs[pack.domain].path)
+                    continue
+                packs[pack.domain] = pack
+            self._files = files
+            # Single reference swap: readers see either the old or the new snapshot
+            self._snapshot = ContentSnapshot(packs, self._snapshot.generation + 1)
+            return changed
+
+    def maybe_reload(self) -> List[str]:
+        """Reload at most once per check interval; cheap enough to call on every request"""
+        if time.monotonic() - self._last_check < self.check_interval:
+            return []
+        return self.reload()
+
+
+_registry: Optional[ContentRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_content_registry() -> ContentRegistry:
+    """Process-wide registry, loaded on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = ContentRegistry()
+                registry.reload()
+                _registry = registry
+    return _registry
+
+
+def get_content_snapshot() -> ContentSnapshot:
+    return get_content_registry().snapshot()
@@ -0,0 +1,521 @@
+"""
+Compact, append-only storage for answer embeddings.
+
+Every response the evaluator encodes can be kept for duplicate detection,
+analytics and regrading. At 384 float32 dimensions a MiniLM vector takes
+1.5 KB, so vectors are stored with a codec:
+
+- `float16`: half-precision components (2 bytes per dimension, 2x smaller);
+  cosine scores are within about 1e-4 of float32.
+- `pq<M>` (product quantization): the vector is split into M subvectors and
+  each is replaced by the index of its nearest of 256 trained centroids, so a
+  vector takes M bytes (`pq48` is 32x smaller for 384 dimensions). Search is
+  asymmetric: the query stays float32 and is scored against every code with M
+  table lookups, without decoding the stored vectors.
+
+A store is a directory with a `manifest.json` (codec and dimension), the PQ
+codebooks if any, and segment files of fixed-size codes plus int64 keys.
+Writes only append to the current segment, which is sealed after
+`segment_rows` rows; every process writes its own segments, so several
+workers can share a directory. Segments are read through `np.memmap`, so
+searching a large store does not load it into memory.
+
+With INTERVIEW_EMBEDDING_DIR set, the response embedding of every scored
+answer is appended under a key derived from its domain, question and text
+(`embedding_key`). New stores use INTERVIEW_EMBEDDING_CODEC (float16 by
+default). A PQ store is trained from existing vectors with `convert`, and
+`report` measures recall and score error of each codec against exact float32
+cosine search:
+
+    cd src && python -m utils.embedding_store report --vectors embeddings.npy --codecs float16 pq48 pq96
+    python -m utils.embedding_store convert ../data/embeddings ../data/embeddings-pq --codec pq48
+    python -m utils.embedding_store stats ../data/embeddings
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIR_ENV = "INTERVIEW_EMBEDDING_DIR"
+EMBEDDING_CODEC_ENV = "INTERVIEW_EMBEDDING_CODEC"
+DEFAULT_CODEC = "float16"
+DEFAULT_SUBSPACES = 48
+SEGMENT_ROWS = 1 << 16
+# Rows scored per step when searching, bounding temporary memory
+SEARCH_CHUNK = 1 << 13
+MANIFEST_FILE = "manifest.json"
+CODEBOOK_FILE = "pq_codebooks.npy"
+PQ_CENTROIDS = 256
+PQ_TRAIN_ROWS = 10000
+PQ_ITERATIONS = 20
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length (zero rows are left as they are)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def embedding_key(*parts: str) -> int:
+    """Stable signed 64-bit key for a record, e.g. embedding_key(domain, question, response)"""
+    digest = hashlib.blake2b("\n".join(parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class Float16Codec:
+    """Half-precision components"""
+
+    dtype = np.dtype(np.float16)
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.name = "float16"
+        self.code_shape: Tuple[int, ...] = (dim,)
+
+    @property
+    def code_size(self) -> int:
+        return self.dtype.itemsize * int(np.prod(self.code_shape))
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float32).astype(np.float16)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.asarray(codes, dtype=np.float32)
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Inner products of a float32 query with every code"""
+        return np.asarray(codes, dtype=np.float32) @ query
+
+    def save(self, directory: str):
+        pass
+
+
+class PQCodec:
+    """
+    Product quantizer: `codebooks` has shape (subspaces, 256, dim / subspaces)
+    and a code holds one centroid index per subspace
+    """
+
+    dtype = np.dtype(np.uint8)
+
+    def __init__(self, codebooks: np.ndarray):
+        self.codebooks = np.ascontiguousarray(codebooks, dtype=np.float32)
+        self.subspaces, self.centroids, self.sub_dim = self.codebooks.shape
+        self.dim = self.subspaces * self.sub_dim
+        self.name = f"pq{self.subspaces}"
+        self.code_shape: Tuple[int, ...] = (self.subspaces,)
+
+    @property
+    def code_size(self) -> int:
+        return self.subspaces
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, subspaces: int = DEFAULT_SUBSPACES, iterations: int = PQ_ITERATIONS,
+              max_rows: int = PQ_TRAIN_ROWS, seed: int = 0) -> "PQCodec":
+        """k-means codebooks for each subspace, trained on (a sample of) `vectors`"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rows, dim = vectors.shape
+        if dim % subspaces:
+            raise ValueError(f"dimension {dim} is not divisible by {subspaces} subspaces")
+        if rows < PQ_CENTROIDS:
+            raise ValueError(f"PQ training needs at least {PQ_CENTROIDS} vectors, got {rows}")
+        rng = np.random.RandomState(seed)
+        if rows > max_rows:
+            vectors = vectors[rng.choice(rows, max_rows, replace=False)]
+        sub_dim = dim // subspaces
+        codebooks = np.empty((subspaces, PQ_CENTROIDS, sub_dim), dtype=np.float32)
+        for j in range(subspaces):
+            codebooks[j] = _kmeans(vectors[:, j * sub_dim:(j + 1) * sub_dim], PQ_CENTROIDS, iterations, rng)
+        return cls(codebooks)
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float32).reshape(-1, self.subspaces, self.sub_dim)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        parts = self._split(vectors)
+        codes = np.empty((len(parts), self.subspaces), dtype=np.uint8)
+        for j in range(self.subspaces):
+            codes[:, j] = _nearest(parts[:, j], self.codebooks[j])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        codes = np.asarray(codes)
+        return self.codebooks[np.arange(self.subspaces), codes].reshape(len(codes), self.dim)
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Asymmetric inner products: one (subspaces x 256) table per query, then lookups"""
+        table = np.einsum("mkd,md->mk", self.codebooks, self._split(query)[0])
+        codes = np.asarray(codes)
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for j in range(self.subspaces):
+            scores += table[j][codes[:, j]]
+        return scores
+
+    def save(self, directory: str):
+        _write_atomic(os.path.join(directory, CODEBOOK_FILE), lambda f: np.save(f, self.codebooks))
+
+    @classmethod
+    def load(cls, directory: str) -> "PQCodec":
+        return cls(np.load(os.path.join(directory, CODEBOOK_FILE)))
+
+
+Codec = Union[Float16Codec, PQCodec]
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid (squared L2) for every point"""
+    distances = (centroids * centroids).sum(axis=1) - 2 * points @ centroids.T
+    return distances.argmin(axis=1)
+
+
+def _kmeans(points: np.ndarray, k: int, iterations: int, rng: np.random.RandomState) -> np.ndarray:
+    centroids = points[rng.choice(len(points), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest(points, centroids)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.stack([np.bincount(assignment, weights=points[:, d], minlength=k)
+                         for d in range(points.shape[1])], axis=1)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed empty clusters with random points rather than leaving dead centroids
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = points[rng.choice(len(points), len(empty), replace=False)]
+    return centroids
+
+
+def make_codec(spec: str, dim: int, training: Optional[np.ndarray] = None) -> Codec:
+    """A codec from its name: `float16`, or `pq` / `pq<M>` trained on `training`"""
+    if spec == "float16":
+        return Float16Codec(dim)
+    if spec.startswith("pq"):
+        if training is None:
+            raise ValueError(f"codec {spec!r} must be trained; "
+                             "build the store with `python -m utils.embedding_store convert`")
+        return PQCodec.train(training, int(spec[2:] or DEFAULT_SUBSPACES))
+    raise ValueError(f"unknown codec {spec!r}; use float16 or pq<subspaces>")
+
+
+def _write_atomic(path: str, write):
+    with open(path + ".tmp", "wb") as f:
+        write(f)
+    os.replace(path + ".tmp", path)
+
+
+class EmbeddingStore:
+    """
+    Directory of append-only, memory-mapped segments of encoded unit vectors with int64 keys.
+    An existing store keeps the codec in its manifest; a new one is created with
+    `codec` (a codec, or `float16`, created on the first append once the dimension is known).
+    """
+
+    def __init__(self, directory: str, codec: Union[Codec, str] = DEFAULT_CODEC, segment_rows: int = SEGMENT_ROWS):
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self.codec: Optional[Codec] = None
+        self._spec = codec
+        self._lock = threading.Lock()
+        # Open segment of this process: name, files, rows written
+        self._segment: Optional[str] = None
+        self._files = None
+        self._segment_count = 0
+        self._written = 0
+        # Memory maps of segments, reopened when a segment has grown
+        self._maps: Dict[str, Tuple[int, np.ndarray, np.ndarray]] = {}
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            self.codec = PQCodec.load(directory) if manifest["codec"].startswith("pq") \
+                else Float16Codec(manifest["dim"])
+            if not isinstance(codec, str) and codec.name != self.codec.name:
+                raise ValueError(f"{directory} already stores {self.codec.name} codes, not {codec.name}")
+        elif not isinstance(codec, str):
+            self._create(codec)
+        elif codec != "float16":
+            # Only float16 can be created without training data; this raises with a hint
+            make_codec(codec, 0)
+
+    def _create(self, codec: Codec):
+        os.makedirs(self.directory, exist_ok=True)
+        codec.save(self.directory)
+        manifest = {"codec": codec.name, "dim": codec.dim, "created_at": time.time()}
+        _write_atomic(os.path.join(self.directory, MANIFEST_FILE),
+                      lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+        self.codec = codec
+
+    def append(self, keys: Sequence[int], vectors: np.ndarray) -> int:
+        """Normalize, encode and append vectors under their keys; returns the number written"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = normalize(vectors.reshape(-1, vectors.shape[-1]))
+        keys = np.asarray(keys, dtype=np.int64).reshape(-1)
+        if len(keys) != len(vectors):
+            raise ValueError(f"{len(keys)} keys for {len(vectors)} vectors")
+        with self._lock:
+            if self.codec is None:
+                self._create(Float16Codec(vectors.shape[1]))
+            if vectors.shape[1] != self.codec.dim:
+                raise ValueError(f"expected {self.codec.dim}-dimensional vectors, got {vectors.shape[1]}")
+            codes = np.ascontiguousarray(self.codec.encode(vectors), dtype=self.codec.dtype)
+            start = 0
+            while start < len(keys):
+                if self._files is None or self._written >= self.segment_rows:
+                    self._open_segment()
+                end = min(len(keys), start + self.segment_rows - self._written)
+                codes_file, keys_file = self._files
+                # Codes first: readers count rows by the shorter file, so a torn write is never visible
+                codes_file.write(codes[start:end].tobytes())
+                codes_file.flush()
+                keys_file.write(keys[start:end].tobytes())
+                keys_file.flush()
+                self._written += end - start
+                start = end
+        return len(keys)
+
+    def add(self, key: int, vector: np.ndarray):
+        self.append([key], np.asarray(vector)[None])
+
+    def _open_segment(self):
+        self._close_segment()
+        self._segment_count += 1
+        name = f"segment-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self._segment_count:04d}"
+        base = os.path.join(self.directory, name)
+        self._files = (open(base + ".codes", "ab"), open(base + ".keys", "ab"))
+        self._segment = name
+        self._written = 0
+
+    def _close_segment(self):
+        if self._files is not None:
+            for f in self._files:
+                f.close()
+            self._files = None
+
+    def segments(self) -> List[Tuple[str, int]]:
+        """(name, complete rows) of every segment, oldest first"""
+        if self.codec is None:
+            return []
+        result = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "segment-*.codes"))):
+            base = path[:-len(".codes")]
+            try:
+                rows = min(os.path.getsize(path) // self.codec.code_size, os.path.getsize(base + ".keys") // 8)
+            except OSError:
+                continue
+            result.append((os.path.basename(base), rows))
+        return result
+
+    def iter_segments(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """(keys, codes) memory maps of every non-empty segment"""
+        for name, rows in self.segments():
+            if not rows:
+                continue
+            cached = self._maps.get(name)
+            if cached is None or cached[0] != rows:
+                base = os.path.join(self.directory, name)
+                codes = np.memmap(base + ".codes", dtype=self.codec.dtype, mode="r",
+                                  shape=(rows,) + self.codec.code_shape)
+                keys = np.memmap(base + ".keys", dtype=np.int64, mode="r", shape=(rows,))
+                cached = self._maps[name] = (rows, keys, codes)
+            yield cached[1], cached[2]
+
+    def __len__(self) -> int:
+        return sum(rows for _, rows in self.segments())
+
+    def search(self, query: np.ndarray, k: int = 10) -> List[Tuple[int, float]]:
+        """(key, approximate cosine similarity) of the k stored vectors closest to `query`, best first"""
+        if self.codec is None:
+            return []
+        query = normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+        best_keys = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for keys, codes in self.iter_segments():
+            for start in range(0, len(codes), SEARCH_CHUNK):
+                scores = self.codec.scores(query, codes[start:start + SEARCH_CHUNK])
+                chunk_keys = np.asarray(keys[start:start + SEARCH_CHUNK])
+                best_keys, best_scores = _top_k(np.concatenate([best_keys, chunk_keys]),
+                                                np.concatenate([best_scores, scores]), k)
+        order = np.argsort(-best_scores, kind="stable")
+        return [(int(best_keys[i]), float(best_scores[i])) for i in order]
+
+    def vectors(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """(keys, decoded float32 vectors) per segment"""
+        for keys, codes in self.iter_segments():
+            yield np.asarray(keys), self.codec.decode(codes)
+
+    def get_stats(self) -> Dict[str, object]:
+        segments = self.segments()
+        rows = sum(count for _, count in segments)
+        code_size = self.codec.code_size if self.codec else 0
+        return {"directory": self.directory, "codec": self.codec.name if self.codec else self._spec,
+                "dim": self.codec.dim if self.codec else None, "rows": rows, "segments": len(segments),
+                "bytes_per_vector": code_size + 8 if self.codec else None,
+                "mb": round(rows * (code_size + 8) / 1e6, 2)}
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+
+def _top_k(keys: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(scores) <= k:
+        return keys, scores
+    keep = np.argpartition(-scores, k - 1)[:k]
+    return keys[keep], scores[keep]
+
+
+_store: Optional[EmbeddingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store() -> Optional[EmbeddingStore]:
+    """Process-wide store, or None unless INTERVIEW_EMBEDDING_DIR is set"""
+    global _store
+    directory = os.environ.get(EMBEDDING_DIR_ENV)
+    if not directory:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EmbeddingStore(directory, os.environ.get(EMBEDDING_CODEC_ENV, DEFAULT_CODEC))
+    return _store
+
+
+# Stores whose appends were rejected, warned about once each
+_rejecting_stores = set()
+
+
+def record_embedding(store: EmbeddingStore, key: int, vector: np.ndarray):
+    """Append one vector, logging rather than raising on errors (scoring must not fail on them)"""
+    try:
+        store.add(key, vector)
+    except OSError as error:
+        logger.warning("Could not store embedding in %s: %s", store.directory, error)
+    except ValueError as error:
+        # A store written with another encoder rejects every vector (dimension mismatch)
+        if store.directory not in _rejecting_stores:
+            _rejecting_stores.add(store.directory)
+            logger.warning("Not storing embeddings in %s: %s", store.directory, error)
+
+
+# Recall report
+
+def recall_report(vectors: np.ndarray, codecs: Sequence[str] = ("float16", "pq48"), queries: int = 200,
+                  k: int = 10, seed: int = 0) -> List[Dict[str, object]]:
+    """
+    Compare each codec with exact float32 cosine search. `queries` rows are held
+    out as queries and the rest are encoded; reports recall@k (share of the exact
+    top k found), top-1 agreement, the absolute cosine error over the exact top k,
+    bytes per vector and search time per query.
+    """
+    vectors = normalize(vectors)
+    rng = np.random.RandomState(seed)
+    order = rng.permutation(len(vectors))
+    queries = min(queries, len(vectors) // 2)
+    query_matrix, base = vectors[order[:queries]], vectors[order[queries:]]
+    k = min(k, len(base))
+
+    exact = query_matrix @ base.T
+    exact_top = np.argsort(-exact, axis=1)[:, :k]
+    report = [{"codec": "float32", "bytes_per_vector": 4 * base.shape[1], "compression": 1.0,
+               "recall_at_k": 1.0, "top1": 1.0, "mean_abs_error": 0.0, "max_abs_error": 0.0}]
+    for spec in codecs:
+        started = time.perf_counter()
+        codec = make_codec(spec, base.shape[1], training=base)
+        codes = codec.encode(base)
+        build_s = time.perf_counter() - started
+        started = time.perf_counter()
+        approx = np.stack([codec.scores(q, codes) for q in query_matrix])
+        search_ms = 1000 * (time.perf_counter() - started) / queries
+        approx_top = np.argsort(-approx, axis=1)[:, :k]
+        recall = np.mean([len(np.intersect1d(a, e)) / k for a, e in zip(approx_top, exact_top)])
+        rows = np.arange(queries)[:, None]
+        errors = np.abs(approx[rows, exact_top] - exact[rows, exact_top])
+        report.append({"codec": codec.name, "bytes_per_vector": codec.code_size,
+                       "compression": round(4 * base.shape[1] / codec.code_size, 1),
+                       "recall_at_k": round(float(recall), 4),
+                       "top1": round(float(np.mean(approx_top[:, 0] == exact_top[:, 0])), 4),
+                       "mean_abs_error": round(float(errors.mean()), 5),
+                       "max_abs_error": round(float(errors.max()), 5),
+                       "search_ms": round(search_ms, 3), "build_s": round(build_s, 2)})
+    return report
+
+
+def _encode_answers(db_path: str, limit: int) -> np.ndarray:
+    from .model_manager import ENCODER, get_model_manager
+    from .scheduler import BATCH, priority
+    conn = sqlite3.connect(db_path)
+    try:
+        responses = [row[0] for row in conn.execute(
+            "SELECT response FROM answers WHERE response != '' ORDER BY id LIMIT ?", (limit,))]
+    finally:
+        conn.close()
+    encoder = get_model_manager().get(ENCODER)
+    # Re-embedding history must not hold up live scoring on the same host
+    with priority(BATCH):
+        embeddings = encoder.encode(responses, convert_to_numpy=True, normalize_embeddings=True)
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def convert(source: str, destination: str, codec: str, segment_rows: int = SEGMENT_ROWS) -> EmbeddingStore:
+    """Copy a store into a new one with another codec, training PQ codebooks on the source vectors"""
+    store = EmbeddingStore(source)
+    if store.codec is None:
+        raise ValueError(f"{source} is not an embedding store")
+    parts = list(store.vectors())
+    vectors = np.concatenate([v for _, v in parts]) if parts else np.empty((0, store.codec.dim), np.float32)
+    target = EmbeddingStore(destination, make_codec(codec, store.codec.dim, training=vectors), segment_rows)
+    for keys, segment in parts:
+        target.append(keys, segment)
+    target.close()
+    return target
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compressed answer embedding stores")
+    commands = parser.add_subparsers(dest="command", required=True)
+    report_cmd = commands.add_parser("report", help="recall and score error of codecs against exact float32 search")
+    source = report_cmd.add_mutually_exclusive_group(required=True)
+    source.add_argument("--vectors", help=".npy file of float32 embeddings")
+    source.add_argument("--db", help="encode persisted answers from this database")
+    report_cmd.add_argument("--limit", type=int, default=20000, help="answers to encode with --db")
+    report_cmd.add_argument("--codecs", nargs="+", default=["float16", "pq48", "pq96"])
+    report_cmd.add_argument("--queries", type=int, default=200)
+    report_cmd.add_argument("-k", type=int, default=10)
+    convert_cmd = commands.add_parser("convert", help="copy a store with another codec")
+    convert_cmd.add_argument("source")
+    convert_cmd.add_argument("destination")
+    convert_cmd.add_argument("--codec", default=f"pq{DEFAULT_SUBSPACES}")
+    stats_cmd = commands.add_parser("stats", help="rows, segments and size of a store")
+    stats_cmd.add_argument("directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "report":
+        vectors = np.load(args.vectors) if args.vectors else _encode_answers(args.db, args.limit)
+        rows = recall_report(vectors, args.codecs, args.queries, args.k)
+        print(f"{len(vectors)} vectors, {min(args.queries, len(vectors) // 2)} queries, k={args.k}")
+        print(f"{'codec':<8} {'bytes':>6} {'ratio':>6} {'recall@k':>9} {'top1':>6} {'mean err':>9} "
+              f"{'max err':>8} {'ms/query':>9}")
+        for row in rows:
+            print(f"{row['codec']:<8} {row['bytes_per_vector']:>6} {row['compression']:>6} "
+                  f"{row['recall_at_k']:>9} {row['top1']:>6} {row['mean_abs_error']:>9} "
+                  f"{row['max_abs_error']:>8} {row.get('search_ms', ''):>9}")
+    elif args.command == "convert":
+        print(json.dumps(convert(args.source, args.destination, args.codec).get_stats(), indent=2))
+    else:
+        print(json.dumps(EmbeddingStore(args.directory).get_stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
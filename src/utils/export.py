@@ -0,0 +1,268 @@
+"""
+Streaming export of persisted interviews for warehouse loads.
+
+Each table (sessions, messages, questions, answers with component scores and
+feedback, chat turns) is streamed through a single SQLite cursor and written
+either as JSON lines or as chunked columnar `.npz` files, so memory stays
+bounded by one chunk however large the database is. Exports are incremental:
+a watermark file records, per table, the last exported answer id or
+timestamp, and the next run only exports rows past it. Rows are keyed by
+their primary key, so a replaced row (e.g. a re-scored answer) shows up again
+in a later export and should be loaded as an upsert.
+
+Timestamp watermarks stop `settle` seconds short of the current time, because
+rows are stamped when queued and the write-behind thread commits them slightly
+later.
+
+    cd src && python -m utils.export --db ../data/interviews.db --output ../exports --gzip
+    python -m utils.export --db ../data/interviews.db --output ../exports --format columnar
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .persistence import DB_PATH_ENV
+
+WATERMARK_FILE = "watermark.json"
+CHUNK_ROWS = 50000
+SETTLE_SECONDS = 5.0
+
+# table -> (watermark column, [(column, type)]); JSON columns are decoded in JSONL output
+TABLES: Dict[str, Tuple[str, List[Tuple[str, str]]]] = {
+    "sessions": ("updated_at", [
+        ("id", "text"), ("candidate_id", "text"), ("domain", "text"), ("difficulty", "text"),
+        ("state", "json"), ("created_at", "real"), ("updated_at", "real")
+    ]),
+    "messages": ("created_at", [
+        ("session_id", "text"), ("seq", "integer"), ("role", "text"), ("content", "text"),
+        ("shared_content", "text"), ("score", "real"), ("created_at", "real")
+    ]),
+    "questions": ("asked_at", [
+        ("session_id", "text"), ("position", "integer"), ("text", "text"), ("topic", "text"),
+        ("asked_at", "real")
+    ]),
+    "answers": ("id", [
+        ("id", "integer"), ("session_id", "text"), ("candidate_id", "text"), ("question_position", "integer"),
+        ("domain", "text"), ("difficulty", "text"), ("response", "text"), ("score", "real"),
+        ("semantic_similarity", "real"), ("relevance_score", "real"), ("quality_score", "real"),
+        ("found_concepts", "json"), ("feedback", "text"), ("created_at", "real")
+    ]),
+    "chat_turns": ("created_at", [
+        ("session_id", "text"), ("question_position", "integer"), ("turn", "integer"),
+        ("user_text", "text"), ("response_text", "text"), ("created_at", "real")
+    ])
+}
+
+
+def iter_table(conn: sqlite3.Connection, table: str, low, high, batch_size: int = 1000) -> Iterator[tuple]:
+    """Rows of `table` with low < watermark column <= high, in watermark order"""
+    key, columns = TABLES[table]
+    cursor = conn.execute(
+        f"SELECT {', '.join(name for name, _ in columns)} FROM {table} "
+        f"WHERE {key} > ? AND {key} <= ? ORDER BY {key}",
+        (low, high)
+    )
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+class JSONLWriter:
+    """One JSON object per row, optionally gzip-compressed; the file is created on the first row"""
+
+    def __init__(self, directory: str, table: str, run_id: str, compress: bool = False):
+        self.path = os.path.join(directory, table, f"{table}-{run_id}.jsonl" + (".gz" if compress else ""))
+        self.columns = TABLES[table][1]
+        self.compress = compress
+        self.rows = 0
+        self._file = None
+
+    def write(self, row: tuple):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = gzip.open(self.path, "wt", encoding="utf-8") if self.compress \
+                else open(self.path, "w", encoding="utf-8")
+        record = {}
+        for (name, kind), value in zip(self.columns, row):
+            record[name] = json.loads(value) if kind == "json" and value is not None else value
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.rows += 1
+
+    @property
+    def files(self) -> List[str]:
+        return [self.path] if self.rows else []
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ColumnarWriter:
+    """
+    Rows buffered into chunks of `chunk_rows` and written as `.npz` files with
+    one array per column. Numbers are float64/int64 with a `<column>.valid`
+    mask for NULLs; text is stored Arrow-style as UTF-8 bytes (`<column>`)
+    plus `<column>.offsets`.
+    """
+
+    def __init__(self, directory: str, table: str, run_id: str, compress: bool = False,
+                 chunk_rows: int = CHUNK_ROWS):
+        self.directory = os.path.join(directory, table)
+        self.prefix = f"{table}-{run_id}"
+        self.columns = TABLES[table][1]
+        self.compress = compress
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        self.files: List[str] = []
+        self._buffer: List[tuple] = []
+
+    def write(self, row: tuple):
+        self._buffer.append(row)
+        self.rows += 1
+        if len(self._buffer) >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        arrays = {}
+        for j, (name, kind) in enumerate(self.columns):
+            values = [row[j] for row in self._buffer]
+            valid = np.fromiter((v is not None for v in values), dtype=np.bool_, count=len(values))
+            if kind in ("text", "json"):
+                encoded = [v.encode("utf-8") if v is not None else b"" for v in values]
+                offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+                np.cumsum([len(b) for b in encoded], out=offsets[1:])
+                arrays[name] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+                arrays[f"{name}.offsets"] = offsets
+            else:
+                dtype = np.float64 if kind == "real" else np.int64
+                fill = np.nan if kind == "real" else 0
+                arrays[name] = np.array([fill if v is None else v for v in values], dtype=dtype)
+            arrays[f"{name}.valid"] = valid
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.prefix}-{len(self.files):05d}.npz")
+        (np.savez_compressed if self.compress else np.savez)(path, **arrays)
+        self.files.append(path)
+        self._buffer = []
+
+    def close(self):
+        self._flush()
+
+
+def read_columnar_chunk(path: str, table: str) -> Dict[str, list]:
+    """Decode a columnar chunk back into Python values (None for NULLs)"""
+    columns = {}
+    with np.load(path) as chunk:
+        for name, kind in TABLES[table][1]:
+            valid = chunk[f"{name}.valid"]
+            if kind in ("text", "json"):
+                data = chunk[name].tobytes()
+                offsets = chunk[f"{name}.offsets"]
+                values = [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(valid))]
+            else:
+                values = chunk[name].tolist()
+            columns[name] = [v if ok else None for v, ok in zip(values, valid.tolist())]
+    return columns
+
+
+def load_watermark(directory: str) -> Dict[str, float]:
+    path = os.path.join(directory, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(path: str, data: dict):
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def export(db_path: str, output_dir: str, fmt: str = "jsonl", compress: bool = False,
+           watermark: Optional[Dict[str, float]] = None, full: bool = False,
+           settle: float = SETTLE_SECONDS, chunk_rows: int = CHUNK_ROWS,
+           tables: Optional[List[str]] = None) -> dict:
+    """
+    Export every table past the watermark (the one saved in `output_dir` unless
+    given, or everything with `full`) and save the new watermark. Returns the
+    run manifest, which is also written next to the data.
+    """
+    if fmt not in ("jsonl", "columnar"):
+        raise ValueError(f"unknown export format {fmt!r}")
+    os.makedirs(output_dir, exist_ok=True)
+    previous = {} if full else (watermark if watermark is not None else load_watermark(output_dir))
+    run_id = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    time_limit = time.time() - settle
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+    manifest = {"run": run_id, "format": fmt, "compressed": compress, "watermark_from": previous,
+                "watermark_to": {}, "tables": {}}
+    try:
+        for table in tables or TABLES:
+            key, columns = TABLES[table]
+            low = previous.get(table, 0)
+            if key == "id":
+                # Answer ids are assigned on commit, so they need no settle window
+                high = conn.execute("SELECT MAX(id) FROM answers").fetchone()[0] or 0
+            else:
+                high = time_limit
+            if fmt == "jsonl":
+                writer = JSONLWriter(output_dir, table, run_id, compress)
+            else:
+                writer = ColumnarWriter(output_dir, table, run_id, compress, chunk_rows)
+            try:
+                for row in iter_table(conn, table, low, high):
+                    writer.write(row)
+            finally:
+                writer.close()
+            manifest["watermark_to"][table] = max(low, high)
+            manifest["tables"][table] = {
+                "rows": writer.rows,
+                "files": [os.path.relpath(path, output_dir) for path in writer.files],
+                "columns": columns
+            }
+    finally:
+        conn.close()
+
+    _write_json(os.path.join(output_dir, f"manifest-{run_id}.json"), manifest)
+    # Saved last, so a failed run is simply repeated from the old watermark
+    _write_json(os.path.join(output_dir, WATERMARK_FILE), {**previous, **manifest["watermark_to"]})
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Export persisted interviews as JSONL or columnar chunks")
+    parser.add_argument("--db", default=os.environ.get(DB_PATH_ENV),
+                        help=f"database path (default: ${DB_PATH_ENV})")
+    parser.add_argument("--output", required=True, help="export directory; also holds the watermark")
+    parser.add_argument("--format", choices=("jsonl", "columnar"), default="jsonl")
+    parser.add_argument("--gzip", action="store_true", help="compress output files")
+    parser.add_argument("--full", action="store_true", help="ignore the saved watermark and export everything")
+    parser.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                        help="seconds to hold back timestamp watermarks for in-flight writes")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows per columnar chunk")
+    parser.add_argument("--tables", nargs="+", choices=list(TABLES), help="export only these tables")
+    args = parser.parse_args(argv)
+    if not args.db:
+        parser.error(f"--db is required when {DB_PATH_ENV} is not set")
+
+    manifest = export(args.db, args.output, args.format, args.gzip, full=args.full, settle=args.settle,
+                      chunk_rows=args.chunk_rows, tables=args.tables)
+    for table, info in manifest["tables"].items():
+        print(f"{table:<12} {info['rows']:>9} rows  {len(info['files'])} file(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+"""
+UI-independent interview engine.
+
+`InterviewSession` is the interview flow as a small state machine:
+
+    idle --start--> answering --submit_answer--> chatting --next_question--> answering
+                                                   |  ^
+                                                   ask (up to MAX_CHAT_TURNS)
+
+A session holds only references and numbers: the current question is a shared
+`Question` record (topic, reference ids and knowledge key precomputed), domain
+and difficulty are interned, and scores, history and the transcript live in
+its `SessionStore`. Question templates, references and chat knowledge stay in
+the shared content tables.
+
+`SessionManager` multiplexes many sessions in one process. Sessions are kept
+in least-recently-used order; those idle longer than the timeout (or beyond
+the session cap) are evicted, except those pinned by `use()` while an app
+rerun or a synthetic user acts on them. With a database configured, an
+evicted session is already persisted and is restored from it on the next
+access; otherwise it is serialized to a JSON file and read back from there. The Streamlit app,
+the load tester (`utils.load_test`) and session replay (`utils.replay`) all
+drive sessions through these methods; the stateless HTTP API scores single
+answers and has no sessions.
+
+While a session is in the follow-up chat, the manager's `Prefetcher` prepares
+its next question and the replies to the suggested follow-ups in the
+background; `next_question` and `ask` use them when they are still valid.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .chat_agents import get_rule_based_chat_response
+from .persistence import get_database
+from .prefetch import get_prefetcher
+from .profiling import get_profiler, stage
+from .question_generator import Question, generate_question_record, question_record
+from .references import format_references_as_text
+from .replay import evaluation_output, resume_recording, start_recording
+from .session_store import MessageRecord, SessionStore
+
+IDLE_TIMEOUT_ENV = "INTERVIEW_SESSION_IDLE_TIMEOUT"
+MAX_SESSIONS_ENV = "INTERVIEW_MAX_SESSIONS"
+SESSION_DIR_ENV = "INTERVIEW_SESSION_DIR"
+DEFAULT_IDLE_TIMEOUT = 1800.0
+DEFAULT_MAX_SESSIONS = 10000
+
+MAX_CHAT_TURNS = 8
+
+# Phases
+IDLE = "idle"
+ANSWERING = "answering"
+CHATTING = "chatting"
+
+CHAT_INTRO = f"You can now ask up to {MAX_CHAT_TURNS} follow-up questions about this topic to better understand it."
+CHAT_LIMIT_NOTICE = ("You've reached the maximum number of chat exchanges. "
+                     "Please submit your final answer or move to the next question.")
+CHAT_LIMIT_ERROR = (f"You've reached the maximum number of chat exchanges ({MAX_CHAT_TURNS}). "
+                    "Submit your final answer or move to the next question.")
+
+
+class SessionStateError(RuntimeError):
+    """Raised when an action is not valid in the session's current phase"""
+
+
+class InterviewSession:
+    """One candidate's interview: phase, current question and chat count on top of a SessionStore"""
+
+    __slots__ = ("store", "domain", "difficulty", "candidate_id", "phase", "chat_count",
+                 "question", "last_active", "recorder", "db", "prefetcher", "pins")
+
+    def __init__(self, store: Optional[SessionStore] = None, db=None, prefetcher=None):
+        self.store = store if store is not None else SessionStore()
+        self.domain: Optional[str] = None
+        self.difficulty: Optional[str] = None
+        self.candidate_id: Optional[str] = None
+        self.phase = IDLE
+        self.chat_count = 0
+        self.question: Optional[Question] = None
+        self.last_active = time.monotonic()
+        self.recorder = None
+        self.db = db
+        self.prefetcher = prefetcher
+        # Held by SessionManager.use
+        self.pins = 0
+        self._attach_persistence()
+
+    # State
+
+    @property
+    def session_id(self) -> str:
+        return self.store.session_id
+
+    @property
+    def interview_started(self) -> bool:
+        return self.phase != IDLE
+
+    @property
+    def chat_mode(self) -> bool:
+        return self.phase == CHATTING
+
+    @property
+    def evaluation_done(self) -> bool:
+        return self.phase == CHATTING
+
+    @property
+    def current_question(self) -> Optional[str]:
+        return self.question.text if self.question else None
+
+    @property
+    def current_topic(self) -> Optional[str]:
+        return self.question.topic if self.question else None
+
+    @property
+    def position(self) -> int:
+        """Index of the current question"""
+        return len(self.store.questions) - 1
+
+    @property
+    def chat_turns_left(self) -> int:
+        return MAX_CHAT_TURNS - self.chat_count if self.phase == CHATTING else 0
+
+    def _require(self, *phases: str):
+        if self.phase not in phases:
+            raise SessionStateError(f"not allowed while the session is {self.phase}")
+        self.last_active = time.monotonic()
+
+    # Transitions
+
+    def start(self, domain: str, difficulty: str, candidate_id: Optional[str] = None) -> str:
+        """Begin the interview; returns the first question"""
+        self._require(IDLE)
+        self.domain = sys.intern(domain)
+        self.difficulty = sys.intern(difficulty)
+        self.candidate_id = candidate_id or None
+        # A recorder attached beforehand (replays capture their steps that way) is kept
+        if self.recorder is None:
+            self.recorder = start_recording(self.store, domain, difficulty)
+        self.phase = ANSWERING
+        question = self._ask_question(0)
+        self.store.add_message("assistant", shared_text=(
+            f"Welcome to your {domain} interview! "
+            f"I'll be asking you questions about {domain}. "
+            "Let's begin with your first question:"
+        ))
+        self.store.add_message("assistant", shared_text=question)
+        if self.db is not None:
+            self.db.save_session(self.session_id, domain, difficulty, self.candidate_id, self.snapshot())
+            self.db.record_question(self.session_id, 0, question, self.current_topic)
+        return question
+
+    def submit_answer(self, response: str, nlp=None, reuse_near_duplicates: bool = True) -> Dict[str, object]:
+        """Score an answer and open the follow-up chat; returns the evaluation result"""
+        from .response_evaluator import evaluate_response_components
+        self._require(ANSWERING)
+
+        with get_profiler().profile("submit_answer", self.session_id):
+            started = time.perf_counter()
+            result = evaluate_response_components(self.question, response, self.domain, nlp,
+                                                  reuse_near_duplicates=reuse_near_duplicates,
+                                                  rng=self.store.rng(f"feedback/{self.position}"))
+            self._record("evaluate", started, evaluation_output(result), input=response)
+            score = result["score"]
+
+            # Feedback with the references block as shared text
+            started = time.perf_counter()
+            with stage("references"):
+                references_text = format_references_as_text(self.domain, self.current_topic, score,
+                                                            self.question.references)
+            self._record("references", started, references_text)
+
+        # Only a scored answer joins the transcript, so a failed evaluation leaves the session as it was
+        self.store.add_message("user", response)
+        if self.db is not None:
+            self.db.record_answer(self.session_id, self.position, self.domain, self.difficulty,
+                                  response, result, self.candidate_id)
+        self.store.add_score(score)
+        self.store.add_message("system", result["feedback"], score=score, shared_text=references_text)
+
+        self.phase = CHATTING
+        self.chat_count = 0
+        self.store.add_message("chat", shared_text=CHAT_INTRO)
+        self.persist()
+        if self.prefetcher is not None:
+            # Prepared while the candidate reads the feedback
+            self.prefetcher.schedule(self)
+        return result
+
+    def ask(self, message: str) -> str:
+        """Answer a follow-up question about the current question; returns the reply"""
+        self._require(CHATTING)
+        if self.chat_count >= MAX_CHAT_TURNS:
+            raise SessionStateError(CHAT_LIMIT_ERROR)
+        started = time.perf_counter()
+        reply = self.prefetcher.reply(self, message) if self.prefetcher is not None else None
+        if reply is None:
+            reply = get_rule_based_chat_response(message, self.question, self.domain)
+        self._record("chat", started, reply, input=message, turn=self.chat_count)
+        self.store.add_message("user", message)
+        self.store.add_message("chat", shared_text=reply)
+        if self.db is not None:
+            self.db.record_chat_turn(self.session_id, self.position, self.chat_count, message, reply)
+        self.chat_count += 1
+        if self.chat_count >= MAX_CHAT_TURNS:
+            self.store.add_message("assistant", shared_text=CHAT_LIMIT_NOTICE)
+        self.persist()
+        return reply
+
+    def next_question(self) -> str:
+        """Leave the follow-up chat and ask the next question"""
+        self._require(CHATTING)
+        self.phase = ANSWERING
+        self.chat_count = 0
+        prefetched = self.prefetcher.next_question(self) if self.prefetcher is not None else None
+        question = self._ask_question(len(self.store.questions), prefetched)
+        self.store.add_message("assistant", shared_text="Moving on to the next question:")
+        self.store.add_message("assistant", shared_text=question)
+        if self.db is not None:
+            self.db.record_question(self.session_id, self.position, question, self.current_topic)
+        self.persist()
+        return question
+
+    def reset(self):
+        """Drop the transcript and return to idle under a new session id"""
+        self.close()
+        self.store = SessionStore()
+        self.domain = self.difficulty = self.candidate_id = None
+        self.phase = IDLE
+        self.chat_count = 0
+        self.question = None
+        self.last_active = time.monotonic()
+        self._attach_persistence()
+
+    def close(self):
+        """Release the spill file and the session recording, and cancel any prefetch"""
+        if self.prefetcher is not None:
+            self.prefetcher.cancel(self.session_id)
+        self.store.close()
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def _ask_question(self, position: int, prefetched: Optional[Question] = None) -> str:
+        started = time.perf_counter()
+        self.question = prefetched or generate_question_record(self.domain, self.difficulty, self.store.questions,
+                                                               self.store.rng(f"question/{position}"))
+        self.store.questions.append(self.question.text)
+        self._record("question", started, self.question.text)
+        return self.question.text
+
+    def _record(self, op: str, started: float, output, **fields):
+        if self.recorder is not None:
+            self.recorder.record(op, self.position, started, output, **fields)
+
+    # Persistence
+
+    def _attach_persistence(self):
+        if self.db is not None:
+            db, session_id = self.db, self.store.session_id
+            self.store.on_message = lambda seq, record: db.record_message(
+                session_id, seq, record.role, record.text, record.shared_text, record.score
+            )
+
+    def snapshot(self) -> dict:
+        """Interview state needed to resume the session in another process"""
+        return {
+            "interview_started": self.interview_started,
+            "current_question": self.current_question,
+            "current_topic": self.current_topic,
+            "chat_mode": self.chat_mode,
+            "chat_count": self.chat_count,
+            "evaluation_done": self.evaluation_done,
+            "questions": list(self.store.questions),
+            "scores": list(self.store.scores)
+        }
+
+    def persist(self):
+        """Queue the current state for the database (no-op without persistence)"""
+        if self.db is not None:
+            self.db.update_session_state(self.session_id, self.snapshot())
+
+    def _restore_state(self, state: dict):
+        for question in state.get("questions", []):
+            self.store.questions.append(question)
+        for score in state.get("scores", []):
+            self.store.add_score(score)
+        if state.get("interview_started"):
+            self.phase = CHATTING if state.get("chat_mode") else ANSWERING
+        self.chat_count = state.get("chat_count", 0)
+        if state.get("current_question"):
+            self.question = question_record(state["current_question"], self.domain, self.difficulty)
+        if self.interview_started:
+            # Eviction closed the recording; later steps go to the same log
+            self.recorder = resume_recording(self.store)
+
+    @classmethod
+    def from_database(cls, data: dict, db, prefetcher=None) -> "InterviewSession":
+        """Rebuild a session from `InterviewDatabase.load_session` output"""
+        store = SessionStore(session_id=data["id"])
+        for message in data["messages"]:
+            store.add_message(message["role"], message["content"], message["score"], message["shared_content"])
+        # Only mirror messages added from now on
+        session = cls(store, db, prefetcher)
+        session.domain = sys.intern(data["domain"])
+        session.difficulty = sys.intern(data["difficulty"])
+        session.candidate_id = data["candidate_id"]
+        session._restore_state(data["state"])
+        return session
+
+    def to_dict(self) -> dict:
+        """Full serialized form, transcript included, for eviction without a database"""
+        return {
+            "session_id": self.session_id,
+            "seed": self.store.seed,
+            "domain": self.domain,
+            "difficulty": self.difficulty,
+            "candidate_id": self.candidate_id,
+            "state": self.snapshot(),
+            "messages": [record.to_json() for record in self.store]
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, db=None, prefetcher=None) -> "InterviewSession":
+        store = SessionStore(session_id=data["session_id"], seed=data["seed"])
+        for line in data["messages"]:
+            record = MessageRecord.from_json(line)
+            store.add_message(record.role, record.text, record.score, record.shared_text)
+        session = cls(store, db, prefetcher)
+        session.domain = sys.intern(data["domain"]) if data["domain"] else None
+        session.difficulty = sys.intern(data["difficulty"]) if data["difficulty"] else None
+        session.candidate_id = data["candidate_id"]
+        session._restore_state(data["state"])
+        return session
+
+
+class SessionManager:
+    """Sessions of one process, with idle eviction and restore from the database or disk"""
+
+    def __init__(self, idle_timeout: Optional[float] = None, max_sessions: Optional[int] = None,
+                 db=None, session_dir: Optional[str] = None, sweep_interval: float = 30.0, prefetcher=None,
+                 persist: bool = True):
+        self.idle_timeout = idle_timeout or float(os.environ.get(IDLE_TIMEOUT_ENV, DEFAULT_IDLE_TIMEOUT))
+        self.max_sessions = max_sessions or int(os.environ.get(MAX_SESSIONS_ENV, DEFAULT_MAX_SESSIONS))
+        # persist=False keeps the sessions out of any configured database (load tests)
+        self.db = (db if db is not None else get_database()) if persist else None
+        self.session_dir = session_dir or os.environ.get(SESSION_DIR_ENV) or \
+            os.path.join(tempfile.gettempdir(), "interview_sessions", "evicted")
+        self.sweep_interval = sweep_interval
+        self.prefetcher = prefetcher if prefetcher is not None else get_prefetcher()
+        # Least recently used first
+        self._sessions: "OrderedDict[str, InterviewSession]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_sweep = time.monotonic()
+        self.evicted = 0
+        self.restored = 0
+
+    def create(self, seed: Optional[str] = None) -> InterviewSession:
+        """A new idle session; `seed` makes its questions and feedback reproducible"""
+        with self._lock:
+            session = self._create(seed)
+            self._maybe_evict()
+        return session
+
+    def get(self, session_id: str) -> Optional[InterviewSession]:
+        """A live session, restoring an evicted or persisted one; None if unknown"""
+        with self._lock:
+            session = self._lookup(session_id)
+            self._maybe_evict()
+            return session
+
+    @contextlib.contextmanager
+    def use(self, session_id: Optional[str] = None, seed: Optional[str] = None):
+        """
+        The session `session_id` (a new one if unknown), pinned until the block exits:
+        a pinned session is never evicted, so its actions aren't lost to a stale spill
+        """
+        with self._lock:
+            session = (self._lookup(session_id) if session_id else None) or self._create(seed)
+            session.pins += 1
+            self._maybe_evict()
+        try:
+            yield session
+        finally:
+            with self._lock:
+                session.pins -= 1
+
+    def _create(self, seed: Optional[str]) -> InterviewSession:
+        session = InterviewSession(SessionStore(seed=seed), db=self.db, prefetcher=self.prefetcher)
+        self._sessions[session.session_id] = session
+        return session
+
+    def _lookup(self, session_id: str) -> Optional[InterviewSession]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._restore(session_id)
+            if session is None:
+                return None
+            self._sessions[session_id] = session
+            self.restored += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_active = time.monotonic()
+        return session
+
+    def reset(self, session: InterviewSession):
+        """Reset a session and track it under its new id"""
+        with self._lock:
+            self._sessions.pop(session.session_id, None)
+            session.reset()
+            self._sessions[session.session_id] = session
+
+    def remove(self, session_id: str):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+
+    def _restore(self, session_id: str) -> Optional[InterviewSession]:
+        path = self._evicted_path(session_id)
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            os.remove(path)
+            return InterviewSession.from_dict(data, self.db, self.prefetcher)
+        if self.db is not None:
+            data = self.db.load_session(session_id)
+            if data:
+                return InterviewSession.from_database(data, self.db, self.prefetcher)
+        return None
+
+    def _evicted_path(self, session_id: str) -> str:
+        # Session ids come from URLs; keep them from escaping the directory
+        return os.path.join(self.session_dir, os.path.basename(session_id) + ".json")
+
+    def _maybe_evict(self):
+        now = time.monotonic()
+        if len(self._sessions) <= self.max_sessions and now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        self.evict(now)
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Evict sessions idle past the timeout and the oldest unpinned ones beyond the session cap"""
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        with self._lock:
+            for session_id, session in list(self._sessions.items()):
+                if len(self._sessions) <= self.max_sessions and now - session.last_active < self.idle_timeout:
+                    break
+                if session.pins:
+                    continue
+                del self._sessions[session_id]
+                self._evict(session)
+                evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    def _evict(self, session: InterviewSession):
+        if self.db is None and session.interview_started:
+            os.makedirs(self.session_dir, exist_ok=True)
+            path = self._evicted_path(session.session_id)
+            with open(path + ".tmp", "w") as f:
+                json.dump(session.to_dict(), f)
+            os.replace(path + ".tmp", path)
+        # The database already holds everything; just release the spill file and recording
+        session.close()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get_stats(self) -> Dict[str, object]:
+        stats = {"active_sessions": len(self._sessions), "evicted": self.evicted, "restored": self.restored,
+                 "idle_timeout_s": self.idle_timeout, "max_sessions": self.max_sessions}
+        if self.prefetcher is not None:
+            stats["prefetch"] = self.prefetcher.get_stats()
+        return stats
+
+
+_manager: Optional[SessionManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_session_manager() -> SessionManager:
+    """Process-wide session manager"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = SessionManager()
+    return _manager
@@ -0,0 +1,99 @@
+"""Aho-Corasick keyword automaton for multi-keyword substring matching."""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+
+class KeywordAutomaton:
+    """
+    Matches every keyword in a single pass over the text.
+    Matching is case-insensitive substring matching, the same as
+    `keyword.lower() in text.lower()` for each keyword.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(keywords)
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+        self._build()
+
+    def _build(self):
+        # Trie of lowercased keywords
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword.lower():
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][ch] = next_state
+                state = next_state
+            self.output[state].append(keyword_id)
+
+        # Breadth-first failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(ch, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    @property
+    def max_keyword_length(self) -> int:
+        return max((len(k) for k in self.keywords), default=0)
+
+    def next_state(self, state: int, ch: str) -> int:
+        """Advance the automaton by one (already lowercased) character"""
+        goto = self.goto
+        while state and ch not in goto[state]:
+            state = self.fail[state]
+        return goto[state].get(ch, 0)
+
+    def scan(self, text: str, state: int = 0, offset: int = 0) -> Iterator[Tuple[int, int]]:
+        """
+        Yield (end_index, keyword_id) for every match in the lowercased text.
+        `state` and `offset` allow resuming a scan part-way through a document.
+        """
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        for index, ch in enumerate(text.lower(), offset):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for keyword_id in output[state]:
+                yield index, keyword_id
+
+    def find_ids(self, text: str) -> Set[int]:
+        """Return the ids of all keywords occurring in the text"""
+        return {keyword_id for _, keyword_id in self.scan(text)}
+
+    def find_all(self, text: str) -> List[str]:
+        """Return matching keywords in their original (declaration) order"""
+        return [self.keywords[i] for i in sorted(self.find_ids(text))]
+
+    def to_dict(self) -> dict:
+        return {
+            "keywords": self.keywords,
+            "goto": self.goto,
+            "fail": self.fail,
+            "output": self.output
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "KeywordAutomaton":
+        """Restore a compiled automaton without rebuilding the trie"""
+        automaton = cls.__new__(cls)
+        automaton.keywords = list(data["keywords"])
+        automaton.goto = [dict(transitions) for transitions in data["goto"]]
+        automaton.fail = list(data["fail"])
+        automaton.output = [list(ids) for ids in data["output"]]
+        return automaton
@@ -0,0 +1,195 @@
+"""
+Incremental concept-coverage and length preview of an answer being written.
+
+`LiveCoverage.update(text)` compares the new text with the previous one and
+re-examines only the edited region:
+
+- the keyword automaton's state after every character is kept, so scanning
+  resumes at the edit and stops as soon as the state after the edit agrees
+  with the old one again (within the longest keyword's length); keyword
+  occurrence counts are adjusted for the positions that changed;
+- word, distinct-word and sentence-end counters are adjusted for the
+  whitespace-delimited tokens overlapping the edit.
+
+The edit itself is located by binary search with C-level string compares.
+A keystroke-sized edit therefore costs microseconds, however long the answer
+already is. Found keywords and the relevance score are exactly those of
+`keyword_relevance`. The sentence count (tokens ending in . ? or !) only
+approximates Punkt, so the quality figure is an estimate; submitting the
+answer still scores it with `evaluate_response_components`.
+
+    tracker = LiveCoverage("Data Science")
+    tracker.update(text_area_value)
+    tracker.summary()
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from .keyword_automaton import KeywordAutomaton
+from .response_evaluator import get_domain_automaton, get_domain_concepts
+
+_SENTENCE_END_CHARS = (".", "?", "!")
+# \s is str.isspace, the separators of str.split()
+_SPACE = re.compile(r"\s")
+_LAST_SPACE = re.compile(r".*\s", re.DOTALL)
+_WINDOW = 64
+
+
+def _common_prefix(a: str, b: str) -> int:
+    """Length of the common prefix, by binary search over slice comparisons"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    """Length of the common suffix, at most `limit`"""
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:len(a) - low] == b[len(b) - middle:len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _token_start(text: str, index: int) -> int:
+    """Start of the whitespace-delimited token containing text[index - 1] (index itself after whitespace)"""
+    while index:
+        window = max(0, index - _WINDOW)
+        match = _LAST_SPACE.match(text, window, index)
+        if match:
+            return match.end()
+        index = window
+    return 0
+
+
+def _token_end(text: str, index: int) -> int:
+    """First whitespace at or after index, or the end of the text"""
+    match = _SPACE.search(text, index)
+    return match.start() if match else len(text)
+
+
+class LiveCoverage:
+    """Keyword coverage, word and sentence counters of one answer, updated edit by edit"""
+
+    def __init__(self, domain: str, keywords: Optional[List[str]] = None,
+                 automaton: Optional[KeywordAutomaton] = None):
+        self.domain = domain
+        if automaton is None:
+            keywords = keywords if keywords is not None else get_domain_concepts().get(domain, [])
+            automaton = get_domain_automaton(domain, keywords)
+        self.automaton = automaton
+        self.text = ""
+        # Automaton state after each character of the text
+        self._states: List[int] = []
+        self._occurrences = [0] * len(automaton.keywords)
+        # Occurrences of each distinct lowercased word
+        self._words: Dict[str, int] = {}
+        self.word_count = 0
+        # Tokens ending a sentence
+        self._sentence_ends = 0
+        self.updates = 0
+        self.rescanned = 0
+
+    def _feed(self, state: int, ch: str, sign: int) -> int:
+        """Advance over one character of the original text, counting (sign=1) or uncounting its matches"""
+        output = self.automaton.output
+        occurrences = self._occurrences
+        # Lowercasing can expand a character, as in keyword_relevance's response.lower()
+        for lowered in ch.lower():
+            state = self.automaton.next_state(state, lowered)
+            for keyword_id in output[state]:
+                occurrences[keyword_id] += sign
+        return state
+
+    def _count_tokens(self, text: str, sign: int):
+        words = self._words
+        for token in text.split():
+            word = token.lower()
+            count = words.get(word, 0) + sign
+            if count:
+                words[word] = count
+            else:
+                del words[word]
+            self.word_count += sign
+            if token.endswith(_SENTENCE_END_CHARS):
+                self._sentence_ends += sign
+
+    def update(self, text: str) -> "LiveCoverage":
+        """Bring the counters up to date with the new text"""
+        old = self.text
+        if text == old:
+            return self
+        self.updates += 1
+        start = _common_prefix(old, text)
+        suffix = _common_suffix(old, text, min(len(old), len(text)) - start)
+        old_end, new_end = len(old) - suffix, len(text) - suffix
+        states = self._states
+
+        # Keyword automaton: uncount the old region, count the new one
+        before = states[start - 1] if start else 0
+        state = before
+        for index in range(start, old_end):
+            state = self._feed(state, old[index], -1)
+        state = before
+        replacement = []
+        for index in range(start, new_end):
+            state = self._feed(state, text[index], 1)
+            replacement.append(state)
+        # Carry on into the unchanged suffix until the state agrees with the old one again
+        stop = old_end
+        while stop < len(old) and state != (states[stop - 1] if stop else 0):
+            self._feed(states[stop - 1] if stop else 0, old[stop], -1)
+            state = self._feed(state, old[stop], 1)
+            replacement.append(state)
+            stop += 1
+        states[start:stop] = replacement
+        self.rescanned += len(replacement)
+
+        # Whitespace-delimited tokens overlapping the edit
+        token_start = _token_start(old, start)
+        token_end = _token_end(old, old_end)
+        self._count_tokens(old[token_start:token_end], -1)
+        self._count_tokens(text[token_start:token_end + new_end - old_end], 1)
+
+        self.text = text
+        return self
+
+    @property
+    def found_keywords(self) -> List[str]:
+        """Keywords present, in declaration order (as keyword_relevance returns them)"""
+        keywords = self.automaton.keywords
+        return [keywords[i] for i, count in enumerate(self._occurrences) if count]
+
+    @property
+    def sentence_count(self) -> int:
+        """Sentence-ending tokens, plus a final unterminated sentence"""
+        last = self.text.rsplit(None, 1)[-1] if self.word_count else ""
+        return self._sentence_ends + (1 if last and not last.endswith(_SENTENCE_END_CHARS) else 0)
+
+    def summary(self) -> Dict[str, object]:
+        """Live indicator values; the score components mirror keyword_relevance and response_quality"""
+        found = self.found_keywords
+        words = self.word_count
+        unique_words = len(self._words)
+        sentences = self.sentence_count
+        relevance_score = min(1.0, len(found) / 5)
+        quality_estimate = min(1.0, words / 200) * 0.4 + min(1.0, sentences / 10) * 0.3 + \
+            unique_words / max(1, words) * 0.3
+        return {
+            "found_keywords": found,
+            "keyword_count": len(self.automaton.keywords),
+            "relevance_score": relevance_score,
+            "word_count": words,
+            "unique_words": unique_words,
+            "sentence_count": sentences,
+            "quality_estimate": quality_estimate
+        }
@@ -0,0 +1,436 @@
+"""
+Load generator that simulates concurrent interview sessions without a browser.
+
+Each synthetic session drives an `InterviewSession` from a `SessionManager`
+exactly as `app.main` does: start the interview, submit an answer (scoring,
+feedback and references), ask up to 8 follow-up questions, then move on to the
+next question, with the manager's eviction, the prefetcher and session
+recording in the loop. Sessions run concurrently on threads, the way
+Streamlit serves them, with configurable think times. The report covers
+throughput, per-stage latency percentiles, CPU / RSS sampled over the run and
+the session manager's eviction and prefetch counters.
+
+    cd src && python -m utils.load_test --sessions 20 --questions 3 --think-time 0.5
+    python -m utils.load_test --sessions 5 --app-test      # drive app.py through Streamlit's AppTest
+
+Synthetic sessions are not persisted, whatever INTERVIEW_DB_PATH says; pass
+`--db PATH` to write them to a (scratch) database.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from .metrics import current_rss_bytes, percentile
+from .resource_config import configure_resources
+
+MAX_CHAT_TURNS = 8
+DOMAINS = ["Software Development", "Data Science", "Marketing"]
+DIFFICULTIES = ["Beginner", "Intermediate", "Advanced"]
+PERCENTILES = (50, 90, 95, 99)
+
+# The suggested follow-ups shown in the app, plus a few free-form ones
+CHAT_PROMPTS = [
+    "Can you explain this concept in simpler terms?",
+    "What are the key best practices?",
+    "Can you provide a concrete example?",
+    "What are common challenges or pitfalls?",
+    "How would this work in a real project?",
+    "What should I read to learn more about this?",
+    "How does this compare to the alternatives?",
+    "Why does this matter in practice?"
+]
+
+ANSWER_OPENERS = [
+    "In my experience, {concept} is mainly about",
+    "I would describe {concept} as",
+    "The key idea behind {concept} is",
+    "When working with {concept}, I focus on"
+]
+
+ANSWER_FILLER = [
+    "balancing trade-offs between simplicity and flexibility",
+    "measuring results and iterating on what works",
+    "keeping the design easy to test and maintain",
+    "communicating clearly with the rest of the team",
+    "understanding the constraints before choosing an approach",
+    "documenting decisions so others can follow them",
+    "avoiding premature optimization while watching performance",
+    "learning from failures and adjusting the process"
+]
+
+
+class LoadTestConfig:
+    """Parameters for one load-test run"""
+
+    def __init__(self, sessions: int = 10, questions_per_session: int = 3, chat_turns: int = MAX_CHAT_TURNS,
+                 think_time: float = 1.0, think_jitter: float = 0.5, domains: Optional[List[str]] = None,
+                 difficulties: Optional[List[str]] = None, concurrency: Optional[int] = None,
+                 ramp_up: float = 0.0, sample_interval: float = 1.0, seed: Optional[int] = None,
+                 db_path: Optional[str] = None, max_live_sessions: Optional[int] = None):
+        self.sessions = sessions
+        self.questions_per_session = questions_per_session
+        self.chat_turns = min(chat_turns, MAX_CHAT_TURNS)
+        self.think_time = think_time
+        self.think_jitter = think_jitter
+        self.domains = domains or DOMAINS
+        self.difficulties = difficulties or DIFFICULTIES
+        self.concurrency = concurrency or sessions
+        self.ramp_up = ramp_up
+        self.sample_interval = sample_interval
+        self.seed = seed
+        # Database the sessions are written to; None keeps them out of any configured database
+        self.db_path = db_path
+        # Sessions the manager keeps in memory before evicting (default: $INTERVIEW_MAX_SESSIONS)
+        self.max_live_sessions = max_live_sessions
+
+
+class LatencyRecorder:
+    """Thread-safe latency samples and error counts per stage"""
+
+    def __init__(self):
+        self._samples: Dict[str, List[float]] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(stage, []).append(seconds)
+
+    def error(self, stage: str):
+        with self._lock:
+            self._errors[stage] = self._errors.get(stage, 0) + 1
+
+    def timed(self, stage: str, func: Callable, *args, **kwargs):
+        """Call func, recording its latency under `stage`"""
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            self.error(stage)
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+            errors = dict(self._errors)
+        report = {}
+        for stage, values in samples.items():
+            stats = {
+                "count": len(values),
+                "errors": errors.get(stage, 0),
+                "throughput_per_s": len(values) / elapsed if elapsed > 0 else 0.0,
+                "mean_ms": 1000 * sum(values) / len(values),
+                "max_ms": 1000 * values[-1]
+            }
+            for pct in PERCENTILES:
+                stats[f"p{pct}_ms"] = 1000 * percentile(values, pct)
+            report[stage] = stats
+        return report
+
+
+class ResourceSampler:
+    """Samples process CPU utilisation and RSS on a background thread"""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-test-sampler", daemon=True)
+        self._start = 0.0
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        last_wall, last_cpu = time.perf_counter(), time.process_time()
+        while not self._stop.wait(self.interval):
+            wall, cpu = time.perf_counter(), time.process_time()
+            self.samples.append({
+                "t": round(wall - self._start, 3),
+                # 100% = one fully busy core
+                "cpu_percent": 100 * (cpu - last_cpu) / max(wall - last_wall, 1e-9),
+                "rss_mb": current_rss_bytes() / (1024 * 1024),
+                "threads": threading.active_count()
+            })
+            last_wall, last_cpu = wall, cpu
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {}
+        cpu = [s["cpu_percent"] for s in self.samples]
+        rss = [s["rss_mb"] for s in self.samples]
+        return {
+            "cpu_percent_mean": sum(cpu) / len(cpu),
+            "cpu_percent_max": max(cpu),
+            "rss_mb_start": rss[0],
+            "rss_mb_end": rss[-1],
+            "rss_mb_max": max(rss)
+        }
+
+
+def synthetic_answer(rng: random.Random, concepts: List[str]) -> str:
+    """A plausible free-text answer mentioning a few domain concepts"""
+    mentioned = rng.sample(concepts, min(len(concepts), rng.randint(1, 4)))
+    sentences = [rng.choice(ANSWER_OPENERS).format(concept=mentioned[0]) + " " + rng.choice(ANSWER_FILLER) + "."]
+    for concept in mentioned[1:]:
+        sentences.append(f"It also relates to {concept}, which means {rng.choice(ANSWER_FILLER)}.")
+    for _ in range(rng.randint(0, 4)):
+        sentences.append(f"Another point is {rng.choice(ANSWER_FILLER)}.")
+    return " ".join(sentences)
+
+
+class SyntheticSession:
+    """One simulated candidate, driving an InterviewSession the way app.main does"""
+
+    def __init__(self, index: int, config: LoadTestConfig, recorder: LatencyRecorder, nlp, manager):
+        self.index = index
+        self.config = config
+        self.recorder = recorder
+        self.nlp = nlp
+        self.manager = manager
+        seed = None if config.seed is None else config.seed + index
+        self.rng = random.Random(seed)
+        self.domain = self.rng.choice(config.domains)
+        self.difficulty = self.rng.choice(config.difficulties)
+
+    def think(self):
+        if self.config.think_time > 0:
+            jitter = self.rng.uniform(-self.config.think_jitter, self.config.think_jitter)
+            time.sleep(max(0.0, self.config.think_time + jitter))
+
+    def run(self):
+        from .response_evaluator import get_domain_concepts
+
+        timed = self.recorder.timed
+        seed = None if self.config.seed is None else f"{self.config.seed}/{self.index}"
+        session_id = self.manager.create(seed).session_id
+        concepts = get_domain_concepts().get(self.domain) or [self.domain.lower()]
+
+        def act(name, action, *args):
+            # Looked up and pinned for every action, like each app rerun, so idle sessions may be evicted and restored
+            with self.manager.use(session_id) as session:
+                return timed(name, getattr(session, action), *args)
+
+        try:
+            session_start = time.perf_counter()
+            for position in range(self.config.questions_per_session):
+                # Start interview / next question
+                if position == 0:
+                    act("start", "start", self.domain, self.difficulty)
+                else:
+                    act("next_question", "next_question")
+                self.think()
+
+                # Answer submission: scoring, feedback and references
+                answer = synthetic_answer(self.rng, concepts)
+                act("submit_answer", "submit_answer", answer, self.nlp)
+
+                # Follow-up chat
+                for _ in range(self.config.chat_turns):
+                    self.think()
+                    act("ask", "ask", self.rng.choice(CHAT_PROMPTS))
+                self.think()
+            self.recorder.record("session", time.perf_counter() - session_start)
+        except Exception:
+            self.recorder.error("session")
+            traceback.print_exc()
+        finally:
+            self.manager.remove(session_id)
+
+
+def load_nlp():
+    """
+    Check the NLP resources as the app does at startup. Returns None: scoring
+    doesn't use spaCy, and the model manager loads models on first use
+    """
+    from .nlp_resources import get_nlp_resources
+    get_nlp_resources()
+    return None
+
+
+def run_load_test(config: LoadTestConfig, nlp=None) -> Dict[str, object]:
+    """Run `config.sessions` synthetic sessions and return the report"""
+    configure_resources()
+    nlp = nlp if nlp is not None else load_nlp()
+    from .interview_session import SessionManager
+    db = None
+    if config.db_path:
+        from .persistence import InterviewDatabase
+        db = InterviewDatabase(config.db_path)
+    # Sessions evicted without a database are spilled here rather than next to the app's
+    spill_dir = tempfile.TemporaryDirectory(prefix="load-test-sessions-")
+    manager = SessionManager(max_sessions=config.max_live_sessions, db=db, session_dir=spill_dir.name,
+                             persist=db is not None)
+    recorder = LatencyRecorder()
+    sampler = ResourceSampler(config.sample_interval)
+    sampler.start()
+    start = time.perf_counter()
+
+    def start_session(index: int):
+        if config.ramp_up > 0:
+            time.sleep(config.ramp_up * index / max(1, config.sessions))
+        SyntheticSession(index, config, recorder, nlp, manager).run()
+
+    try:
+        with ThreadPoolExecutor(max_workers=config.concurrency, thread_name_prefix="load-session") as pool:
+            list(pool.map(start_session, range(config.sessions)))
+    finally:
+        if db is not None:
+            db.close()
+        spill_dir.cleanup()
+
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+    report = _report("sessions", config, elapsed, recorder, sampler)
+    report["session_manager"] = manager.get_stats()
+    return report
+
+
+def run_app_test(config: LoadTestConfig, app_path: Optional[str] = None, timeout: float = 120.0) -> Dict[str, object]:
+    """
+    Drive app.py itself through Streamlit's in-process AppTest client, one
+    AppTest per simulated session. Slower, but covers the UI script as well.
+    """
+    from streamlit.testing.v1 import AppTest
+    from .persistence import DB_PATH_ENV
+    from .response_evaluator import get_domain_concepts
+
+    # The app under test runs in this process and persists to INTERVIEW_DB_PATH
+    if config.db_path:
+        os.environ[DB_PATH_ENV] = config.db_path
+    else:
+        os.environ.pop(DB_PATH_ENV, None)
+
+    app_path = app_path or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+    recorder = LatencyRecorder()
+    sampler = ResourceSampler(config.sample_interval)
+    sampler.start()
+    start = time.perf_counter()
+
+    def click(app, label: str):
+        button = next(b for b in app.button if b.label == label)
+        button.click().run()
+
+    def drive(index: int):
+        rng = random.Random(None if config.seed is None else config.seed + index)
+        try:
+            session_start = time.perf_counter()
+            app = AppTest.from_file(app_path, default_timeout=timeout)
+            recorder.timed("app_load", app.run)
+            recorder.timed("app_start_interview", click, app, "Start Interview")
+            domain = app.selectbox[0].value
+            concepts = get_domain_concepts().get(domain) or [domain.lower()]
+            for position in range(config.questions_per_session):
+                answer = synthetic_answer(rng, concepts)
+                app.text_area(key="user_input").input(answer)
+                recorder.timed("app_submit_answer", click, app, "Submit")
+                for _ in range(config.chat_turns):
+                    app.text_area(key="user_input").input(rng.choice(CHAT_PROMPTS))
+                    recorder.timed("app_chat_turn", click, app, "Ask")
+                if position < config.questions_per_session - 1:
+                    recorder.timed("app_next_question", click, app, "Next Question")
+            recorder.record("session", time.perf_counter() - session_start)
+        except Exception:
+            recorder.error("session")
+            traceback.print_exc()
+
+    with ThreadPoolExecutor(max_workers=config.concurrency, thread_name_prefix="load-app") as pool:
+        list(pool.map(drive, range(config.sessions)))
+
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+    return _report("app_test", config, elapsed, recorder, sampler)
+
+
+def _report(mode: str, config: LoadTestConfig, elapsed: float, recorder: LatencyRecorder,
+            sampler: ResourceSampler) -> Dict[str, object]:
+    return {
+        "mode": mode,
+        "sessions": config.sessions,
+        "concurrency": config.concurrency,
+        "elapsed_s": elapsed,
+        "stages": recorder.summary(elapsed),
+        "resources": sampler.summary(),
+        "timeline": sampler.samples
+    }
+
+
+def format_report(report: Dict[str, object]) -> str:
+    """Human-readable summary of a load-test report"""
+    lines = [
+        f"Mode: {report['mode']}  sessions: {report['sessions']}  concurrency: {report['concurrency']}  "
+        f"elapsed: {report['elapsed_s']:.1f}s",
+        "",
+        f"{'stage':<22}{'count':>7}{'err':>5}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    ]
+    for stage, stats in report["stages"].items():
+        lines.append(
+            f"{stage:<22}{stats['count']:>7}{stats['errors']:>5}{stats['throughput_per_s']:>9.2f}"
+            f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}"
+        )
+    manager = report.get("session_manager")
+    if manager:
+        lines += ["", f"Sessions: evicted {manager['evicted']}  restored {manager['restored']}"]
+        prefetch = manager.get("prefetch")
+        if prefetch:
+            lines[-1] += f"  prefetch hits {prefetch['hits']}  misses {prefetch['misses']}"
+    resources = report["resources"]
+    if resources:
+        lines += [
+            "",
+            f"CPU: mean {resources['cpu_percent_mean']:.0f}%  max {resources['cpu_percent_max']:.0f}%",
+            f"RSS: start {resources['rss_mb_start']:.0f} MB  end {resources['rss_mb_end']:.0f} MB  "
+            f"max {resources['rss_mb_max']:.0f} MB"
+        ]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent interview sessions")
+    parser.add_argument("--sessions", type=int, default=10, help="number of synthetic sessions")
+    parser.add_argument("--concurrency", type=int, default=None, help="sessions running at once (default: all)")
+    parser.add_argument("--questions", type=int, default=3, help="questions per session")
+    parser.add_argument("--chat-turns", type=int, default=MAX_CHAT_TURNS, help="follow-up chat turns per question")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean pause between user actions (seconds)")
+    parser.add_argument("--think-jitter", type=float, default=0.5, help="uniform jitter around the think time")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which sessions are started")
+    parser.add_argument("--domain", action="append", help="restrict to a domain (repeatable)")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="CPU/RSS sampling interval")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible sessions")
+    parser.add_argument("--app-test", action="store_true", help="drive app.py through streamlit.testing AppTest")
+    parser.add_argument("--json", help="write the full report (including the timeline) to this file")
+    parser.add_argument("--db", help="persist the synthetic sessions to this SQLite file (default: not persisted)")
+    parser.add_argument("--max-live-sessions", type=int, default=None,
+                        help="sessions kept in memory before the least recently used are evicted")
+    args = parser.parse_args(argv)
+
+    config = LoadTestConfig(
+        sessions=args.sessions, questions_per_session=args.questions, chat_turns=args.chat_turns,
+        think_time=args.think_time, think_jitter=args.think_jitter, domains=args.domain,
+        concurrency=args.concurrency, ramp_up=args.ramp_up, sample_interval=args.sample_interval,
+        seed=args.seed, db_path=args.db, max_live_sessions=args.max_live_sessions
+    )
+    report = run_app_test(config) if args.app_test else run_load_test(config)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
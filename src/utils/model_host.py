@@ -0,0 +1,403 @@
+"""
+Local model host shared by several app worker processes on one machine.
+
+The host process owns the sentence encoder and the spaCy pipeline and serves
+workers over a Unix socket. Each worker client allocates a shared-memory ring
+buffer and registers it with the host; embeddings are written by the host
+straight into that ring and handed back to the caller as numpy views, so they
+never go through the socket. Parses are returned as serialized spaCy Docs and
+rebuilt against a blank English vocabulary, which is all the parser-free
+client needs.
+
+    cd src && python -m utils.model_host serve --socket /tmp/interview-models.sock
+    export INTERVIEW_MODEL_HOST=/tmp/interview-models.sock   # in every worker
+
+`RemoteEncoder.encode` accepts the same arguments as SentenceTransformer.encode
+and `RemoteNLP` is callable like a spaCy Language, so ResponseEvaluator and
+TextProcessor use them unchanged. Arrays returned from the ring stay valid
+until the ring wraps around; copy them (`np.array(...)`) to keep them longer.
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .scheduler import ENCODE, INTERACTIVE, WorkScheduler, current_priority
+
+logger = logging.getLogger(__name__)
+
+MODEL_HOST_ENV = "INTERVIEW_MODEL_HOST"
+RING_BYTES_ENV = "INTERVIEW_MODEL_HOST_RING_MB"
+DEFAULT_SOCKET = "/tmp/interview-models.sock"
+DEFAULT_RING_MB = 32
+ENCODER_NAME = "all-MiniLM-L6-v2"
+
+# Parse requests with at least this many texts use spaCy's n_process workers; starting
+# them costs more than parsing a handful of answers
+PARALLEL_PARSE_MIN = 1000
+
+# Frame: json header length, binary payload length, then both
+_FRAME = struct.Struct("!II")
+
+
+def _send(sock: socket.socket, header: dict, payload: bytes = b""):
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(_FRAME.pack(len(data), len(payload)) + data + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if not count:
+            raise ConnectionError("model host connection closed")
+        received += count
+    return bytes(buffer)
+
+
+def _recv(sock: socket.socket) -> Tuple[dict, bytes]:
+    header_size, payload_size = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    header = json.loads(_recv_exact(sock, header_size))
+    payload = _recv_exact(sock, payload_size) if payload_size else b""
+    return header, payload
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to a client's segment without letting this process unlink it on exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers every attached segment with the resource tracker
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+# Host
+
+class ModelHost:
+    """Owns the models; encode and parse calls are serialized per model"""
+
+    def __init__(self, encoder_name: str = ENCODER_NAME):
+        from .resource_config import configure_resources
+        from .nlp_resources import NLPResources
+        from sentence_transformers import SentenceTransformer
+        # Parse batches fork this many spaCy workers (1 when the host shares the box with workers)
+        self.n_process = configure_resources().spacy_n_process
+        self.encoder = SentenceTransformer(encoder_name)
+        self.encoder_name = encoder_name
+        self.dimension = self.encoder.get_sentence_embedding_dimension()
+        # Loaded directly: load_spacy_model() would hand back a client for this very host
+        self.nlp = NLPResources(require_spacy=True).load_spacy()
+        # Serves one encode at a time, choosing between waiting workers by priority class
+        self.scheduler = WorkScheduler(ENCODE, capacity=1)
+        self._parse_lock = threading.Lock()
+        self.stats = {"clients": 0, "encode_requests": 0, "texts_encoded": 0, "parse_requests": 0,
+                      "inline_replies": 0}
+
+    def encode(self, texts: List[str], normalize: bool, batch_size: int,
+               priority_class: str = INTERACTIVE) -> np.ndarray:
+        with self.scheduler.slot(len(texts), priority_class):
+            embeddings = self.encoder.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                             normalize_embeddings=normalize)
+        self.stats["encode_requests"] += 1
+        self.stats["texts_encoded"] += len(texts)
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    def parse(self, texts: List[str]) -> List[bytes]:
+        with self._parse_lock:
+            n_process = self.n_process if len(texts) >= PARALLEL_PARSE_MIN else 1
+            docs = list(self.nlp.pipe(texts, n_process=n_process))
+        self.stats["parse_requests"] += 1
+        # Keep the payload small: the client only needs annotations, not tensors or user data
+        return [doc.to_bytes(exclude=["tensor", "user_data"]) for doc in docs]
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        host: ModelHost = self.server.host
+        ring: Optional[shared_memory.SharedMemory] = None
+        host.stats["clients"] += 1
+        try:
+            while True:
+                try:
+                    header, _ = _recv(self.request)
+                except (ConnectionError, struct.error):
+                    return
+                op = header.get("op")
+                try:
+                    if op == "hello":
+                        if ring is not None:
+                            ring.close()
+                        ring = _attach_shared_memory(header["shm"])
+                        _send(self.request, {"ok": True, "dimension": host.dimension, "model": host.encoder_name})
+                    elif op == "encode":
+                        embeddings = host.encode(header["texts"], header.get("normalize", False),
+                                                 header.get("batch_size", 32), header.get("priority", INTERACTIVE))
+                        offset, capacity = header.get("offset", 0), header.get("capacity", 0)
+                        if ring is not None and embeddings.nbytes <= capacity:
+                            target = np.ndarray(embeddings.shape, dtype=np.float32, buffer=ring.buf, offset=offset)
+                            target[...] = embeddings
+                            del target
+                            _send(self.request, {"ok": True, "shape": embeddings.shape, "shared": True})
+                        else:
+                            host.stats["inline_replies"] += 1
+                            _send(self.request, {"ok": True, "shape": embeddings.shape, "shared": False},
+                                  embeddings.tobytes())
+                    elif op == "parse":
+                        docs = host.parse(header["texts"])
+                        _send(self.request, {"ok": True, "sizes": [len(d) for d in docs]}, b"".join(docs))
+                    elif op == "stats":
+                        _send(self.request, {"ok": True, "stats": {**host.stats,
+                                                                   "scheduler": host.scheduler.get_stats()}})
+                    else:
+                        _send(self.request, {"ok": False, "error": f"unknown op {op!r}"})
+                except Exception as e:
+                    logger.exception("Model host request failed")
+                    _send(self.request, {"ok": False, "error": str(e)})
+        finally:
+            host.stats["clients"] -= 1
+            if ring is not None:
+                ring.close()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path: str = DEFAULT_SOCKET, encoder_name: str = ENCODER_NAME):
+    """Load the models and serve workers until interrupted"""
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            raise RuntimeError(f"A model host is already listening on {socket_path}")
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(socket_path)
+        finally:
+            probe.close()
+    host = ModelHost(encoder_name)
+    server = _Server(socket_path, _Handler)
+    server.host = host
+    os.chmod(socket_path, 0o600)
+    logger.info("Model host serving %s on %s", encoder_name, socket_path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+# Client
+
+class ModelHostError(RuntimeError):
+    """Raised when the model host rejects a request"""
+
+
+class ModelHostClient:
+    """Connection from one worker process to the model host"""
+
+    def __init__(self, socket_path: str, ring_bytes: Optional[int] = None):
+        self.socket_path = socket_path
+        ring_bytes = ring_bytes or int(os.environ.get(RING_BYTES_ENV, DEFAULT_RING_MB)) * 1024 * 1024
+        self.ring = shared_memory.SharedMemory(create=True, size=ring_bytes)
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self.dimension = 0
+        self.model = None
+        with self._lock:
+            self._connect()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.socket_path)
+        _send(sock, {"op": "hello", "shm": self.ring.name})
+        header, _ = _recv(sock)
+        self._sock = sock
+        self.dimension = header["dimension"]
+        self.model = header["model"]
+
+    def _request(self, header: dict) -> Tuple[dict, bytes]:
+        # Caller holds self._lock; reconnect once if the host was restarted
+        for attempt in (0, 1):
+            try:
+                if self._sock is None:
+                    self._connect()
+                _send(self._sock, header)
+                reply, payload = _recv(self._sock)
+                break
+            except (ConnectionError, BrokenPipeError, FileNotFoundError, OSError):
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+                if attempt:
+                    raise
+        if not reply.get("ok"):
+            raise ModelHostError(reply.get("error", "model host request failed"))
+        return reply, payload
+
+    def _reserve(self, nbytes: int) -> Tuple[int, int]:
+        """Next ring slot for nbytes, wrapping to the start; (offset, capacity)"""
+        if nbytes > self.ring.size:
+            return 0, 0
+        if self._cursor + nbytes > self.ring.size:
+            self._cursor = 0
+        offset = self._cursor
+        # Keep slots 64-byte aligned
+        self._cursor += (nbytes + 63) & ~63
+        return offset, nbytes
+
+    def encode(self, texts: List[str], normalize: bool = False, batch_size: int = 32) -> np.ndarray:
+        """(len(texts), dimension) float32 embeddings, as a view into the shared ring when they fit"""
+        with self._lock:
+            offset, capacity = self._reserve(len(texts) * self.dimension * 4)
+            reply, payload = self._request({"op": "encode", "texts": texts, "normalize": normalize,
+                                            "batch_size": batch_size, "offset": offset, "capacity": capacity,
+                                            "priority": current_priority()})
+        shape = tuple(reply["shape"])
+        if reply["shared"]:
+            view = np.ndarray(shape, dtype=np.float32, buffer=self.ring.buf, offset=offset)
+            view.flags.writeable = False
+            return view
+        return np.frombuffer(payload, dtype=np.float32).reshape(shape)
+
+    def parse(self, texts: List[str]) -> List[bytes]:
+        with self._lock:
+            reply, payload = self._request({"op": "parse", "texts": texts})
+        docs, start = [], 0
+        for size in reply["sizes"]:
+            docs.append(payload[start:start + size])
+            start += size
+        return docs
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return self._request({"op": "stats"})[0]["stats"]
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+        self.ring.close()
+        self.ring.unlink()
+
+
+class RemoteEncoder:
+    """Drop-in for SentenceTransformer.encode backed by the model host"""
+
+    def __init__(self, client: ModelHostClient):
+        self.client = client
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.client.dimension
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, show_progress_bar: Optional[bool] = None,
+               convert_to_numpy: bool = True, convert_to_tensor: bool = False,
+               normalize_embeddings: bool = False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            embeddings = np.zeros((0, self.client.dimension), dtype=np.float32)
+        else:
+            embeddings = self.client.encode(texts, normalize_embeddings, batch_size)
+        if single:
+            embeddings = embeddings[0]
+        if convert_to_tensor:
+            import torch
+            # Tensors outlive the ring slot, so they get their own copy
+            return torch.from_numpy(np.array(embeddings))
+        return embeddings
+
+
+class RemoteNLP:
+    """Callable like a spaCy pipeline; parsing happens in the model host"""
+
+    def __init__(self, client: ModelHostClient):
+        import spacy
+        self.client = client
+        self.vocab = spacy.blank("en").vocab
+
+    def __call__(self, text: str):
+        return next(iter(self.pipe([text])))
+
+    def pipe(self, texts, batch_size: int = 64, **kwargs):
+        from spacy.tokens import Doc
+        texts = list(texts)
+        for start in range(0, len(texts), batch_size):
+            for data in self.client.parse(texts[start:start + batch_size]):
+                yield Doc(self.vocab).from_bytes(data)
+
+
+_client: Optional[ModelHostClient] = None
+_remote_nlp: Optional[RemoteNLP] = None
+_client_lock = threading.Lock()
+
+
+def get_model_host_client() -> Optional[ModelHostClient]:
+    """Process-wide client, or None when INTERVIEW_MODEL_HOST is not set"""
+    global _client
+    socket_path = os.environ.get(MODEL_HOST_ENV)
+    if not socket_path:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ModelHostClient(socket_path)
+    return _client
+
+
+def get_remote_encoder() -> Optional[RemoteEncoder]:
+    client = get_model_host_client()
+    return RemoteEncoder(client) if client is not None else None
+
+
+def get_remote_nlp() -> Optional[RemoteNLP]:
+    global _remote_nlp
+    client = get_model_host_client()
+    if client is None:
+        return None
+    if _remote_nlp is None:
+        with _client_lock:
+            if _remote_nlp is None:
+                _remote_nlp = RemoteNLP(client)
+    return _remote_nlp
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve the encoder and spaCy pipeline to local workers")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_cmd = commands.add_parser("serve", help="load the models and listen on a Unix socket")
+    serve_cmd.add_argument("--socket", default=os.environ.get(MODEL_HOST_ENV, DEFAULT_SOCKET))
+    serve_cmd.add_argument("--encoder", default=ENCODER_NAME)
+    stats_cmd = commands.add_parser("stats", help="print counters from a running host")
+    stats_cmd.add_argument("--socket", default=os.environ.get(MODEL_HOST_ENV, DEFAULT_SOCKET))
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        logging.basicConfig(level=logging.INFO)
+        serve(args.socket, args.encoder)
+    else:
+        client = ModelHostClient(args.socket, ring_bytes=1024 * 1024)
+        try:
+            print(json.dumps(client.stats(), indent=2))
+        finally:
+            client.close()
+
+
+if __name__ == "__main__":
+    main()
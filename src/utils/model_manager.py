@@ -0,0 +1,260 @@
+"""
+Memory-budgeted residency for the models a worker loads.
+
+Models (the sentence encoder, the spaCy pipeline) are registered with a
+loader and fetched with `get_model_manager().get(name)`; nothing else keeps a
+long-lived reference, so an evicted model is really freed. The manager
+records each model's footprint (parameter and buffer bytes for torch modules,
+otherwise the RSS growth while loading) and when it was last used. It evicts:
+
+- the least recently used other models when loading or using one would exceed
+  the budget ($INTERVIEW_MODEL_MEMORY_MB, unlimited by default);
+- any model unused for $INTERVIEW_MODEL_IDLE_TIMEOUT seconds (off by default),
+  checked by a background thread.
+
+Evicted models are reloaded on their next use. Loads, evictions and reloads
+are logged and kept as recent events for `get_stats()`.
+
+    export INTERVIEW_MODEL_MEMORY_MB=400 INTERVIEW_MODEL_IDLE_TIMEOUT=600
+"""
+
+import ctypes
+import ctypes.util
+import gc
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from .metrics import current_rss_bytes
+from .profiling import stage
+from .scheduler import ScheduledEncoder
+
+logger = logging.getLogger(__name__)
+
+MEMORY_BUDGET_ENV = "INTERVIEW_MODEL_MEMORY_MB"
+IDLE_TIMEOUT_ENV = "INTERVIEW_MODEL_IDLE_TIMEOUT"
+MAX_EVENTS = 200
+
+# Registered names of the built-in models
+ENCODER = "encoder"
+SPACY = "spacy"
+
+
+def model_footprint(model) -> int:
+    """Bytes held by a torch module's parameters and buffers (0 for anything else)"""
+    total = 0
+    for attribute in ("parameters", "buffers"):
+        tensors = getattr(model, attribute, None)
+        if not callable(tensors):
+            return 0
+        try:
+            total += sum(t.numel() * t.element_size() for t in tensors())
+        except TypeError:
+            return 0
+    return total
+
+
+_LIBC = ctypes.util.find_library("c")
+
+
+def _release_memory():
+    """Return freed heap pages to the OS where the allocator supports it (glibc)"""
+    gc.collect()
+    if _LIBC:
+        try:
+            ctypes.CDLL(_LIBC).malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+class _Entry:
+    __slots__ = ("name", "loader", "model", "footprint", "last_used", "loads", "evictions", "lock")
+
+    def __init__(self, name: str, loader: Callable[[], object], size_hint: int = 0):
+        self.name = name
+        self.loader = loader
+        self.model = None
+        self.footprint = size_hint
+        self.last_used = 0.0
+        self.loads = 0
+        self.evictions = 0
+        # Held while loading so concurrent first uses load the model once
+        self.lock = threading.Lock()
+
+
+class ModelManager:
+    """Loads registered models on demand and keeps their total footprint within a budget"""
+
+    def __init__(self, budget_bytes: Optional[int] = None, idle_timeout: Optional[float] = None):
+        if budget_bytes is None:
+            budget_bytes = int(float(os.environ.get(MEMORY_BUDGET_ENV, 0)) * 1024 * 1024)
+        self.budget_bytes = budget_bytes
+        self.idle_timeout = idle_timeout if idle_timeout is not None else \
+            float(os.environ.get(IDLE_TIMEOUT_ENV, 0))
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+        self.events: deque = deque(maxlen=MAX_EVENTS)
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def register(self, name: str, loader: Callable[[], object], size_hint: int = 0):
+        """Register (or replace) a model loader; `size_hint` is the expected footprint in bytes"""
+        with self._lock:
+            previous = self._entries.get(name)
+            self._entries[name] = _Entry(name, loader, size_hint)
+        if previous is not None and previous.model is not None:
+            previous.model = None
+            _release_memory()
+
+    def get(self, name: str):
+        """The model, loading (or reloading) it if it is not resident"""
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"no model registered as {name!r}")
+        entry.last_used = time.monotonic()
+        model = entry.model
+        if model is not None:
+            return model
+        with entry.lock:
+            if entry.model is None:
+                self._make_room(entry.footprint, keep=entry)
+                self._load(entry)
+                self._make_room(0, keep=entry)
+            return entry.model
+
+    def _load(self, entry: _Entry):
+        started = time.perf_counter()
+        rss_before = current_rss_bytes()
+        with stage(f"load:{entry.name}"):
+            model = entry.loader()
+        footprint = model_footprint(model) or max(0, current_rss_bytes() - rss_before) or entry.footprint
+        with self._lock:
+            entry.model = model
+            entry.footprint = footprint
+            entry.last_used = time.monotonic()
+            entry.loads += 1
+        self._event("reload" if entry.loads > 1 else "load", entry, load_ms=round(1000 * (time.perf_counter() - started), 1))
+        self._start_sweeper()
+
+    def _make_room(self, needed: int, keep: _Entry):
+        """Evict least recently used models (other than `keep`) until `needed` more bytes fit"""
+        if not self.budget_bytes:
+            return
+        with self._lock:
+            resident = sorted((e for e in self._entries.values() if e.model is not None and e is not keep),
+                              key=lambda e: e.last_used)
+            total = self.resident_bytes()
+            for entry in resident:
+                if total + needed <= self.budget_bytes:
+                    break
+                total -= entry.footprint
+                self._evict(entry, "budget")
+            if total + needed > self.budget_bytes:
+                self._event("over_budget", keep, resident_bytes=total + needed)
+
+    def _evict(self, entry: _Entry, reason: str):
+        entry.model = None
+        entry.evictions += 1
+        self._event("evict", entry, reason=reason)
+        _release_memory()
+
+    def evict(self, name: str) -> bool:
+        """Evict a model now; returns whether it was resident"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.model is None:
+                return False
+            self._evict(entry, "manual")
+            return True
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Evict models unused for longer than the idle timeout"""
+        if not self.idle_timeout:
+            return 0
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.model is not None and now - entry.last_used >= self.idle_timeout:
+                    self._evict(entry, "idle")
+                    evicted += 1
+        return evicted
+
+    def _start_sweeper(self):
+        if not self.idle_timeout or self._sweeper is not None:
+            return
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep, name="interview-model-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def _sweep(self):
+        interval = min(max(self.idle_timeout / 4, 1.0), 60.0)
+        while not self._stop.wait(interval):
+            self.evict_idle()
+
+    def _event(self, event: str, entry: _Entry, **fields):
+        record = {"time": time.time(), "event": event, "model": entry.name, "bytes": entry.footprint, **fields}
+        self.events.append(record)
+        logger.info("Model %s %s (%.1f MB) %s", entry.name, event, entry.footprint / 1e6,
+                    " ".join(f"{k}={v}" for k, v in fields.items()))
+
+    def resident_bytes(self) -> int:
+        return sum(e.footprint for e in self._entries.values() if e.model is not None)
+
+    def is_resident(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        return entry is not None and entry.model is not None
+
+    def get_stats(self, events: int = 10) -> Dict[str, object]:
+        """Residency per model, the budget and the most recent load/eviction events"""
+        now = time.monotonic()
+        with self._lock:
+            models = {
+                e.name: {"resident": e.model is not None, "mb": round(e.footprint / 1e6, 1),
+                         "idle_s": round(now - e.last_used, 1) if e.last_used else None,
+                         "loads": e.loads, "evictions": e.evictions}
+                for e in self._entries.values()
+            }
+            recent: List[dict] = list(self.events)[-events:] if events else []
+        return {"budget_mb": round(self.budget_bytes / 1e6, 1) if self.budget_bytes else None,
+                "idle_timeout_s": self.idle_timeout or None,
+                "resident_mb": round(self.resident_bytes() / 1e6, 1),
+                "models": models, "events": recent}
+
+    def close(self):
+        self._stop.set()
+
+
+def _load_encoder():
+    from .model_host import ENCODER_NAME, get_remote_encoder
+    remote = get_remote_encoder()
+    if remote is not None:
+        return ScheduledEncoder(remote)
+    from sentence_transformers import SentenceTransformer
+    return ScheduledEncoder(SentenceTransformer(ENCODER_NAME))
+
+
+def _load_spacy():
+    from .nlp_resources import get_nlp_resources
+    return get_nlp_resources().load_spacy()
+
+
+_manager: Optional[ModelManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_model_manager() -> ModelManager:
+    """Process-wide manager with the encoder and spaCy pipeline registered"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                manager = ModelManager()
+                manager.register(ENCODER, _load_encoder)
+                manager.register(SPACY, _load_spacy)
+                _manager = manager
+    return _manager
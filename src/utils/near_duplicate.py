@@ -0,0 +1,161 @@
+"""
+Near-duplicate answer detection with MinHash signatures and LSH buckets.
+
+Candidates often paste the same canned answers and retries resubmit almost
+identical text. For every question we keep MinHash signatures of scored
+answers in LSH buckets; a new answer whose estimated Jaccard similarity to a
+scored one is above the threshold reuses that evaluation instead of running
+the transformer again.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Mersenne prime for the universal hash family; a * h stays below 2**62 so uint64 never overflows
+_PRIME = (1 << 31) - 1
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Word n-gram shingles of the lowercased text (single words for short texts)"""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """Computes fixed-length MinHash signatures with numpy"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        tokens = shingles(text)
+        if not tokens:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=4).digest(), "little") % _PRIME
+             for t in tokens],
+            dtype=np.uint64
+        )
+        # (a * h + b) mod p for every permutation x shingle at once
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+
+def estimate_similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(sig_a == sig_b))
+
+
+class _QuestionIndex:
+    """Signatures and LSH buckets for the answers to one question"""
+
+    __slots__ = ("signatures", "results", "buckets")
+
+    def __init__(self, bands: int):
+        self.signatures: List[np.ndarray] = []
+        self.results: List[object] = []
+        self.buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+
+
+class NearDuplicateIndex:
+    """
+    Per-question MinHash/LSH index mapping answers to previously computed results.
+    With `bands` x `rows` = `num_perm`, a pair with Jaccard similarity s becomes a
+    candidate with probability 1 - (1 - s^rows)^bands; candidates are then checked
+    against the exact signature similarity threshold.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 32,
+                 max_questions: int = 5000, max_answers_per_question: int = 500):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_questions = max_questions
+        self.max_answers_per_question = max_answers_per_question
+        self.hasher = MinHasher(num_perm)
+        self._questions: "OrderedDict[str, _QuestionIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "hits": 0, "candidates_checked": 0, "inserts": 0}
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def lookup(self, question: str, response: str) -> Tuple[Optional[object], float, np.ndarray]:
+        """
+        Return (cached result, similarity, signature) for the closest scored answer above
+        the threshold, or (None, 0.0, signature). Pass the signature back to `add`.
+        """
+        signature = self.hasher.signature(response)
+        with self._lock:
+            self.stats["lookups"] += 1
+            index = self._questions.get(question)
+            if index is None:
+                return None, 0.0, signature
+            self._questions.move_to_end(question)
+
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates.update(index.buckets[band].get(key, ()))
+            self.stats["candidates_checked"] += len(candidates)
+
+            best, best_similarity = None, 0.0
+            for candidate in candidates:
+                similarity = estimate_similarity(signature, index.signatures[candidate])
+                if similarity > best_similarity:
+                    best, best_similarity = candidate, similarity
+            if best is not None and best_similarity >= self.threshold:
+                self.stats["hits"] += 1
+                return index.results[best], best_similarity, signature
+        return None, best_similarity, signature
+
+    def add(self, question: str, signature: np.ndarray, result: object):
+        """Index a freshly scored answer"""
+        with self._lock:
+            index = self._questions.get(question)
+            if index is None:
+                index = _QuestionIndex(self.bands)
+                self._questions[question] = index
+                if len(self._questions) > self.max_questions:
+                    self._questions.popitem(last=False)
+            if len(index.signatures) >= self.max_answers_per_question:
+                return
+            position = len(index.signatures)
+            index.signatures.append(signature)
+            index.results.append(result)
+            for band, key in enumerate(self._band_keys(signature)):
+                index.buckets[band].setdefault(key, []).append(position)
+            self.stats["inserts"] += 1
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+            stats["questions_indexed"] = len(self._questions)
+            return stats
+
+
+_index: Optional[NearDuplicateIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    """Process-wide index shared by all sessions"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDuplicateIndex()
+    return _index
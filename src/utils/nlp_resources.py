@@ -0,0 +1,227 @@
+"""
+Offline resolution of the NLTK corpora and spaCy model the app needs.
+
+All resources are resolved once per process, from a local bundle directory
+when one is configured (INTERVIEW_NLP_BUNDLE) and otherwise from the standard
+NLTK data paths and installed spaCy packages. Nothing is downloaded at
+runtime: a missing resource raises NLPResourceError straight away, naming what
+is missing and how to build the bundle, instead of hanging on a download.
+
+    cd src && python -m utils.nlp_resources build --output ../build/nlp
+    INTERVIEW_NLP_BUNDLE=../build/nlp python -m utils.nlp_resources check
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+from typing import Dict, List, Optional
+
+BUNDLE_ENV = "INTERVIEW_NLP_BUNDLE"
+# Same variable as model_host.MODEL_HOST_ENV; not imported to keep this module dependency-free
+MODEL_HOST_ENV = "INTERVIEW_MODEL_HOST"
+SPACY_MODEL = "en_core_web_sm"
+
+# NLTK download id -> resource path passed to nltk.data.find
+NLTK_RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "averaged_perceptron_tagger": "taggers/averaged_perceptron_tagger",
+    "wordnet": "corpora/wordnet",
+    "stopwords": "corpora/stopwords"
+}
+
+
+class NLPResourceError(RuntimeError):
+    """Raised when required NLTK data or spaCy models are not available locally"""
+
+    def __init__(self, missing: List[str], searched: List[str]):
+        self.missing = missing
+        self.searched = searched
+        super().__init__(
+            f"Missing NLP resources: {', '.join(missing)}. Searched: {', '.join(searched) or '(nothing)'}. "
+            f"Build a bundle with `cd src && python -m utils.nlp_resources build --output DIR` "
+            f"and set {BUNDLE_ENV}=DIR."
+        )
+
+
+def nltk_resources() -> Dict[str, str]:
+    """Required NLTK resources for the installed NLTK version"""
+    import nltk
+    resources = dict(NLTK_RESOURCES)
+    # NLTK >= 3.8.2 loads sentence tokenizer parameters from punkt_tab instead of pickles
+    if hasattr(nltk.tokenize, "PunktTokenizer"):
+        resources["punkt_tab"] = "tokenizers/punkt_tab"
+    return resources
+
+
+class NLPResources:
+    """Resolved locations of every required resource"""
+
+    def __init__(self, bundle_dir: Optional[str] = None, spacy_model: str = SPACY_MODEL,
+                 require_spacy: Optional[bool] = None):
+        bundle_dir = bundle_dir or os.environ.get(BUNDLE_ENV)
+        self.bundle_dir = os.path.abspath(bundle_dir) if bundle_dir else None
+        self.spacy_model = spacy_model
+        # Workers that parse through the model host don't need the model locally
+        self.require_spacy = require_spacy if require_spacy is not None else not os.environ.get(MODEL_HOST_ENV)
+        self.paths: Dict[str, str] = {}
+        self._resolved = False
+        self._lock = threading.Lock()
+
+    @property
+    def nltk_data_dir(self) -> Optional[str]:
+        return os.path.join(self.bundle_dir, "nltk_data") if self.bundle_dir else None
+
+    @property
+    def spacy_model_dir(self) -> Optional[str]:
+        return os.path.join(self.bundle_dir, "spacy", self.spacy_model) if self.bundle_dir else None
+
+    def resolve(self) -> Dict[str, str]:
+        """Locate every resource once; raises NLPResourceError listing everything missing"""
+        if self._resolved:
+            return self.paths
+        with self._lock:
+            if self._resolved:
+                return self.paths
+            import nltk
+
+            missing, searched, paths = [], [], {}
+            if self.nltk_data_dir:
+                if not os.path.isdir(self.nltk_data_dir):
+                    raise NLPResourceError(["bundle directory " + self.nltk_data_dir], [])
+                # Search the bundle first; NLTK never downloads on a miss, it raises LookupError
+                if self.nltk_data_dir not in nltk.data.path:
+                    nltk.data.path.insert(0, self.nltk_data_dir)
+            searched.extend(nltk.data.path)
+            for name, resource in nltk_resources().items():
+                try:
+                    paths[f"nltk:{name}"] = str(nltk.data.find(resource))
+                except LookupError:
+                    missing.append(f"nltk:{name}")
+
+            model_path = self._find_spacy_model() if self.require_spacy else None
+            if model_path:
+                paths[f"spacy:{self.spacy_model}"] = model_path
+            elif self.require_spacy:
+                missing.append(f"spacy:{self.spacy_model}")
+                if self.spacy_model_dir:
+                    searched.append(self.spacy_model_dir)
+
+            if missing:
+                raise NLPResourceError(missing, searched)
+            self.paths = paths
+            self._resolved = True
+            return paths
+
+    def _find_spacy_model(self) -> Optional[str]:
+        if self.spacy_model_dir and os.path.isfile(os.path.join(self.spacy_model_dir, "config.cfg")):
+            return self.spacy_model_dir
+        import spacy
+        if spacy.util.is_package(self.spacy_model):
+            return str(spacy.util.get_package_path(self.spacy_model))
+        return None
+
+    def load_spacy(self):
+        """Load the spaCy model from its resolved location"""
+        import spacy
+        from .resource_config import configure_resources
+        configure_resources()
+        return spacy.load(self.resolve()[f"spacy:{self.spacy_model}"])
+
+
+_resources: Optional[NLPResources] = None
+_resources_lock = threading.Lock()
+
+
+def get_nlp_resources() -> NLPResources:
+    """Process-wide resources, resolved on first use"""
+    global _resources
+    if _resources is None:
+        with _resources_lock:
+            if _resources is None:
+                resources = NLPResources()
+                resources.resolve()
+                _resources = resources
+    return _resources
+
+
+def load_spacy_model():
+    """
+    The process-wide spaCy pipeline, loaded from the resolved location through
+    the model manager (so it can be evicted when idle or over budget; don't keep
+    the returned object longer than needed), or a client for the model host
+    when INTERVIEW_MODEL_HOST is set
+    """
+    if os.environ.get(MODEL_HOST_ENV):
+        from .model_host import get_remote_nlp
+        return get_remote_nlp()
+    from .model_manager import SPACY, get_model_manager
+    get_nlp_resources()
+    return get_model_manager().get(SPACY)
+
+
+def build_bundle(output_dir: str, spacy_model: str = SPACY_MODEL) -> Dict[str, object]:
+    """
+    Download every required resource into `output_dir` (run this where network
+    access is available) and write a manifest with the library versions used.
+    """
+    import nltk
+    import spacy
+
+    output_dir = os.path.abspath(output_dir)
+    nltk_dir = os.path.join(output_dir, "nltk_data")
+    os.makedirs(nltk_dir, exist_ok=True)
+    for name in nltk_resources():
+        if not nltk.download(name, download_dir=nltk_dir, quiet=True, raise_on_error=True):
+            raise RuntimeError(f"Could not download NLTK resource {name!r}")
+
+    if not spacy.util.is_package(spacy_model):
+        spacy.cli.download(spacy_model)
+        # Newly installed packages are not importable until the import caches are refreshed
+        import importlib
+        importlib.invalidate_caches()
+    model_dir = os.path.join(output_dir, "spacy", spacy_model)
+    if os.path.isdir(model_dir):
+        shutil.rmtree(model_dir)
+    nlp = spacy.load(spacy_model)
+    nlp.to_disk(model_dir)
+
+    manifest = {
+        "nltk_version": nltk.__version__,
+        "nltk_resources": sorted(nltk_resources()),
+        "spacy_version": spacy.__version__,
+        "spacy_model": spacy_model,
+        "spacy_model_version": nlp.meta.get("version")
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build or check the offline NLP resource bundle")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="download all resources into a bundle directory")
+    build.add_argument("--output", required=True, help="bundle directory to create")
+    check = commands.add_parser("check", help="resolve all resources without downloading")
+    check.add_argument("--bundle", help=f"bundle directory (default: ${BUNDLE_ENV})")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        manifest = build_bundle(args.output)
+        print(json.dumps(manifest, indent=2))
+        print(f"Bundle written to {os.path.abspath(args.output)}; set {BUNDLE_ENV} to use it.")
+        return
+    try:
+        paths = NLPResources(args.bundle).resolve()
+    except NLPResourceError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    for name, path in paths.items():
+        print(f"{name:<40} {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+SQLite persistence for interview sessions and results.
+
+The database runs in WAL mode so several app processes can read while one
+writes. Writes go through a write-behind queue drained by a background
+thread in batched transactions, so request threads never wait on disk.
+Reads use per-thread connections and covering indexes: resuming a session
+and fetching a candidate's history are each a single indexed query.
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DB_PATH_ENV = "INTERVIEW_DB_PATH"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    candidate_id TEXT,
+    domain TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT '{}',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_candidate ON sessions (candidate_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated_at);
+
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    shared_content TEXT,
+    score REAL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_messages_created ON messages (created_at);
+
+CREATE TABLE IF NOT EXISTS questions (
+    session_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    topic TEXT,
+    asked_at REAL NOT NULL,
+    PRIMARY KEY (session_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_questions_asked ON questions (asked_at);
+
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    candidate_id TEXT,
+    question_position INTEGER NOT NULL,
+    domain TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    response TEXT NOT NULL,
+    score REAL NOT NULL,
+    semantic_similarity REAL,
+    relevance_score REAL,
+    quality_score REAL,
+    found_concepts TEXT NOT NULL DEFAULT '[]',
+    feedback TEXT,
+    created_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_answers_session ON answers (session_id, question_position);
+CREATE INDEX IF NOT EXISTS idx_answers_candidate ON answers (candidate_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_answers_created ON answers (created_at);
+
+CREATE TABLE IF NOT EXISTS chat_turns (
+    session_id TEXT NOT NULL,
+    question_position INTEGER NOT NULL,
+    turn INTEGER NOT NULL,
+    user_text TEXT NOT NULL,
+    response_text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, question_position, turn)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_chat_turns_created ON chat_turns (created_at);
+"""
+
+_STOP = object()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=OFF")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class InterviewDatabase:
+    """SQLite store with a write-behind queue for inserts and updates"""
+
+    def __init__(self, path: str, batch_size: int = 200, flush_interval: float = 0.05,
+                 max_pending: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        writer = _connect(path)
+        writer.executescript(SCHEMA)
+        writer.commit()
+        self._writer = writer
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._local = threading.local()
+        self.batches_written = 0
+        self.rows_written = 0
+        self._thread = threading.Thread(target=self._drain, name="interview-db-writer", daemon=True)
+        self._thread.start()
+
+    # Write-behind queue
+
+    def _enqueue(self, sql: str, params: tuple):
+        # Blocks only when the writer has fallen max_pending statements behind
+        self._queue.put((sql, params))
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                return
+
+    def _write_batch(self, batch: List[Tuple[str, tuple]]):
+        try:
+            with self._writer:
+                # Group consecutive identical statements into executemany calls
+                start = 0
+                while start < len(batch):
+                    sql = batch[start][0]
+                    end = start
+                    while end < len(batch) and batch[end][0] == sql:
+                        end += 1
+                    self._writer.executemany(sql, [params for _, params in batch[start:end]])
+                    start = end
+            self.batches_written += 1
+            self.rows_written += len(batch)
+        except sqlite3.Error:
+            logger.exception("Dropped a batch of %d interview writes", len(batch))
+
+    def flush(self):
+        """Block until every queued write has been committed"""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._writer.close()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @property
+    def pending_writes(self) -> int:
+        return self._queue.qsize()
+
+    # Writes
+
+    def save_session(self, session_id: str, domain: str, difficulty: str,
+                     candidate_id: Optional[str] = None, state: Optional[dict] = None):
+        now = time.time()
+        self._enqueue(
+            "INSERT INTO sessions (id, candidate_id, domain, difficulty, state, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET candidate_id=excluded.candidate_id, domain=excluded.domain, "
+            "difficulty=excluded.difficulty, state=excluded.state, updated_at=excluded.updated_at",
+            (session_id, candidate_id, domain, difficulty, json.dumps(state or {}), now, now)
+        )
+
+    def update_session_state(self, session_id: str, state: dict):
+        self._enqueue(
+            "UPDATE sessions SET state = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(state), time.time(), session_id)
+        )
+
+    def record_message(self, session_id: str, seq: int, role: str, content: str,
+                       shared_content: Optional[str] = None, score: Optional[float] = None):
+        self._enqueue(
+            "INSERT OR REPLACE INTO messages (session_id, seq, role, content, shared_content, score, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session_id, seq, role, content, shared_content, score, time.time())
+        )
+
+    def record_question(self, session_id: str, position: int, text: str, topic: Optional[str] = None):
+        self._enqueue(
+            "INSERT OR REPLACE INTO questions (session_id, position, text, topic, asked_at) VALUES (?, ?, ?, ?, ?)",
+            (session_id, position, text, topic, time.time())
+        )
+
+    def record_answer(self, session_id: str, question_position: int, domain: str, difficulty: str,
+                      response: str, result: Dict[str, object], candidate_id: Optional[str] = None):
+        """Store an answer with the component scores from evaluate_response_components"""
+        self._enqueue(
+            "INSERT OR REPLACE INTO answers (session_id, candidate_id, question_position, domain, difficulty, "
+            "response, score, semantic_similarity, relevance_score, quality_score, found_concepts, feedback, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (session_id, candidate_id, question_position, domain, difficulty, response,
+             float(result["score"]), result.get("semantic_similarity"), result.get("relevance_score"),
+             result.get("quality_score"), json.dumps(list(result.get("found_concepts") or [])),
+             result.get("feedback"), time.time())
+        )
+
+    def record_chat_turn(self, session_id: str, question_position: int, turn: int,
+                         user_text: str, response_text: str):
+        self._enqueue(
+            "INSERT OR REPLACE INTO chat_turns (session_id, question_position, turn, user_text, response_text, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, question_position, turn, user_text, response_text, time.time())
+        )
+
+    # Reads
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def load_session(self, session_id: str) -> Optional[dict]:
+        """
+        Session metadata plus its full transcript, in one query over the
+        session primary key and the (session_id, seq) message key
+        """
+        rows = self._reader().execute(
+            "SELECT s.id, s.candidate_id, s.domain, s.difficulty, s.state, s.created_at, s.updated_at, "
+            "m.seq, m.role, m.content, m.shared_content, m.score "
+            "FROM sessions s LEFT JOIN messages m ON m.session_id = s.id "
+            "WHERE s.id = ? ORDER BY m.seq",
+            (session_id,)
+        ).fetchall()
+        if not rows:
+            return None
+        first = rows[0]
+        return {
+            "id": first["id"],
+            "candidate_id": first["candidate_id"],
+            "domain": first["domain"],
+            "difficulty": first["difficulty"],
+            "state": json.loads(first["state"]),
+            "created_at": first["created_at"],
+            "updated_at": first["updated_at"],
+            "messages": [
+                {"role": r["role"], "content": r["content"], "shared_content": r["shared_content"], "score": r["score"]}
+                for r in rows if r["seq"] is not None
+            ]
+        }
+
+    def candidate_history(self, candidate_id: str, limit: Optional[int] = None) -> List[dict]:
+        """All scored answers for a candidate, oldest first (uses idx_answers_candidate)"""
+        sql = ("SELECT session_id, question_position, domain, difficulty, score, semantic_similarity, "
+               "relevance_score, quality_score, found_concepts, created_at "
+               "FROM answers WHERE candidate_id = ? ORDER BY created_at")
+        params: tuple = (candidate_id,)
+        if limit:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return [dict(row) for row in self._reader().execute(sql, params)]
+
+    def iter_answers(self, since_id: int = 0, batch_size: int = 1000):
+        """Stream answers with id > since_id in id order, a batch at a time"""
+        last_id = since_id
+        while True:
+            rows = self._reader().execute(
+                "SELECT * FROM answers WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = rows[-1]["id"]
+
+
+_database: Optional[InterviewDatabase] = None
+_database_lock = threading.Lock()
+
+
+def get_database(path: Optional[str] = None) -> Optional[InterviewDatabase]:
+    """
+    Process-wide database, or None when persistence is not configured
+    (set INTERVIEW_DB_PATH to enable it)
+    """
+    global _database
+    path = path or os.environ.get(DB_PATH_ENV)
+    if not path:
+        return None
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                _database = InterviewDatabase(path)
+    return _database
@@ -0,0 +1,179 @@
+"""
+Speculative prefetch of a session's next steps.
+
+Once an answer is scored, the candidate spends a while reading the feedback
+before clicking "Next Question" or one of the suggested follow-ups. A single
+background worker uses that time to prepare both: the next question record
+(generated from the session's own seeded stream, so it is exactly the question
+the click would produce, with its topic, reference ids and knowledge key
+derived and its embedding loaded from the artifact or encoded at batch
+priority) and the chat replies to the suggested follow-ups for the current
+question.
+
+Results are keyed by session and checked against the session's position,
+question and content generation before they are used, so a stale or
+cancelled prefetch is simply ignored and the click computes synchronously.
+At most `max_sessions` results are held; the oldest are dropped first.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+
+from .chat_agents import get_rule_based_chat_response
+from .content_packs import get_content_snapshot
+from .question_generator import Question, generate_question_record
+from .scheduler import BATCH, priority
+
+PREFETCH_ENV = "INTERVIEW_PREFETCH"
+PREFETCH_MAX_ENV = "INTERVIEW_PREFETCH_MAX_SESSIONS"
+DEFAULT_MAX_SESSIONS = 256
+
+# Offered as buttons in the follow-up chat
+SUGGESTED_QUESTIONS = (
+    "Can you explain this concept in simpler terms?",
+    "What are the key best practices?",
+    "Can you provide a concrete example?",
+    "What are common challenges or pitfalls?"
+)
+
+
+class PrefetchResult:
+    """Precomputed next question and follow-up replies for one session step"""
+
+    __slots__ = ("position", "generation", "domain", "difficulty", "current", "next_question", "replies")
+
+    def __init__(self, position: int, generation: int, domain: str, difficulty: str, current: Question,
+                 next_question: Question, replies: Dict[str, str]):
+        self.position = position
+        self.generation = generation
+        self.domain = domain
+        self.difficulty = difficulty
+        self.current = current
+        self.next_question = next_question
+        self.replies = replies
+
+
+def _prefetch(domain: str, difficulty: str, current: Question, previous_questions: Tuple[str, ...],
+              rng, suggestions: Sequence[str]) -> PrefetchResult:
+    generation = get_content_snapshot().generation
+    next_question = generate_question_record(domain, difficulty, list(previous_questions), rng)
+    # Scoring the next answer then finds the question embedding ready
+    from .response_evaluator import precompute_question_embedding
+    with priority(BATCH):
+        precompute_question_embedding(next_question)
+    replies = {text: get_rule_based_chat_response(text, current, domain) for text in suggestions}
+    return PrefetchResult(len(previous_questions), generation, domain, difficulty, current, next_question, replies)
+
+
+class Prefetcher:
+    """One worker thread preparing next steps for many sessions, with a bounded result table"""
+
+    def __init__(self, max_sessions: Optional[int] = None, suggestions: Sequence[str] = SUGGESTED_QUESTIONS):
+        self.max_sessions = max_sessions or int(os.environ.get(PREFETCH_MAX_ENV, DEFAULT_MAX_SESSIONS))
+        self.suggestions = tuple(suggestions)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="interview-prefetch")
+        # session id -> future, oldest first
+        self._pending: "OrderedDict[str, Future]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.scheduled = 0
+        self.hits = 0
+        self.misses = 0
+        self.dropped = 0
+
+    def schedule(self, session) -> Future:
+        """Start preparing the next question and follow-up replies of a session in the chat phase"""
+        future = self._executor.submit(
+            _prefetch, session.domain, session.difficulty, session.question, tuple(session.store.questions),
+            session.store.rng(f"question/{len(session.store.questions)}"), self.suggestions
+        )
+        with self._lock:
+            previous = self._pending.pop(session.session_id, None)
+            if previous is not None:
+                previous.cancel()
+            self._pending[session.session_id] = future
+            while len(self._pending) > self.max_sessions:
+                _, oldest = self._pending.popitem(last=False)
+                oldest.cancel()
+                self.dropped += 1
+            self.scheduled += 1
+        return future
+
+    def cancel(self, session_id: str):
+        """Drop a session's prefetch, stopping it if it hasn't started"""
+        with self._lock:
+            future = self._pending.pop(session_id, None)
+        if future is not None:
+            future.cancel()
+
+    def _result(self, session_id: str) -> Optional[PrefetchResult]:
+        with self._lock:
+            future = self._pending.get(session_id)
+        # A running prefetch finishes sooner than starting over; a queued one is not waited for
+        if future is None or not (future.running() or future.done()):
+            return None
+        try:
+            return future.result()
+        except CancelledError:
+            return None
+        except Exception:
+            # The synchronous path reports the error with the user's action
+            return None
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def next_question(self, session) -> Optional[Question]:
+        """The prefetched next question if it is still valid for the session, consuming the result"""
+        result = self._result(session.session_id)
+        valid = result is not None and result.position == len(session.store.questions) \
+            and result.domain == session.domain and result.difficulty == session.difficulty \
+            and result.generation == get_content_snapshot().generation
+        self.cancel(session.session_id)
+        self._count(valid)
+        return result.next_question if valid else None
+
+    def reply(self, session, message: str) -> Optional[str]:
+        """The prefetched reply to a suggested follow-up about the session's current question"""
+        if message not in self.suggestions:
+            return None
+        result = self._result(session.session_id)
+        valid = result is not None and result.current is session.question \
+            and result.generation == get_content_snapshot().generation
+        self._count(valid)
+        return result.replies[message] if valid else None
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"pending": len(self._pending), "max_sessions": self.max_sessions, "scheduled": self.scheduled,
+                    "hits": self.hits, "misses": self.misses, "dropped": self.dropped}
+
+    def close(self):
+        with self._lock:
+            futures = list(self._pending.values())
+            self._pending.clear()
+        for future in futures:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+
+
+_prefetcher: Optional[Prefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> Optional[Prefetcher]:
+    """Process-wide prefetcher; None when disabled with INTERVIEW_PREFETCH=0"""
+    global _prefetcher
+    if os.environ.get(PREFETCH_ENV) == "0":
+        return None
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = Prefetcher()
+    return _prefetcher
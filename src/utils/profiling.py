@@ -0,0 +1,397 @@
+"""
+On-demand profiling of individual units of work (a scored answer, an API request).
+
+Profiling is off until something asks for it: a forced request (`"profile": true`
+on an API call), a session listed in $INTERVIEW_PROFILE_SESSIONS or enabled at
+runtime, or the sampling rate $INTERVIEW_PROFILE_RATE (fraction of units, default
+0). When none applies, `Profiler.profile` and `stage` return a shared no-op
+context manager, so the hooks cost a global lookup.
+
+A profiled unit produces, under $INTERVIEW_PROFILE_DIR (default: the system temp
+directory):
+
+    <run>.cpu.collapsed      CPU stacks in collapsed format (microseconds), rooted
+                             at the unit and the pipeline stage, for flamegraph.pl,
+                             speedscope or inferno
+    <run>.alloc.collapsed    bytes allocated and still alive at the end of the unit,
+                             by allocation traceback (tracemalloc)
+    <run>.json               wall time, time and peak memory per stage, top allocations
+    <run>.prof               pstats dump (cprofile mode only)
+
+Two CPU modes are available ($INTERVIEW_PROFILE_MODE): "sample" (default) reads
+the profiled thread's stack every few milliseconds from a helper thread, with
+little overhead; "cprofile" traces every call, switching to a separate
+profiler per stage. Allocation tracing slows allocation-heavy Python code
+several times over; set $INTERVIEW_PROFILE_MEMORY=0 for CPU profiles only.
+tracemalloc and the sampler see the whole process, so allocations of
+concurrent requests can show up in a busy server. Only one unit is profiled at
+a time; units arriving meanwhile run unprofiled.
+
+    with get_profiler().profile("evaluate", session_id=session_id):
+        with stage("semantic_similarity"):
+            ...
+"""
+
+import contextlib
+import cProfile
+import itertools
+import json
+import os
+import pstats
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PROFILE_DIR_ENV = "INTERVIEW_PROFILE_DIR"
+PROFILE_RATE_ENV = "INTERVIEW_PROFILE_RATE"
+PROFILE_SESSIONS_ENV = "INTERVIEW_PROFILE_SESSIONS"
+PROFILE_MODE_ENV = "INTERVIEW_PROFILE_MODE"
+PROFILE_MEMORY_ENV = "INTERVIEW_PROFILE_MEMORY"
+
+MODES = ("sample", "cprofile")
+SAMPLE_INTERVAL = 0.002
+TRACEMALLOC_FRAMES = 16
+TOP_ALLOCATIONS = 20
+MAX_STACK_DEPTH = 256
+
+_NULL = contextlib.nullcontext()
+# Units being profiled; checked first so disabled hooks return immediately
+_active = 0
+_local = threading.local()
+
+
+def stage(name: str):
+    """Tag the enclosed work with a pipeline stage in the current profile (no-op when not profiling)"""
+    if not _active:
+        return _NULL
+    run = getattr(_local, "run", None)
+    if run is None:
+        return _NULL
+    return run.stage(name)
+
+
+def _frame_label(name: str, filename: str, lineno: int) -> str:
+    label = f"{name} ({os.path.basename(filename)}:{lineno})" if lineno else name
+    # ';' separates frames and ' ' the value in collapsed stacks
+    return label.replace(";", ":")
+
+
+def _write_collapsed(path: str, stacks: Dict[str, float], scale: float = 1.0):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, value in sorted(stacks.items()):
+            amount = int(round(value * scale))
+            if amount > 0:
+                f.write(f"{stack} {amount}\n")
+
+
+def collapse_stats(stats: dict, prefix: str, out: Dict[str, float], min_fraction: float = 1e-4):
+    """
+    Add the call graph of a pstats `stats` table to `out` as collapsed stacks
+    (seconds of self time per stack). Each function's time is split across its
+    callers in proportion to the cumulative time recorded on each call edge;
+    recursive edges and paths below `min_fraction` of the total are dropped.
+    """
+    callees: Dict[tuple, List[Tuple[tuple, float]]] = defaultdict(list)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller].append((func, edge[3]))
+    roots = [func for func, entry in stats.items() if not any(caller in stats for caller in entry[4])]
+    total = sum(stats[func][3] for func in roots)
+    threshold = total * min_fraction
+
+    def visit(func: tuple, share: float, stack: List[str], on_path: set):
+        _, _, self_time, cumulative, _ = stats[func]
+        fraction = share / cumulative if cumulative > 0 else 0.0
+        stack.append(_frame_label(func[2], func[0], func[1]))
+        on_path.add(func)
+        if self_time * fraction > 0:
+            out[";".join(stack)] += self_time * fraction
+        if len(stack) < MAX_STACK_DEPTH:
+            for callee, edge_time in callees.get(func, ()):
+                if callee not in on_path and edge_time * fraction >= threshold:
+                    visit(callee, edge_time * fraction, stack, on_path)
+        on_path.discard(func)
+        stack.pop()
+
+    for root in roots:
+        visit(root, stats[root][3], [prefix], set())
+
+
+class _Sampler:
+    """Samples one thread's Python stack from a helper thread"""
+
+    def __init__(self, run: "ProfileRun", interval: float):
+        self.run = run
+        self.interval = interval
+        self.stacks: Dict[str, float] = defaultdict(float)
+        self.samples = 0
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="interview-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _loop(self):
+        target = self.run.thread_id
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                label = self._labels.get(code)
+                if label is None:
+                    label = self._labels[code] = _frame_label(code.co_name, code.co_filename, code.co_firstlineno)
+                labels.append(label)
+                frame = frame.f_back
+            labels.reverse()
+            self.stacks[";".join(self.run.stage_path + tuple(labels))] += now - last
+            self.samples += 1
+            last = now
+
+
+class ProfileRun:
+    """One profiled unit: CPU profile, allocation snapshot and per-stage timings"""
+
+    def __init__(self, unit: str, session_id: Optional[str], path: str, mode: str,
+                 interval: float = SAMPLE_INTERVAL, memory: bool = True):
+        self.unit = unit
+        self.session_id = session_id
+        self.path = path
+        self.mode = mode
+        self.interval = interval
+        self.memory = memory
+        self.thread_id = threading.get_ident()
+        # Current stage path, replaced (never mutated) so the sampler reads it consistently
+        self.stage_path: Tuple[str, ...] = (unit,)
+        self.stage_times: Dict[str, float] = defaultdict(float)
+        self.stage_calls: Dict[str, int] = defaultdict(int)
+        self.stage_peaks: Dict[str, int] = defaultdict(int)
+        self._profiles: Dict[Tuple[str, ...], cProfile.Profile] = {}
+        self._peaks: List[int] = []
+        self._sampler: Optional[_Sampler] = None
+        self._owns_tracemalloc = False
+        self._baseline = None
+        self._base_memory = 0
+        self._started = 0.0
+        self.wall_time = 0.0
+
+    # cProfile mode keeps one profiler per stage path so stacks can be rooted at the stage
+
+    def _profile_for(self, path: Tuple[str, ...]) -> cProfile.Profile:
+        profile = self._profiles.get(path)
+        if profile is None:
+            profile = self._profiles[path] = cProfile.Profile()
+        return profile
+
+    def start(self):
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                self._owns_tracemalloc = True
+            self._baseline = tracemalloc.take_snapshot()
+            self._base_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+        self._started = time.perf_counter()
+        if self.mode == "cprofile":
+            self._profile_for(self.stage_path).enable()
+        else:
+            self._sampler = _Sampler(self, self.interval)
+            self._sampler.start()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        parent = self.stage_path
+        path = parent + (name,)
+        if self.mode == "cprofile":
+            self._profile_for(parent).disable()
+            self._profile_for(path).enable()
+        if self.memory:
+            self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+        self.stage_path = path
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            key = ";".join(path[1:])
+            self.stage_times[key] += time.perf_counter() - started
+            self.stage_calls[key] += 1
+            self.stage_path = parent
+            if self.memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                self.stage_peaks[key] = max(self.stage_peaks[key], peak - self._base_memory)
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            if self.mode == "cprofile":
+                self._profile_for(path).disable()
+                self._profile_for(parent).enable()
+
+    def stop(self):
+        """Stop profiling and write the output files"""
+        self.wall_time = time.perf_counter() - self._started
+        cpu: Dict[str, float] = defaultdict(float)
+        if self.mode == "cprofile":
+            self._profile_for(self.stage_path).disable()
+            combined = None
+            for path, profile in self._profiles.items():
+                profile.create_stats()
+                if not profile.stats:
+                    continue
+                stats = pstats.Stats(profile)
+                collapse_stats(stats.stats, ";".join(path), cpu)
+                if combined is None:
+                    combined = stats
+                else:
+                    combined.add(profile)
+            if combined is not None:
+                combined.dump_stats(self.path + ".prof")
+        else:
+            self._sampler.stop()
+            cpu = self._sampler.stacks
+
+        summary = {
+            "unit": self.unit,
+            "session_id": self.session_id,
+            "mode": self.mode,
+            "wall_ms": round(1000 * self.wall_time, 3),
+            "stages": {
+                key: {"ms": round(1000 * seconds, 3), "calls": self.stage_calls[key],
+                      **({"peak_bytes": self.stage_peaks[key]} if self.memory else {})}
+                for key, seconds in self.stage_times.items()
+            },
+            "files": {"cpu": self.path + ".cpu.collapsed"}
+        }
+        if self._sampler is not None:
+            summary["samples"] = self._sampler.samples
+        else:
+            summary["files"]["pstats"] = self.path + ".prof"
+        _write_collapsed(summary["files"]["cpu"], cpu, scale=1e6)
+
+        if self.memory:
+            summary["memory"] = self._write_allocations(summary)
+        with open(self.path + ".json", "w") as f:
+            json.dump(summary, f, indent=2)
+
+    def _write_allocations(self, summary: dict) -> dict:
+        peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+        snapshot = tracemalloc.take_snapshot()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        exclude = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diffs = snapshot.filter_traces(exclude).compare_to(self._baseline.filter_traces(exclude), "traceback")
+        allocations: Dict[str, float] = defaultdict(float)
+        top = []
+        for diff in diffs:
+            if diff.size_diff <= 0:
+                continue
+            frames = [f"{os.path.basename(frame.filename)}:{frame.lineno}".replace(";", ":")
+                      for frame in diff.traceback]
+            allocations[";".join([self.unit] + frames)] += diff.size_diff
+            if len(top) < TOP_ALLOCATIONS:
+                top.append({"where": frames[-1] if frames else "?", "size_bytes": diff.size_diff,
+                            "count": diff.count_diff})
+        summary["files"]["allocations"] = self.path + ".alloc.collapsed"
+        _write_collapsed(summary["files"]["allocations"], allocations)
+        return {"peak_bytes": peak - self._base_memory, "allocated_bytes": int(sum(allocations.values())),
+                "top": top}
+
+
+class Profiler:
+    """Decides which units to profile and runs them, one at a time per process"""
+
+    def __init__(self, directory: Optional[str] = None, rate: Optional[float] = None,
+                 sessions: Optional[Iterable[str]] = None, mode: Optional[str] = None,
+                 interval: float = SAMPLE_INTERVAL, memory: Optional[bool] = None):
+        self.directory = directory or os.environ.get(PROFILE_DIR_ENV) or \
+            os.path.join(tempfile.gettempdir(), "interview_profiles")
+        self.rate = rate if rate is not None else float(os.environ.get(PROFILE_RATE_ENV, 0))
+        if sessions is None:
+            sessions = [s for s in os.environ.get(PROFILE_SESSIONS_ENV, "").split(",") if s.strip()]
+        self.sessions = {s.strip() for s in sessions}
+        self.mode = mode or os.environ.get(PROFILE_MODE_ENV, "sample")
+        if self.mode not in MODES:
+            raise ValueError(f"unknown profiling mode {self.mode!r}; expected one of {', '.join(MODES)}")
+        self.interval = interval
+        self.memory = memory if memory is not None else os.environ.get(PROFILE_MEMORY_ENV) != "0"
+        self._busy = threading.Lock()
+        self._counter = itertools.count()
+        self.runs = 0
+        self.skipped = 0
+
+    def enable_session(self, session_id: str):
+        self.sessions.add(session_id)
+
+    def disable_session(self, session_id: str):
+        self.sessions.discard(session_id)
+
+    def should_profile(self, session_id: Optional[str] = None, force: bool = False) -> bool:
+        return force or (session_id is not None and session_id in self.sessions) or \
+            (self.rate > 0 and random.random() < self.rate)
+
+    def profile(self, unit: str, session_id: Optional[str] = None, force: bool = False):
+        """
+        Context manager profiling the enclosed unit of work when it is selected;
+        yields the ProfileRun (its `path` prefixes the output files) or None
+        """
+        if not self.should_profile(session_id, force) or getattr(_local, "run", None) is not None:
+            return _NULL
+        if not self._busy.acquire(blocking=False):
+            self.skipped += 1
+            return _NULL
+        return self._run(unit, session_id)
+
+    @contextlib.contextmanager
+    def _run(self, unit: str, session_id: Optional[str]):
+        global _active
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(self._counter)}-{unit}"
+            if session_id:
+                name += f"-{os.path.basename(session_id)[:16]}"
+            run = ProfileRun(unit, session_id, os.path.join(self.directory, name), self.mode,
+                             self.interval, self.memory)
+            _local.run = run
+            _active += 1
+            try:
+                run.start()
+                yield run
+            finally:
+                _local.run = None
+                _active -= 1
+                run.stop()
+                self.runs += 1
+        finally:
+            self._busy.release()
+
+    def get_stats(self) -> Dict[str, object]:
+        return {"directory": self.directory, "mode": self.mode, "memory": self.memory, "rate": self.rate,
+                "sessions": len(self.sessions), "runs": self.runs, "skipped": self.skipped}
+
+
+_profiler: Optional[Profiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> Profiler:
+    """Process-wide profiler configured from the environment"""
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = Profiler()
+    return _profiler
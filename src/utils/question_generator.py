@@ -1,5 +1,96 @@
 import random
-from typing import List, Optional
+import threading
+from typing import Dict, List, Optional, Tuple
+from .chat_agents import find_knowledge_topic
+from .content_compiler import load_content_artifact
+from .content_packs import get_content_snapshot
+from .references import (extract_topic_from_question, get_topic_references, references_from_ids,
+                         topic_reference_ids)
+
+
+class Question:
+    """
+    An immutable generated question with everything downstream stages need:
+    its template and concepts, the canonical topic, the relevant reference ids,
+    the chat knowledge key and its row in the compiled content artifact.
+    `str(question)` is the question text.
+    """
+
+    __slots__ = ("text", "template_id", "domain", "difficulty", "concept", "related_concept",
+                 "topic", "reference_ids", "knowledge_key", "artifact_version", "artifact_id",
+                 "content_generation")
+
+    def __init__(self, text: str, template_id: Optional[str], domain: str, difficulty: str,
+                 concept: Optional[str] = None, related_concept: Optional[str] = None,
+                 topic: Optional[str] = None, reference_ids: Tuple[Tuple[str, int], ...] = (),
+                 knowledge_key: Optional[str] = None, artifact_version: Optional[str] = None,
+                 artifact_id: Optional[int] = None, content_generation: Optional[int] = None):
+        for name, value in zip(self.__slots__, (text, template_id, domain, difficulty, concept, related_concept,
+                                                topic, reference_ids, knowledge_key, artifact_version, artifact_id,
+                                                content_generation)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Question is immutable")
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"Question({self.text!r}, template_id={self.template_id!r})"
+
+    @property
+    def references(self) -> dict:
+        """Relevant references by category, as `get_topic_references` returns them"""
+        # The ids index the content packs they were taken from; after a reload, look them up again
+        if self.content_generation != get_content_snapshot().generation:
+            return get_topic_references(self.domain, self.topic)
+        return references_from_ids(self.domain, self.reference_ids)
+
+    @property
+    def embedding(self):
+        """Normalized question embedding from the compiled artifact, or None"""
+        artifact = load_content_artifact()
+        if artifact is None or self.artifact_id is None or artifact.version != self.artifact_version \
+                or artifact.question_embeddings is None:
+            return None
+        return artifact.question_embeddings[self.artifact_id]
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__
+                if name not in ("artifact_version", "content_generation")}
+
+
+# Records are shared by every session asking the same question; dropped when content packs change
+_questions: Dict[Tuple[str, str, str], Question] = {}
+_questions_generation = None
+_questions_lock = threading.Lock()
+
+
+def make_question(text: str, template_id: Optional[str], domain: str, difficulty: str,
+                  concept: Optional[str] = None, related_concept: Optional[str] = None) -> Question:
+    """The shared Question record for a question text, deriving its metadata on first use"""
+    global _questions_generation
+    generation = get_content_snapshot().generation
+    key = (domain, difficulty, text)
+    question = _questions.get(key) if _questions_generation == generation else None
+    if question is None:
+        topic = extract_topic_from_question(text)
+        artifact = load_content_artifact()
+        question = Question(
+            text, template_id, domain, difficulty, concept, related_concept, topic,
+            reference_ids=topic_reference_ids(domain, topic),
+            knowledge_key=find_knowledge_topic(text, domain),
+            artifact_version=artifact.version if artifact else None,
+            artifact_id=artifact.question_id(text) if artifact else None,
+            content_generation=generation
+        )
+        with _questions_lock:
+            if _questions_generation != generation:
+                _questions.clear()
+                _questions_generation = generation
+            question = _questions.setdefault(key, question)
+    return question
 
 class QuestionGenerator:
     def __init__(self):
@@ -172,10 +263,19 @@ class QuestionGenerator:
             }
         }
 
-    def generate_question(self, domain: str, difficulty: str, previous_questions: Optional[List[str]] = None) -> str:
+        # Domains defined (or overridden) by external content packs
+        for pack in get_content_snapshot().packs.values():
+            self.question_templates[pack.domain] = pack.question_templates
+            self.domain_concepts[pack.domain] = pack.question_concepts
+
+    def generate(self, domain: str, difficulty: str, previous_questions: Optional[List[str]] = None,
+                 rng: Optional[random.Random] = None) -> "Question":
         """
-        Generate a domain-specific question using templates and concepts
+        Generate a domain-specific question using templates and concepts, as a
+        Question record with its template id, concepts, topic and artifact handles.
+        Pass a seeded `rng` for reproducible questions; the global random module is used otherwise.
         """
+        rng = rng or random
         if previous_questions is None:
             previous_questions = []
             
@@ -188,7 +288,8 @@ class QuestionGenerator:
 
         # Select template
         domain_templates = self.question_templates[domain][difficulty]
-        template = random.choice(domain_templates)
+        template = rng.choice(domain_templates)
+        template_id = f"{domain}/{difficulty}/{domain_templates.index(template)}"
 
         # Select concepts
         domain_data = self.domain_concepts[domain]
@@ -200,31 +301,94 @@ class QuestionGenerator:
         while attempts < max_attempts:
             if "{related_concept}" in template:
                 # Select a pair of related concepts
-                concept_pair = random.choice(domain_data["related_pairs"])
-                question = template.format(concept=concept_pair[0], related_concept=concept_pair[1])
+                concept, related_concept = rng.choice(domain_data["related_pairs"])
+                question = template.format(concept=concept, related_concept=related_concept)
             else:
                 # Select a single concept
-                concept = random.choice(domain_data["concepts"])
+                concept, related_concept = rng.choice(domain_data["concepts"]), None
                 question = template.format(concept=concept)
 
             # Check if this question is unique
             if question not in previous_questions:
-                return question
+                return make_question(question, template_id, domain, difficulty, concept, related_concept)
                 
             attempts += 1
         
         # If we couldn't generate a unique question after max attempts,
         # modify a question slightly to make it different
         if "{related_concept}" in template:
-            concept_pair = random.choice(domain_data["related_pairs"])
-            return template.format(concept=concept_pair[0], related_concept=concept_pair[1]) + " (Please provide more specific details in your answer.)"
+            concept, related_concept = rng.choice(domain_data["related_pairs"])
+            question = template.format(concept=concept, related_concept=related_concept) + " (Please provide more specific details in your answer.)"
         else:
-            concept = random.choice(domain_data["concepts"])
-            return template.format(concept=concept) + " (Include specific examples in your answer.)"
+            concept, related_concept = rng.choice(domain_data["concepts"]), None
+            question = template.format(concept=concept) + " (Include specific examples in your answer.)"
+        return make_question(question, template_id, domain, difficulty, concept, related_concept)
+
+    def generate_question(self, domain: str, difficulty: str, previous_questions: Optional[List[str]] = None,
+                          rng: Optional[random.Random] = None) -> str:
+        """
+        Generate a domain-specific question using templates and concepts.
+        Pass a seeded `rng` for reproducible questions; the global random module is used otherwise.
+        """
+        return self.generate(domain, difficulty, previous_questions, rng).text
+
+    def enumerate_questions(self) -> List[Dict[str, str]]:
+        """
+        Enumerate every question the templates can produce, with stable template ids
+        """
+        questions = []
+        for domain, difficulties in self.question_templates.items():
+            domain_data = self.domain_concepts[domain]
+            for difficulty, templates in difficulties.items():
+                for index, template in enumerate(templates):
+                    template_id = f"{domain}/{difficulty}/{index}"
+                    if "{related_concept}" in template:
+                        for concept, related_concept in domain_data["related_pairs"]:
+                            questions.append({
+                                "template_id": template_id,
+                                "domain": domain,
+                                "difficulty": difficulty,
+                                "concept": concept,
+                                "related_concept": related_concept,
+                                "text": template.format(concept=concept, related_concept=related_concept)
+                            })
+                    else:
+                        for concept in domain_data["concepts"]:
+                            questions.append({
+                                "template_id": template_id,
+                                "domain": domain,
+                                "difficulty": difficulty,
+                                "concept": concept,
+                                "related_concept": None,
+                                "text": template.format(concept=concept)
+                            })
+        return questions
 
-def generate_question(domain: str, difficulty: str, previous_questions: Optional[List[str]] = None) -> str:
+def question_record(text: str, domain: str, difficulty: str) -> Question:
+    """
+    The Question record for a question text that was not generated in this
+    process (e.g. a restored session); template and concepts are looked up
+    in the compiled artifact when available
+    """
+    artifact = load_content_artifact()
+    artifact_id = artifact.question_id(text) if artifact else None
+    if artifact_id is not None:
+        entry = artifact.questions[artifact_id]
+        return make_question(text, entry["template_id"], domain, difficulty, entry["concept"], entry["related_concept"])
+    return make_question(text, None, domain, difficulty)
+
+def generate_question(domain: str, difficulty: str, previous_questions: Optional[List[str]] = None,
+                      rng: Optional[random.Random] = None) -> str:
     """
     Wrapper function for question generation
     """
     generator = QuestionGenerator()
-    return generator.generate_question(domain, difficulty, previous_questions) 
\ No newline at end of file
+    return generator.generate_question(domain, difficulty, previous_questions, rng)
+
+def generate_question_record(domain: str, difficulty: str, previous_questions: Optional[List[str]] = None,
+                             rng: Optional[random.Random] = None) -> Question:
+    """
+    Like generate_question, but returns the Question record
+    """
+    generator = QuestionGenerator()
+    return generator.generate(domain, difficulty, previous_questions, rng)
\ No newline at end of file
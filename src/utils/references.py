@@ -1,5 +1,9 @@
 """Module for managing references and learning resources."""
 
+from typing import Tuple
+
+from .content_packs import get_content_snapshot
+
 # Comprehensive references database
 REFERENCES = {
     "Software Development": {
@@ -59,38 +63,45 @@ REFERENCES = {
 
 def get_domain_references(domain: str) -> dict:
     """Get all references for a specific domain."""
+    pack = get_content_snapshot().get(domain)
+    if pack is not None:
+        return pack.references
     return REFERENCES.get(domain, {})
 
-def get_topic_references(domain: str, topic: str = None) -> dict:
-    """Get references filtered by domain and topic."""
-    domain_refs = REFERENCES.get(domain, {})
+def topic_reference_ids(domain: str, topic: str = None) -> Tuple[Tuple[str, int], ...]:
+    """(category, position) of every reference relevant to a topic, so a question can carry them"""
+    domain_refs = get_domain_references(domain)
     if not topic:
-        return domain_refs
+        return tuple((category, i) for category, refs in domain_refs.items() for i in range(len(refs)))
     
-    # Convert topic to lowercase for case-insensitive matching
-    topic_lower = topic.lower()
+    # Split topic into lowercase words for case-insensitive matching
+    topic_words = [word for word in topic.lower().split() if len(word) > 3]
     
-    # Split topic into individual words for better matching
-    topic_words = topic_lower.split()
-    
-    # Filter references by topic relevance
-    filtered_refs = {}
+    ids = []
     for category, refs in domain_refs.items():
-        filtered_items = []
-        for ref in refs:
-            # Consider a match if any topic word is in the title
-            ref_title_lower = ref['title'].lower()
-            if any(word in ref_title_lower for word in topic_words if len(word) > 3):
-                filtered_items.append(ref)
+        # Consider a match if any topic word is in the title
+        matches = [i for i, ref in enumerate(refs) if any(word in ref['title'].lower() for word in topic_words)]
         
         # If no matches found, include at least some default references
-        if not filtered_items and len(refs) > 0:
+        if not matches and len(refs) > 0:
             # Just take the first item as a default
-            filtered_items.append(refs[0])
-        
-        filtered_refs[category] = filtered_items
-    
-    return filtered_refs
+            matches = [0]
+        ids.extend((category, i) for i in matches)
+    return tuple(ids)
+
+def references_from_ids(domain: str, reference_ids: Tuple[Tuple[str, int], ...]) -> dict:
+    """References by category for ids from topic_reference_ids"""
+    domain_refs = get_domain_references(domain)
+    refs = {category: [] for category in domain_refs}
+    for category, position in reference_ids:
+        refs[category].append(domain_refs[category][position])
+    return refs
+
+def get_topic_references(domain: str, topic: str = None) -> dict:
+    """Get references filtered by domain and topic."""
+    if not topic:
+        return get_domain_references(domain)
+    return references_from_ids(domain, topic_reference_ids(domain, topic))
 
 def format_reference_for_display(ref: dict) -> str:
     """Format a reference entry for display."""
@@ -101,9 +112,10 @@ def format_reference_for_display(ref: dict) -> str:
     else:
         return f"- {ref['title']}"
 
-def get_improvement_suggestions(domain: str, topic: str = None, score: float = None) -> list:
+def get_improvement_suggestions(domain: str, topic: str = None, score: float = None, refs: dict = None) -> list:
     """Get personalized improvement suggestions based on domain, topic, and score."""
-    refs = get_topic_references(domain, topic)
+    if refs is None:
+        refs = get_topic_references(domain, topic)
     suggestions = []
     
     # Add score-based suggestions
@@ -125,4 +137,117 @@ def get_improvement_suggestions(domain: str, topic: str = None, score: float = N
             if refs.get('papers'):
                 suggestions.append(f"📄 Advanced Reading: {refs['papers'][-1]['title']}")
     
-    return suggestions 
\ No newline at end of file
+    return suggestions 
+
+def extract_topic_from_question(question):
+    """Extract the main topic from a question for better reference matching"""
+    # Simple extraction based on keywords
+    question_lower = question.lower()
+    
+    # Common topics by domain
+    topics = {
+        "Software Development": ["microservices", "design patterns", "architecture", "testing", 
+                              "refactoring", "clean code", "agile", "version control", 
+                              "api", "database", "interface", "debugging", "solid", "object-oriented",
+                              "framework", "library", "dependency", "exception", "distributed system"],
+        "Data Science": ["machine learning", "algorithm", "data", "features", "model", 
+                      "classification", "regression", "clustering", "neural", "statistics",
+                      "visualization", "prediction", "training", "supervised", "unsupervised",
+                      "overfitting", "normalization", "exploratory", "missing data", "bias-variance",
+                      "deep learning", "random forest", "sentiment analysis"],
+        "Marketing": ["campaign", "audience", "segmentation", "brand", "digital", 
+                   "content", "strategy", "social media", "analytics", "conversion",
+                   "inbound", "outbound", "marketing funnel", "swot", "roi", 
+                   "a/b testing", "retention", "competitive analysis", "b2b", "b2c",
+                   "omnichannel"]
+    }
+    for pack in get_content_snapshot().packs.values():
+        topics[pack.domain] = pack.topics
+    
+    # Search for multi-word topics first (more specific)
+    found_topics = []
+    for domain, domain_topics in topics.items():
+        for topic in domain_topics:
+            if " " in topic:  # Multi-word topic
+                if topic in question_lower:
+                    found_topics.append(topic)
+    
+    # If no multi-word topics found, try single words
+    if not found_topics:
+        for domain, domain_topics in topics.items():
+            for topic in domain_topics:
+                if " " not in topic and topic in question_lower:
+                    found_topics.append(topic)
+    
+    # If still no topics found, extract key nouns based on common patterns in questions
+    if not found_topics:
+        # Extract topic after "concept of", "principles of", etc.
+        patterns = ["concept of ", "purpose of ", "principles of ", "difference between ", "explain ", "describe "]
+        for pattern in patterns:
+            if pattern in question_lower:
+                # Get the words following the pattern
+                after_pattern = question_lower.split(pattern)[1].split()
+                # Take first 2-3 words as potential topic
+                potential_topic = " ".join(after_pattern[:3])
+                found_topics.append(potential_topic)
+                break
+    
+    # If all else fails, use longest words in the question as they're often domain-specific terms
+    if not found_topics:
+        words = question_lower.split()
+        # Filter out short words and get the longest ones
+        long_words = [word for word in words if len(word) > 5]
+        if long_words:
+            # Sort by length (descending) and take the top 2
+            long_words.sort(key=len, reverse=True)
+            found_topics = long_words[:2]
+    
+    return " ".join(found_topics) if found_topics else None
+
+def format_references_as_text(domain, topic=None, score=None, refs=None):
+    """
+    Format references as text to be included directly in feedback.
+    Pass `refs` (e.g. `Question.references`) to skip the topic lookup.
+    """
+    # Get references
+    if refs is None:
+        refs = get_topic_references(domain, topic)
+    
+    # Get improvement suggestions
+    suggestions = get_improvement_suggestions(domain, topic, score, refs)
+    
+    # Format the text
+    result = ""
+    
+    # Add improvement suggestions
+    if suggestions:
+        result += "\n\n🔍 **Improvement Tips:**\n" + "\n".join(suggestions)
+    
+    # Add references
+    result += "\n\n📚 **Learning Resources:**"
+    
+    # Check if there are any references to display
+    has_references = False
+    
+    for category, items in refs.items():
+        if items:  # Only show categories with items
+            has_references = True
+            result += f"\n**{category.replace('_', ' ').title()}**:\n"
+            for item in items[:2]:  # Limit to 2 items per category
+                result += format_reference_for_display(item) + "\n"
+    
+    # If no specific references found, include some general domain references
+    if not has_references:
+        # Add default references based on domain
+        result += "\n**Recommended Resources**:\n"
+        if domain == "Software Development":
+            result += "- [Clean Code by Robert C. Martin](https://www.amazon.com/Clean-Code-Handbook-Software-Craftsmanship/dp/0132350882)\n"
+            result += "- [Design Patterns: Elements of Reusable Object-Oriented Software](https://www.amazon.com/Design-Patterns-Elements-Reusable-Object-Oriented/dp/0201633612)\n"
+        elif domain == "Data Science":
+            result += "- [Python for Data Analysis by Wes McKinney](https://www.amazon.com/Python-Data-Analysis-Wrangling-IPython/dp/1491957662)\n"
+            result += "- [Hands-On Machine Learning with Scikit-Learn, Keras, and TensorFlow](https://www.amazon.com/Hands-Machine-Learning-Scikit-Learn-TensorFlow/dp/1492032646)\n"
+        elif domain == "Marketing":
+            result += "- [Marketing Management by Philip Kotler](https://www.amazon.com/Marketing-Management-15th-Philip-Kotler/dp/0133856461)\n"
+            result += "- [Digital Marketing Strategy by Simon Kingsnorth](https://www.amazon.com/Digital-Marketing-Strategy-Integrated-Approach/dp/0749484225)\n"
+    
+    return result
@@ -0,0 +1,364 @@
+"""
+Record interview sessions and replay them deterministically.
+
+Every session has a seed (see `SessionStore.rng`), and question generation,
+feedback wording and agent follow-ups draw from per-step streams derived from
+it. A recorded session is therefore just its seed, domain and difficulty plus
+the candidate's inputs. The log also keeps each step's output and latency, so
+a replay on another build can be diffed for both behaviour and speed.
+
+Logs are JSON lines: one header, then one event per step. Steps are logged by
+`InterviewSession`, and replays run on one, so they take the app's code path:
+
+    question    start / next_question          -> question text
+    evaluate    submit_answer (scoring)        -> score and feedback
+    references  submit_answer (references)     -> references block
+    chat        ask                            -> chat reply
+
+Set INTERVIEW_RECORD_DIR to record app sessions, then:
+
+    cd src && python -m utils.replay run ../recordings --output ../replays/build-a
+    python -m utils.replay run ../recordings --pacing recorded --speed 2
+    python -m utils.replay diff ../replays/build-a ../replays/build-b
+
+Regrading recorded sessions next to live traffic: `run --priority batch`.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import percentile
+from .scheduler import INTERACTIVE, PRIORITY_CLASSES, priority
+
+RECORD_DIR_ENV = "INTERVIEW_RECORD_DIR"
+LOG_VERSION = 1
+SCORE_TOLERANCE = 1e-4
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class SessionRecorder:
+    """Appends one session's steps to a log file"""
+
+    def __init__(self, path: str, header: Dict[str, object], resume: bool = False):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        if resume:
+            # Continue the log of a restored session; step times stay relative to its start
+            self._file = _open(path, "a")
+            self._start = time.perf_counter() - (time.time() - header["recorded_at"])
+        else:
+            self._file = _open(path, "w")
+            self._start = time.perf_counter()
+            self.write(dict(header, v=LOG_VERSION))
+
+    def write(self, entry: Dict[str, object]):
+        """Append a raw log entry"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._file.flush()
+
+    def record(self, op: str, position: int, started: float, output, input: Optional[str] = None,
+               turn: Optional[int] = None):
+        """Log a step; `started` is the time.perf_counter() value taken just before the call"""
+        now = time.perf_counter()
+        entry = {"op": op, "pos": position, "t": round(started - self._start, 4),
+                 "ms": round(1000 * (now - started), 3), "out": output}
+        if input is not None:
+            entry["in"] = input
+        if turn is not None:
+            entry["turn"] = turn
+        self.write(entry)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def start_recording(store, domain: str, difficulty: str, directory: Optional[str] = None) -> Optional[SessionRecorder]:
+    """Recorder for a new session, or None when recording is not enabled"""
+    directory = directory or os.environ.get(RECORD_DIR_ENV)
+    if not directory:
+        return None
+    header = {"session": store.session_id, "seed": store.seed, "domain": domain, "difficulty": difficulty,
+              "recorded_at": time.time()}
+    return SessionRecorder(os.path.join(directory, f"{store.session_id}.jsonl"), header)
+
+
+def resume_recording(store, directory: Optional[str] = None) -> Optional[SessionRecorder]:
+    """Recorder appending to the log of a restored session, or None if it wasn't recorded here"""
+    directory = directory or os.environ.get(RECORD_DIR_ENV)
+    if not directory:
+        return None
+    path = os.path.join(directory, f"{store.session_id}.jsonl")
+    try:
+        with _open(path, "r") as f:
+            header = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+    # A session restored without its seed (explicit seeds aren't in the database) would no longer replay
+    if header.get("v") != LOG_VERSION or header.get("seed") != store.seed:
+        return None
+    return SessionRecorder(path, header, resume=True)
+
+
+def evaluation_output(result: Dict[str, object]) -> Dict[str, object]:
+    """
+    The part of an evaluation result that is logged and compared. Results reused
+    from a near-duplicate answer are flagged, since their feedback came from
+    another session's random stream.
+    """
+    output = {"score": round(float(result["score"]), 6), "feedback": result["feedback"]}
+    if "near_duplicate_similarity" in result:
+        output["reused"] = True
+    return output
+
+
+def load_log(path: str) -> Tuple[Dict[str, object], List[Dict[str, object]]]:
+    with _open(path, "r") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get("v") != LOG_VERSION:
+        raise ValueError(f"{path}: not a version {LOG_VERSION} session log")
+    return lines[0], lines[1:]
+
+
+def _log_files(path: str) -> Dict[str, str]:
+    """Session logs under a file or directory, keyed by file name"""
+    if os.path.isfile(path):
+        return {os.path.basename(path): path}
+    return {name: os.path.join(path, name) for name in sorted(os.listdir(path))
+            if name.endswith((".jsonl", ".jsonl.gz"))}
+
+
+class _StepCapture:
+    """Stands in for a session's SessionRecorder, keeping each step's output and duration"""
+
+    def __init__(self):
+        self.steps: Dict[str, Tuple[object, float]] = {}
+
+    def record(self, op: str, position: int, started: float, output, **fields):
+        self.steps[op] = (output, time.perf_counter() - started)
+
+    def close(self):
+        pass
+
+
+class SessionReplayer:
+    """
+    Re-executes a recorded session on an InterviewSession with the session's own
+    seed, so replays run the app's code path. One session call can produce several
+    steps (`submit_answer` logs evaluate and references); each is returned when
+    its event comes up, with the duration the session measured for it.
+    """
+
+    def __init__(self, header: Dict[str, object], nlp, reuse_near_duplicates: bool = False):
+        from .interview_session import InterviewSession
+        from .session_store import SessionStore
+        self.header = header
+        self.nlp = nlp
+        # Near-duplicate reuse depends on what else the process has scored, so it is off by default
+        self.reuse_near_duplicates = reuse_near_duplicates
+        # No database or prefetcher: a replay must not write history or depend on background timing
+        self.session = InterviewSession(SessionStore(session_id=header["session"], seed=header["seed"]))
+        self.capture = _StepCapture()
+        self.session.recorder = self.capture
+
+    def execute(self, event: Dict[str, object]) -> Tuple[object, float]:
+        """Run one logged step; returns its output and duration in seconds"""
+        op = event["op"]
+        session = self.session
+        if op == "question":
+            if session.interview_started:
+                session.next_question()
+            else:
+                session.start(self.header["domain"], self.header["difficulty"])
+        elif op == "evaluate":
+            session.submit_answer(event["in"], self.nlp, reuse_near_duplicates=self.reuse_near_duplicates)
+        elif op == "chat":
+            session.ask(event["in"])
+        elif op != "references":
+            raise ValueError(f"unknown step {op!r}")
+        if op not in self.capture.steps:
+            raise ValueError(f"step {op!r} at position {event['pos']} was not produced by the session")
+        return self.capture.steps.pop(op)
+
+    def close(self):
+        self.session.close()
+
+
+def replay_log(path: str, nlp, pacing: str = "full", speed: float = 1.0, output: Optional[str] = None,
+               reuse_near_duplicates: bool = False) -> List[Dict[str, object]]:
+    """
+    Replay one session log. With pacing="recorded" steps start at their recorded
+    offsets (divided by `speed`); with "full" they run back to back.
+    Returns the replayed events and optionally writes them as a new log.
+    """
+    header, events = load_log(path)
+    replayer = SessionReplayer(header, nlp, reuse_near_duplicates)
+    recorder = SessionRecorder(output, dict(header, replay_of=path, replayed_at=time.time())) if output else None
+    replayed = []
+    start = time.perf_counter()
+    try:
+        for event in events:
+            if pacing == "recorded":
+                delay = event["t"] / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            started = time.perf_counter()
+            result, elapsed = replayer.execute(event)
+            entry = {"op": event["op"], "pos": event["pos"], "t": round(started - start, 4),
+                     "ms": round(1000 * elapsed, 3), "out": result}
+            for key in ("in", "turn"):
+                if key in event:
+                    entry[key] = event[key]
+            replayed.append(entry)
+            if recorder is not None:
+                recorder.write(entry)
+    finally:
+        replayer.close()
+        if recorder is not None:
+            recorder.close()
+    return replayed
+
+
+def _outputs_match(expected, actual, tolerance: float) -> bool:
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        return expected.keys() == actual.keys() and all(
+            _outputs_match(expected[k], actual[k], tolerance) for k in expected)
+    if isinstance(expected, float) or isinstance(actual, float):
+        return isinstance(actual, (int, float)) and abs(expected - actual) <= tolerance
+    return expected == actual
+
+
+def diff_events(baseline: List[Dict[str, object]], candidate: List[Dict[str, object]],
+                tolerance: float = SCORE_TOLERANCE) -> Dict[str, object]:
+    """Output mismatches and per-step timing samples between two runs of one session"""
+    mismatches = []
+    timings: Dict[str, Tuple[List[float], List[float]]] = {}
+    for index, (base, cand) in enumerate(zip(baseline, candidate)):
+        if base["op"] != cand["op"]:
+            mismatches.append({"index": index, "op": base["op"], "expected": base["op"], "actual": cand["op"]})
+            break
+        reused = any(isinstance(e["out"], dict) and e["out"].get("reused") for e in (base, cand))
+        if not reused and not _outputs_match(base["out"], cand["out"], tolerance):
+            mismatches.append({"index": index, "op": base["op"], "pos": base["pos"],
+                               "expected": base["out"], "actual": cand["out"]})
+        base_ms, cand_ms = timings.setdefault(base["op"], ([], []))
+        base_ms.append(base["ms"])
+        cand_ms.append(cand["ms"])
+    if len(baseline) != len(candidate):
+        mismatches.append({"index": min(len(baseline), len(candidate)), "op": "length",
+                           "expected": len(baseline), "actual": len(candidate)})
+    return {"steps": min(len(baseline), len(candidate)), "mismatches": mismatches, "timings": timings}
+
+
+def summarize_diffs(diffs: Dict[str, Dict[str, object]]) -> Dict[str, object]:
+    """Combine per-session diffs into mismatch counts and timing percentiles per step"""
+    timings: Dict[str, Tuple[List[float], List[float]]] = {}
+    mismatches = {}
+    for name, diff in diffs.items():
+        if diff["mismatches"]:
+            mismatches[name] = diff["mismatches"]
+        for op, (base_ms, cand_ms) in diff["timings"].items():
+            all_base, all_cand = timings.setdefault(op, ([], []))
+            all_base.extend(base_ms)
+            all_cand.extend(cand_ms)
+    steps = {}
+    for op, (base_ms, cand_ms) in timings.items():
+        base_ms, cand_ms = sorted(base_ms), sorted(cand_ms)
+        base_p50, cand_p50 = percentile(base_ms, 50), percentile(cand_ms, 50)
+        steps[op] = {
+            "count": len(base_ms),
+            "baseline_p50_ms": base_p50, "candidate_p50_ms": cand_p50,
+            "baseline_p95_ms": percentile(base_ms, 95), "candidate_p95_ms": percentile(cand_ms, 95),
+            "p50_ratio": cand_p50 / base_p50 if base_p50 else 0.0
+        }
+    return {"sessions": len(diffs), "sessions_with_mismatches": len(mismatches),
+            "mismatches": mismatches, "steps": steps}
+
+
+def diff_logs(baseline_path: str, candidate_path: str, tolerance: float = SCORE_TOLERANCE) -> Dict[str, object]:
+    """Diff two logs, or two directories of logs matched by file name"""
+    baseline, candidate = _log_files(baseline_path), _log_files(candidate_path)
+    if os.path.isfile(baseline_path) and os.path.isfile(candidate_path):
+        pairs = [(os.path.basename(baseline_path), baseline_path, candidate_path)]
+    else:
+        pairs = [(name, path, candidate[name]) for name, path in baseline.items() if name in candidate]
+    return summarize_diffs({name: diff_events(load_log(base)[1], load_log(cand)[1], tolerance)
+                            for name, base, cand in pairs})
+
+
+def format_diff(summary: Dict[str, object], max_mismatches: int = 5) -> str:
+    lines = [f"Sessions compared: {summary['sessions']}  with output differences: "
+             f"{summary['sessions_with_mismatches']}", "",
+             f"{'step':<12}{'count':>7}{'base p50':>11}{'cand p50':>11}{'base p95':>11}{'cand p95':>11}{'ratio':>8}"]
+    for op, stats in summary["steps"].items():
+        lines.append(f"{op:<12}{stats['count']:>7}{stats['baseline_p50_ms']:>11.2f}{stats['candidate_p50_ms']:>11.2f}"
+                     f"{stats['baseline_p95_ms']:>11.2f}{stats['candidate_p95_ms']:>11.2f}{stats['p50_ratio']:>8.2f}")
+    shown = 0
+    for name, mismatches in summary["mismatches"].items():
+        for mismatch in mismatches:
+            if shown >= max_mismatches:
+                lines.append("...")
+                return "\n".join(lines)
+            lines += ["", f"{name} step {mismatch['index']} ({mismatch['op']}):",
+                      f"  expected: {json.dumps(mismatch['expected'])[:300]}",
+                      f"  actual:   {json.dumps(mismatch['actual'])[:300]}"]
+            shown += 1
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay recorded interview sessions and diff runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="replay session logs")
+    run.add_argument("logs", help="a session log or a directory of logs")
+    run.add_argument("--output", help="directory for the replayed logs")
+    run.add_argument("--pacing", choices=("full", "recorded"), default="full")
+    run.add_argument("--speed", type=float, default=1.0, help="speed-up factor for recorded pacing")
+    run.add_argument("--near-duplicates", action="store_true", help="allow near-duplicate score reuse")
+    run.add_argument("--priority", choices=PRIORITY_CLASSES, default=INTERACTIVE,
+                     help="scheduling class; use batch for regrading next to live traffic")
+
+    diff = commands.add_parser("diff", help="compare two runs (logs or directories)")
+    diff.add_argument("baseline")
+    diff.add_argument("candidate")
+    diff.add_argument("--tolerance", type=float, default=SCORE_TOLERANCE, help="allowed score difference")
+    diff.add_argument("--json", help="write the full diff to this file")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        from .load_test import load_nlp
+        nlp = load_nlp()
+        diffs = {}
+        with priority(args.priority):
+            for name, path in _log_files(args.logs).items():
+                output = os.path.join(args.output, name) if args.output else None
+                replayed = replay_log(path, nlp, args.pacing, args.speed, output, args.near_duplicates)
+                diffs[name] = diff_events(load_log(path)[1], replayed)
+        print(format_diff(summarize_diffs(diffs)))
+    else:
+        summary = diff_logs(args.baseline, args.candidate, args.tolerance)
+        print(format_diff(summary))
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
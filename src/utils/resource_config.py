@@ -0,0 +1,154 @@
+"""Per-process CPU thread budgets for torch, tokenizers, spaCy and BLAS."""
+
+import logging
+import os
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Environment variables used to describe the deployment
+WORKERS_ENV = "INTERVIEW_WORKERS"
+THREADS_ENV = "INTERVIEW_THREADS"
+
+# Thread pools read these when the native library initialises
+BLAS_ENV_VARS = [
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS"
+]
+
+_active_settings = None
+
+
+class ResourceSettings:
+    """Effective thread budget for the current process"""
+
+    def __init__(self, cpu_count: int, workers: int, threads: int):
+        self.cpu_count = cpu_count
+        self.workers = workers
+        self.intra_op_threads = threads
+        # Each worker serves one request at a time, so a small inter-op pool is enough
+        self.inter_op_threads = max(1, min(2, threads // 2))
+        self.blas_threads = threads
+        # Rust tokenizers spawn their own pool; only allow it when we own the whole box
+        self.tokenizers_parallelism = workers == 1 and threads > 1
+        # Used by the model host for large parse batches; nlp.pipe(n_process=...) forks,
+        # so never fork inside a shared worker
+        self.spacy_n_process = 1 if workers > 1 else max(1, min(threads, 4))
+        self.torch_applied = False
+        self.blas_applied = False
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "cpu_count": self.cpu_count,
+            "workers": self.workers,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "blas_threads": self.blas_threads,
+            "tokenizers_parallelism": self.tokenizers_parallelism,
+            "spacy_n_process": self.spacy_n_process,
+            "torch_applied": self.torch_applied,
+            "blas_applied": self.blas_applied
+        }
+
+
+def available_cpu_count() -> int:
+    """Number of CPUs this process may run on (respects affinity masks)"""
+    if hasattr(os, "sched_getaffinity"):
+        try:
+            return max(1, len(os.sched_getaffinity(0)))
+        except OSError:
+            pass
+    return max(1, os.cpu_count() or 1)
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    if not value:
+        return None
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning("Ignoring non-integer %s=%r", name, value)
+        return None
+
+
+def compute_settings(workers: Optional[int] = None, threads: Optional[int] = None) -> ResourceSettings:
+    """
+    Derive per-process thread budgets from available cores divided by worker count
+    """
+    cpu_count = available_cpu_count()
+    workers = workers or _env_int(WORKERS_ENV) or 1
+    threads = threads or _env_int(THREADS_ENV) or max(1, cpu_count // workers)
+    return ResourceSettings(cpu_count, workers, threads)
+
+
+def _apply_env(settings: ResourceSettings):
+    # Respect values the operator set explicitly
+    for var in BLAS_ENV_VARS:
+        os.environ.setdefault(var, str(settings.blas_threads))
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "true" if settings.tokenizers_parallelism else "false")
+
+
+def _apply_torch(settings: ResourceSettings):
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(settings.intra_op_threads)
+    try:
+        torch.set_num_interop_threads(settings.inter_op_threads)
+    except RuntimeError:
+        # Only allowed before the first parallel op; keep whatever is already running
+        settings.inter_op_threads = torch.get_num_interop_threads()
+    settings.intra_op_threads = torch.get_num_threads()
+    settings.torch_applied = True
+
+
+def _apply_blas(settings: ResourceSettings):
+    # Env vars are too late once numpy has loaded its BLAS; threadpoolctl can still resize it
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(limits=settings.blas_threads)
+    settings.blas_applied = True
+
+
+def configure_resources(workers: Optional[int] = None, threads: Optional[int] = None) -> ResourceSettings:
+    """
+    Apply thread budgets once per process and return the effective settings.
+    Safe to call from every place that loads a model.
+    """
+    global _active_settings
+    if _active_settings is not None:
+        return _active_settings
+
+    settings = compute_settings(workers, threads)
+    _apply_env(settings)
+    _apply_torch(settings)
+    _apply_blas(settings)
+
+    _active_settings = settings
+    logger.info(format_resource_report(settings))
+    return settings
+
+
+def get_resource_settings() -> Optional[ResourceSettings]:
+    """Return the settings applied in this process, if any"""
+    return _active_settings
+
+
+def format_resource_report(settings: ResourceSettings) -> str:
+    """Format the effective settings for logs or the sidebar"""
+    lines = [
+        f"CPUs available: {settings.cpu_count}, workers per host: {settings.workers}",
+        f"torch threads: intra-op {settings.intra_op_threads}, inter-op {settings.inter_op_threads}"
+        + ("" if settings.torch_applied else " (torch not loaded)"),
+        f"BLAS threads: {os.environ.get('OMP_NUM_THREADS', settings.blas_threads)}",
+        f"tokenizers parallelism: {os.environ.get('TOKENIZERS_PARALLELISM')}",
+        f"spaCy n_process: {settings.spacy_n_process}"
+    ]
+    return "\n".join(lines)
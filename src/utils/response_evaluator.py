@@ -1,43 +1,190 @@
-from sentence_transformers import SentenceTransformer, util
+from .resource_config import configure_resources
+configure_resources()
+
 import numpy as np
 import random
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Optional, Sequence, Union
 import nltk
 from collections import Counter
+from .content_compiler import load_content_artifact
+from .content_packs import get_content_snapshot
+from .embedding_store import embedding_key, get_embedding_store, record_embedding
+from .keyword_automaton import KeywordAutomaton
+from .model_manager import ENCODER, get_model_manager
+from .near_duplicate import get_near_duplicate_index
+from .nlp_resources import get_nlp_resources, load_spacy_model
+from .profiling import stage
+from .question_generator import Question
+from .rubrics import RubricScore, get_rubric_store
+from .scheduler import EVALUATE, slot
+
+# Domain-specific keywords and concepts
+DOMAIN_CONCEPTS = {
+    "Software Development": [
+        "algorithms", "data structures", "design patterns",
+        "clean code", "testing", "version control",
+        "scalability", "performance", "security",
+        "architecture", "framework", "api", "database",
+        "deployment", "debugging", "code review", "documentation",
+        "agile", "devops", "continuous integration"
+    ],
+    "Data Science": [
+        "machine learning", "statistics", "data analysis",
+        "visualization", "feature engineering", "model evaluation",
+        "big data", "neural networks", "regression", "classification",
+        "clustering", "data cleaning", "hypothesis testing", "correlation",
+        "predictive modeling", "overfitting", "validation", "training data",
+        "algorithm", "deep learning"
+    ],
+    "Marketing": [
+        "market research", "brand awareness", "customer segmentation",
+        "digital marketing", "ROI", "campaign analysis",
+        "social media", "content strategy", "conversion", "lead generation",
+        "customer journey", "target audience", "SEO", "PPC", "analytics",
+        "email marketing", "A/B testing", "engagement", "brand positioning",
+        "marketing funnel"
+    ]
+}
+
+def get_domain_concepts() -> Dict[str, List[str]]:
+    """Built-in domain keywords merged with those from content packs"""
+    snapshot = get_content_snapshot()
+    if not snapshot:
+        return DOMAIN_CONCEPTS
+    concepts = dict(DOMAIN_CONCEPTS)
+    for pack in snapshot.packs.values():
+        concepts[pack.domain] = pack.evaluator_concepts
+    return concepts
+
+# Keyword automata built on first use when no compiled artifact is available
+_domain_automata: Dict[str, KeywordAutomaton] = {}
+
+def get_domain_automaton(domain: str, keywords: List[str]) -> KeywordAutomaton:
+    """Return the keyword automaton for a domain, preferring precompiled ones"""
+    pack = get_content_snapshot().get(domain)
+    if pack is not None and pack.evaluator_automaton.keywords == keywords:
+        return pack.evaluator_automaton
+    
+    automaton = _domain_automata.get(domain)
+    if automaton is None or automaton.keywords != keywords:
+        artifact = load_content_artifact()
+        automaton = artifact.automaton(f"evaluator_concepts/{domain}") if artifact else None
+        if automaton is None or automaton.keywords != keywords:
+            automaton = KeywordAutomaton(keywords)
+        _domain_automata[domain] = automaton
+    return automaton
+
+def keyword_relevance(response: str, domain: str,
+                      domain_concepts: Optional[Dict[str, List[str]]] = None) -> Tuple[float, List[str]]:
+    """Keyword relevance score and matched keywords; needs no model"""
+    response_lower = response.lower()
+    domain_keywords = (domain_concepts or get_domain_concepts()).get(domain, [])
+    
+    # Calculate keyword presence in a single pass over the response
+    found_keywords = get_domain_automaton(domain, domain_keywords).find_all(response_lower)
+    
+    # Calculate relevance score
+    relevance_score = min(1.0, len(found_keywords) / 5)  # Normalize, max at 5 keywords
+    
+    return relevance_score, found_keywords
+
+def response_quality(response: str) -> float:
+    """Quality score from length, structure and word diversity; needs no model"""
+    # Simple metrics for response quality
+    words = response.split()
+    word_count = len(words)
+    
+    # Sentence count
+    sentences = nltk.sent_tokenize(response)
+    sentence_count = len(sentences)
+    
+    # Calculate word diversity (unique words ratio)
+    unique_words = len(set(w.lower() for w in words))
+    word_diversity = unique_words / max(1, word_count)
+    
+    # Calculate quality score
+    length_score = min(1.0, word_count / 200)  # Max at 200 words
+    complexity_score = min(1.0, sentence_count / 10)  # Max at 10 sentences
+    diversity_score = word_diversity
+    
+    quality_score = (length_score * 0.4) + (complexity_score * 0.3) + (diversity_score * 0.3)
+    return quality_score
+
+_SENTENCE_END_CHARS = (".", "?", "!")
+
+def response_quality_features(responses: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    `response_quality` for many responses at once, with its intermediate features
+    as arrays (one row per response). Each response is lowercased and split once;
+    word counts and distinct words come from that pass. Punkt only runs on
+    responses that contain a sentence-ending character (without one it always
+    finds one sentence, or none in blank text). The scores are then computed
+    column-wise in float64, in the same order as `response_quality`, so they
+    are identical to it.
+    """
+    n = len(responses)
+    word_count = np.zeros(n, dtype=np.int64)
+    unique_words = np.zeros(n, dtype=np.int64)
+    sentence_count = np.zeros(n, dtype=np.int64)
+    for i, response in enumerate(responses):
+        # Same tokens as lowering each whitespace-split word
+        words = response.lower().split()
+        word_count[i] = len(words)
+        unique_words[i] = len(set(words))
+        if any(c in response for c in _SENTENCE_END_CHARS):
+            sentence_count[i] = len(nltk.sent_tokenize(response))
+        else:
+            sentence_count[i] = 1 if words else 0
+    
+    word_diversity = unique_words / np.maximum(word_count, 1)
+    length_score = np.minimum(1.0, word_count / 200)
+    complexity_score = np.minimum(1.0, sentence_count / 10)
+    quality_score = (length_score * 0.4) + (complexity_score * 0.3) + (word_diversity * 0.3)
+    return {
+        "word_count": word_count,
+        "sentence_count": sentence_count,
+        "unique_words": unique_words,
+        "word_diversity": word_diversity,
+        "length_score": length_score,
+        "complexity_score": complexity_score,
+        "quality_score": quality_score
+    }
+
+def response_quality_batch(responses: Sequence[str]) -> np.ndarray:
+    """Quality scores of many responses; element i equals response_quality(responses[i])"""
+    return response_quality_features(responses)["quality_score"]
+
+def combine_scores(semantic_similarity: float, relevance_score: float, quality_score: float) -> float:
+    """Total score out of 10 from the component scores"""
+    semantic_weight = 0.5
+    relevance_weight = 0.3
+    quality_weight = 0.2
+    
+    return (
+        semantic_similarity * semantic_weight * 10 +
+        relevance_score * relevance_weight * 10 +
+        quality_score * quality_weight * 10
+    )
+
+# Minimum sentence-to-concept cosine similarity for a concept to count as covered
+COVERAGE_THRESHOLD = 0.45
+
+# L2-normalized concept embedding matrices keyed by (domain, concepts)
+_concept_embeddings: Dict[Tuple[str, Tuple[str, ...]], np.ndarray] = {}
+# L2-normalized embeddings of generated questions without a compiled artifact, keyed by text
+_question_embeddings: Dict[str, np.ndarray] = {}
 
 class ResponseEvaluator:
-    def __init__(self, nlp):
-        # Initialize the sentence transformer model for semantic similarity
-        self.sentence_transformer = SentenceTransformer('all-MiniLM-L6-v2')
-        self.nlp = nlp
+    def __init__(self, nlp=None):
+        configure_resources()
+        # Puts the offline NLTK bundle on the search path used by sent_tokenize
+        get_nlp_resources()
+        self._nlp = nlp
+        # (response, normalized embedding) of the last response encoded
+        self._last_embedding: Optional[Tuple[str, np.ndarray]] = None
         
         # Domain-specific keywords and concepts
-        self.domain_concepts = {
-            "Software Development": [
-                "algorithms", "data structures", "design patterns",
-                "clean code", "testing", "version control",
-                "scalability", "performance", "security",
-                "architecture", "framework", "api", "database",
-                "deployment", "debugging", "code review", "documentation",
-                "agile", "devops", "continuous integration"
-            ],
-            "Data Science": [
-                "machine learning", "statistics", "data analysis",
-                "visualization", "feature engineering", "model evaluation",
-                "big data", "neural networks", "regression", "classification",
-                "clustering", "data cleaning", "hypothesis testing", "correlation",
-                "predictive modeling", "overfitting", "validation", "training data",
-                "algorithm", "deep learning"
-            ],
-            "Marketing": [
-                "market research", "brand awareness", "customer segmentation",
-                "digital marketing", "ROI", "campaign analysis",
-                "social media", "content strategy", "conversion", "lead generation",
-                "customer journey", "target audience", "SEO", "PPC", "analytics",
-                "email marketing", "A/B testing", "engagement", "brand positioning",
-                "marketing funnel"
-            ]
-        }
+        self.domain_concepts = get_domain_concepts()
         
         # Feedback templates based on different score ranges
         self.feedback_templates = {
@@ -61,62 +208,162 @@ class ResponseEvaluator:
             ]
         }
 
-    def calculate_semantic_similarity(self, response: str, question: str) -> float:
+    @property
+    def sentence_transformer(self):
+        """
+        The sentence encoder (or the model host's client), held by the model
+        manager and loaded on first use; not cached here so it can be evicted
+        """
+        return get_model_manager().get(ENCODER)
+
+    @property
+    def nlp(self):
+        return self._nlp if self._nlp is not None else load_spacy_model()
+
+    @property
+    def rubric_store(self):
+        """Reference answers and rubric points with precomputed embeddings"""
+        return get_rubric_store()
+
+    def calculate_semantic_similarity(self, response: str, question: Union[str, Question]) -> float:
         """
-        Calculate semantic similarity between response and question
+        Calculate semantic similarity between response and question.
+        When the question has a reference answer and rubric, the response is
+        scored against those instead of the question wording.
         """
-        response_embedding = self.sentence_transformer.encode(response, convert_to_tensor=True)
-        question_embedding = self.sentence_transformer.encode(question, convert_to_tensor=True)
+        rubric_score = self.evaluate_rubric(response, str(question))
+        if rubric_score is not None:
+            return rubric_score.semantic_score
         
-        similarity = util.pytorch_cos_sim(response_embedding, question_embedding)
-        return float(similarity[0][0])
+        # Reuse the precompiled (normalized) question embedding when available
+        if isinstance(question, Question):
+            question_embedding = question.embedding
+            if question_embedding is None:
+                question_embedding = self.question_embedding(question)
+            question = question.text
+        else:
+            artifact = load_content_artifact()
+            question_embedding = artifact.question_embedding(question) if artifact else None
+        if question_embedding is None:
+            question_embedding = self.sentence_transformer.encode(
+                question, convert_to_numpy=True, normalize_embeddings=True
+            )
+        # Cosine similarity of normalized embeddings; the response encode is shared with the embedding store
+        return float(np.dot(self.response_embedding(response), question_embedding))
+
+    def response_embedding(self, response: str) -> np.ndarray:
+        """
+        Normalized embedding of a response; the last one is kept so scoring
+        and the embedding store share a single encode
+        """
+        last = self._last_embedding
+        if last is not None and last[0] == response:
+            return last[1]
+        # A private copy: the model host returns views into a ring that is reused
+        embedding = np.array(self.sentence_transformer.encode(
+            response, convert_to_numpy=True, normalize_embeddings=True
+        ), dtype=np.float32)
+        self._last_embedding = (response, embedding)
+        return embedding
+
+    def question_embedding(self, question: Question) -> np.ndarray:
+        """
+        Normalized embedding of a generated question, encoded once per process
+        (generated questions come from a finite template space)
+        """
+        embedding = _question_embeddings.get(question.text)
+        if embedding is None:
+            embedding = np.array(self.sentence_transformer.encode(
+                question.text, convert_to_numpy=True, normalize_embeddings=True
+            ), dtype=np.float32)
+            _question_embeddings[question.text] = embedding
+        return embedding
+
+    def evaluate_rubric(self, response: str, question: str) -> Optional[RubricScore]:
+        """
+        Compare the response against the question's reference answer and rubric points
+        in one vectorized step. Returns None when the question has no rubric.
+        """
+        rubric = self.rubric_store.rubric_for(question)
+        if rubric is None:
+            return None
+        return self.rubric_store.score(self.response_embedding(response), rubric)
 
     def analyze_domain_relevance(self, response: str, domain: str) -> Tuple[float, List[str]]:
         """
         Analyze how well the response aligns with domain-specific concepts
         """
-        response_lower = response.lower()
-        domain_keywords = self.domain_concepts.get(domain, [])
-        
-        # Calculate keyword presence
-        found_keywords = []
-        for keyword in domain_keywords:
-            if keyword.lower() in response_lower:
-                found_keywords.append(keyword)
+        return keyword_relevance(response, domain, self.domain_concepts)
+
+    def get_concept_embeddings(self, domain: str) -> Tuple[List[str], np.ndarray]:
+        """
+        Return the domain concepts and their normalized embedding matrix (concepts x dims),
+        computed once per process or taken from the compiled content artifact
+        """
+        concepts = self.domain_concepts.get(domain, [])
+        key = (domain, tuple(concepts))
+        matrix = _concept_embeddings.get(key)
+        if matrix is None:
+            artifact = load_content_artifact()
+            if artifact and artifact.content["evaluator_concepts"].get(domain) == concepts:
+                matrix = artifact.concept_matrix(f"evaluator_concepts/{domain}")
+            if matrix is None:
+                matrix = self.sentence_transformer.encode(
+                    concepts, convert_to_numpy=True, normalize_embeddings=True
+                ).astype(np.float32)
+            _concept_embeddings[key] = matrix
+        return concepts, matrix
+
+    def analyze_concept_coverage(self, response: str, domain: str,
+                                 threshold: float = COVERAGE_THRESHOLD) -> List[Tuple[str, float]]:
+        """
+        Find domain concepts the response covers semantically, not just by keyword.
+        Sentences are encoded in one batch and compared against all concepts with a
+        single matrix product. Returns (concept, confidence) pairs, best first.
+        """
+        sentences = [s for s in nltk.sent_tokenize(response) if s.strip()]
+        concepts, concept_matrix = self.get_concept_embeddings(domain)
+        if not sentences or not concepts:
+            return []
         
-        # Calculate relevance score
-        relevance_score = min(1.0, len(found_keywords) / 5)  # Normalize, max at 5 keywords
+        sentence_matrix = self.sentence_transformer.encode(
+            sentences, convert_to_numpy=True, normalize_embeddings=True
+        )
+        # sentences x concepts cosine similarities; keep each concept's best sentence
+        similarity = np.asarray(sentence_matrix, dtype=np.float32) @ np.asarray(concept_matrix).T
+        confidence = similarity.max(axis=0)
         
-        return relevance_score, found_keywords
+        covered = np.flatnonzero(confidence >= threshold)
+        covered = covered[np.argsort(-confidence[covered], kind="stable")]
+        return [(concepts[i], float(confidence[i])) for i in covered]
 
     def analyze_response_quality(self, response: str) -> float:
         """
         Analyze response quality based on length, structure, and complexity
         """
-        # Simple metrics for response quality
-        words = response.split()
-        word_count = len(words)
-        
-        # Sentence count
-        sentences = nltk.sent_tokenize(response)
-        sentence_count = len(sentences)
-        
-        # Calculate word diversity (unique words ratio)
-        unique_words = len(set(w.lower() for w in words))
-        word_diversity = unique_words / max(1, word_count)
-        
-        # Calculate quality score
-        length_score = min(1.0, word_count / 200)  # Max at 200 words
-        complexity_score = min(1.0, sentence_count / 10)  # Max at 10 sentences
-        diversity_score = word_diversity
-        
-        quality_score = (length_score * 0.4) + (complexity_score * 0.3) + (diversity_score * 0.3)
-        return quality_score
+        return response_quality(response)
 
-    def get_feedback(self, score: float, found_concepts: List[str], domain: str) -> str:
+    def analyze_response_quality_batch(self, responses: Sequence[str]) -> np.ndarray:
+        """
+        Quality scores for a batch of responses, identical to analyze_response_quality per response
         """
-        Generate constructive feedback based on evaluation scores
+        return response_quality_batch(responses)
+
+    def get_feedback(self, score: float, found_concepts: List[str], domain: str,
+                     concept_coverage: Optional[List[Tuple[str, float]]] = None,
+                     rng: Optional[random.Random] = None) -> str:
         """
+        Generate constructive feedback based on evaluation scores.
+        `concept_coverage` (from analyze_concept_coverage) adds concepts the
+        response covered without naming them verbatim. Pass a seeded `rng` for
+        reproducible wording.
+        """
+        rng = rng or random
+        if concept_coverage:
+            found_concepts = list(found_concepts) + [
+                concept for concept, _ in concept_coverage if concept not in found_concepts
+            ]
+        
         # Determine feedback category based on score
         if score >= 7.5:
             templates = self.feedback_templates["high"]
@@ -128,54 +375,127 @@ class ResponseEvaluator:
         # Get random concepts if none found
         if not found_concepts:
             domain_concepts = self.domain_concepts.get(domain, [])
-            found_concepts = random.sample(domain_concepts, min(3, len(domain_concepts)))
+            found_concepts = rng.sample(domain_concepts, min(3, len(domain_concepts)))
         
         # Ensure we have at most 3 concepts for readability
         if len(found_concepts) > 3:
-            found_concepts = random.sample(found_concepts, 3)
+            found_concepts = rng.sample(found_concepts, 3)
         
         # Format concepts for readability
         concepts_text = ", ".join(found_concepts)
         
         # Generate feedback
-        feedback = random.choice(templates).format(concepts=concepts_text)
+        feedback = rng.choice(templates).format(concepts=concepts_text)
         
         # Add improvement suggestions
         if score < 7.5:
             suggestions = [
-                f"Try to provide more specific examples related to {random.choice(found_concepts)}.",
+                f"Try to provide more specific examples related to {rng.choice(found_concepts)}.",
                 f"Consider discussing practical applications of the concepts you mentioned.",
                 f"Structure your answer with clear sections covering different aspects of the topic.",
                 f"Include relevant industry best practices in your response.",
                 f"Compare and contrast different approaches to demonstrate deeper understanding."
             ]
-            feedback += "\n\n" + random.choice(suggestions)
+            feedback += "\n\n" + rng.choice(suggestions)
         
         return feedback
 
-def evaluate_response(question: str, response: str, domain: str, nlp) -> Tuple[float, str]:
+def precompute_question_embedding(question: Question) -> Optional[np.ndarray]:
     """
-    Main function to evaluate user responses
+    The question embedding scoring an answer will compare against, encoded ahead
+    of the first answer when there's no compiled artifact row. None when the
+    question has a rubric, which scores answers instead.
     """
-    evaluator = ResponseEvaluator(nlp)
-    
-    # Calculate various scores
-    semantic_similarity = evaluator.calculate_semantic_similarity(response, question)
-    relevance_score, found_concepts = evaluator.analyze_domain_relevance(response, domain)
-    quality_score = evaluator.analyze_response_quality(response)
-    
-    # Calculate total score (out of 10)
-    semantic_weight = 0.5
-    relevance_weight = 0.3
-    quality_weight = 0.2
-    
-    total_score = (
-        semantic_similarity * semantic_weight * 10 +
-        relevance_score * relevance_weight * 10 +
-        quality_score * quality_weight * 10
-    )
-    
-    # Generate feedback
-    feedback = evaluator.get_feedback(total_score, found_concepts, domain)
+    embedding = question.embedding
+    if embedding is not None or get_rubric_store().rubric_for(question.text) is not None:
+        return embedding
+    return ResponseEvaluator().question_embedding(question)
+
+def evaluate_response_components(question: Union[str, Question], response: str, domain: str, nlp,
+                                 reuse_near_duplicates: bool = True,
+                                 rng: Optional[random.Random] = None,
+                                 evaluator: Optional[ResponseEvaluator] = None,
+                                 quality_score: Optional[float] = None) -> Dict[str, object]:
+    """
+    Evaluate a response and return the total score, feedback and every component score.
+    A near-duplicate of an answer already scored for the same question reuses its
+    transformer-based scores; keyword relevance and quality are recomputed on the new text.
+    Long-running callers can pass a shared `evaluator` so models are loaded once.
+    A `Question` record supplies its precomputed embedding instead of re-encoding the text.
+    Batch callers can pass `quality_score` from response_quality_batch.
+    """
+    index = get_near_duplicate_index() if reuse_near_duplicates else None
+    if index is not None:
+        with stage("near_duplicate"):
+            cached, similarity, signature = index.lookup(f"{domain}\n{question}", response)
+        if cached is not None:
+            relevance_score, found_keywords = keyword_relevance(response, domain)
+            if quality_score is None:
+                quality_score = response_quality(response)
+            total_score = combine_scores(cached["semantic_similarity"], relevance_score, quality_score)
+            # Feedback follows this answer's score and keywords, not the cached answer's
+            evaluator = evaluator or ResponseEvaluator(nlp)
+            with stage("feedback"):
+                feedback = evaluator.get_feedback(total_score, found_keywords, domain,
+                                                  cached["concept_coverage"], rng)
+            return {
+                "score": total_score,
+                "feedback": feedback,
+                "semantic_similarity": cached["semantic_similarity"],
+                "relevance_score": relevance_score,
+                "quality_score": quality_score,
+                "found_concepts": found_keywords,
+                "concept_coverage": cached["concept_coverage"],
+                "near_duplicate_similarity": similarity
+            }
     
-    return total_score, feedback 
\ No newline at end of file
+    # One evaluate slot per answer: interactive answers go ahead of queued batch work
+    with slot(EVALUATE):
+        # Cheap: models are held by the model manager, not the evaluator
+        evaluator = evaluator or ResponseEvaluator(nlp)
+
+        # Calculate various scores (stages are tagged for on-demand profiling)
+        with stage("semantic_similarity"):
+            semantic_similarity = evaluator.calculate_semantic_similarity(response, question)
+        with stage("relevance"):
+            relevance_score, found_concepts = evaluator.analyze_domain_relevance(response, domain)
+        with stage("concept_coverage"):
+            concept_coverage = evaluator.analyze_concept_coverage(response, domain)
+        if quality_score is None:
+            with stage("quality"):
+                quality_score = evaluator.analyze_response_quality(response)
+
+        # Calculate total score (out of 10)
+        total_score = combine_scores(semantic_similarity, relevance_score, quality_score)
+
+        # Generate feedback
+        with stage("feedback"):
+            feedback = evaluator.get_feedback(total_score, found_concepts, domain, concept_coverage, rng)
+
+        result = {
+            "score": total_score,
+            "feedback": feedback,
+            "semantic_similarity": semantic_similarity,
+            "relevance_score": relevance_score,
+            "quality_score": quality_score,
+            "found_concepts": found_concepts,
+            "concept_coverage": concept_coverage
+        }
+    if index is not None:
+        # Only the transformer-derived scores are reused; the rest depends on the new text
+        index.add(f"{domain}\n{question}", signature, {
+            "semantic_similarity": result["semantic_similarity"],
+            "concept_coverage": result["concept_coverage"]
+        })
+    store = get_embedding_store()
+    if store is not None:
+        record_embedding(store, embedding_key(domain, str(question), response), evaluator.response_embedding(response))
+    return result
+
+def evaluate_response(question: str, response: str, domain: str, nlp,
+                      rng: Optional[random.Random] = None) -> Tuple[float, str]:
+    """
+    Main function to evaluate user responses
+    """
+    result = evaluate_response_components(question, response, domain, nlp, rng=rng)
+    return result["score"], result["feedback"]
@@ -0,0 +1,293 @@
+"""
+Reference answers and rubric points for scoring responses against what a good
+answer contains, rather than against the wording of the question.
+
+Rubrics are keyed by domain and concept, with optional overrides for a
+specific question template (template ids come from
+`QuestionGenerator.enumerate_questions`). Every reference answer and rubric
+point is embedded once into a single normalized matrix, so scoring a response
+is one encode plus one matrix-vector product.
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .content_packs import get_content_snapshot
+
+# Rubric point counts as covered at or above this cosine similarity
+POINT_THRESHOLD = 0.5
+
+# Weight of the reference answer vs. the rubric points in the semantic score
+REFERENCE_WEIGHT = 0.5
+
+RUBRICS = {
+    "Software Development": {
+        "microservices architecture": {
+            "reference_answer": "Microservices split an application into small, independently deployable services that own their data and communicate over well-defined APIs, trading operational complexity for independent scaling and release cycles.",
+            "points": [
+                "Services are independently deployable and scalable",
+                "Each service owns its own data store",
+                "Services communicate over APIs or messaging",
+                "Adds operational complexity such as monitoring, network failures and distributed transactions"
+            ]
+        },
+        "test-driven development": {
+            "reference_answer": "Test-driven development writes a failing test first, then the minimal code to pass it, then refactors, producing a regression suite and design driven by usage.",
+            "points": [
+                "Write a failing test before the implementation",
+                "Implement just enough code to make the test pass",
+                "Refactor while keeping the tests green",
+                "Results in a regression safety net and better modular design"
+            ]
+        },
+        "dependency injection": {
+            "reference_answer": "Dependency injection supplies an object's collaborators from the outside instead of constructing them internally, which decouples components and makes them easy to test with substitutes.",
+            "points": [
+                "Dependencies are passed in rather than created inside the class",
+                "Decouples components from concrete implementations",
+                "Makes unit testing with mocks or fakes easy",
+                "Can be done through constructors, setters or a container"
+            ]
+        },
+        "continuous integration": {
+            "reference_answer": "Continuous integration merges developer changes to a shared branch frequently, with every change automatically built and tested so integration problems are caught early.",
+            "points": [
+                "Developers merge small changes frequently",
+                "Every commit triggers an automated build and test run",
+                "Broken builds are fixed immediately",
+                "Catches integration problems early"
+            ]
+        },
+        "microservices": {
+            "reference_answer": "A monolith deploys the whole application as one unit, which is simple to build and debug, while microservices split it into independently deployable services that scale separately but add distributed-system complexity.",
+            "points": [
+                "A monolith is deployed and scaled as a single unit",
+                "Microservices deploy and scale independently",
+                "Monoliths are simpler to develop, test and debug initially",
+                "Microservices introduce network, consistency and operational overhead"
+            ]
+        }
+    },
+    "Data Science": {
+        "cross-validation": {
+            "reference_answer": "Cross-validation estimates how a model generalizes by repeatedly training on part of the data and validating on the held-out part, as in k-fold where each fold serves once as the validation set.",
+            "points": [
+                "Data is split into folds used alternately for training and validation",
+                "Estimates performance on unseen data and detects overfitting",
+                "K-fold averages the score across folds",
+                "Stratified or time-series splits avoid leakage and imbalance"
+            ]
+        },
+        "feature engineering": {
+            "reference_answer": "Feature engineering transforms raw data into informative model inputs using domain knowledge, through encoding, scaling, aggregation and creation of new variables.",
+            "points": [
+                "Creates new informative variables from raw data",
+                "Encodes categorical variables and scales numeric ones",
+                "Uses domain knowledge to capture relevant signal",
+                "Improves model accuracy more than algorithm choice often does"
+            ]
+        },
+        "regularization": {
+            "reference_answer": "Regularization adds a penalty on model complexity, such as L1 or L2 weight penalties or dropout, to reduce overfitting and improve generalization.",
+            "points": [
+                "Penalizes model complexity to reduce overfitting",
+                "L1 encourages sparse weights while L2 shrinks weights",
+                "Strength is tuned as a hyperparameter",
+                "Trades a little bias for lower variance"
+            ]
+        },
+        "dimensionality reduction": {
+            "reference_answer": "Dimensionality reduction projects data into fewer features while preserving structure, using methods like PCA or t-SNE, to fight the curse of dimensionality, speed up training and enable visualization.",
+            "points": [
+                "Reduces the number of input features",
+                "Preserves as much variance or structure as possible",
+                "Common methods include PCA and t-SNE",
+                "Helps visualization, speed and the curse of dimensionality"
+            ]
+        },
+        "supervised learning": {
+            "reference_answer": "Supervised learning trains on labeled examples to predict a known target, while unsupervised learning finds structure such as clusters in unlabeled data.",
+            "points": [
+                "Supervised learning uses labeled data with a known target",
+                "Unsupervised learning works on unlabeled data",
+                "Classification and regression are supervised tasks",
+                "Clustering and dimensionality reduction are unsupervised tasks"
+            ]
+        }
+    },
+    "Marketing": {
+        "customer segmentation": {
+            "reference_answer": "Customer segmentation divides a market into groups with shared characteristics, such as demographics, behavior or needs, so messaging, products and spend can be targeted to each group.",
+            "points": [
+                "Divides customers into groups with shared characteristics",
+                "Uses demographic, geographic, behavioral or psychographic criteria",
+                "Enables targeted messaging and offers",
+                "Improves marketing efficiency and return on spend"
+            ]
+        },
+        "A/B testing": {
+            "reference_answer": "A/B testing randomly splits an audience between two variants and compares a predefined metric to determine with statistical significance which variant performs better.",
+            "points": [
+                "Randomly splits the audience between variants",
+                "Changes one variable at a time",
+                "Measures a predefined conversion metric",
+                "Requires sufficient sample size for statistical significance"
+            ]
+        },
+        "content marketing": {
+            "reference_answer": "Content marketing attracts and retains a defined audience by consistently publishing valuable, relevant content, building trust that drives profitable customer action over time.",
+            "points": [
+                "Creates valuable and relevant content for a target audience",
+                "Builds trust and brand authority over time",
+                "Distributed through blogs, social media, email and SEO",
+                "Measured with engagement, traffic and conversion metrics"
+            ]
+        },
+        "lead generation": {
+            "reference_answer": "Lead generation attracts potential customers and captures their contact details through offers such as content downloads, webinars or trials, then qualifies and nurtures them toward sales.",
+            "points": [
+                "Attracts prospects and captures their contact information",
+                "Uses lead magnets such as content, webinars or free trials",
+                "Qualifies leads by fit and intent",
+                "Nurtures leads toward a sale"
+            ]
+        },
+        "inbound marketing": {
+            "reference_answer": "Inbound marketing draws customers in with useful content and search visibility, while outbound marketing pushes messages to audiences through ads, cold outreach and traditional media.",
+            "points": [
+                "Inbound attracts customers who seek out content",
+                "Outbound pushes messages to a broad audience",
+                "Inbound tends to have lower cost per lead over time",
+                "Outbound reaches audiences faster but is more interruptive"
+            ]
+        }
+    }
+}
+
+
+class Rubric:
+    """Reference answer and rubric points for one concept (or template + concept)"""
+
+    __slots__ = ("key", "reference_answer", "points", "start", "stop")
+
+    def __init__(self, key: Tuple[str, str, str], reference_answer: str, points: List[str]):
+        self.key = key
+        self.reference_answer = reference_answer
+        self.points = points
+        # Row span of [reference_answer, *points] in the store's embedding matrix
+        self.start = 0
+        self.stop = 0
+
+
+class RubricScore:
+    """Result of comparing one response against a rubric"""
+
+    __slots__ = ("reference_similarity", "point_similarities", "covered_points", "missed_points", "semantic_score")
+
+    def __init__(self, rubric: Rubric, similarities: np.ndarray):
+        self.reference_similarity = float(similarities[0])
+        self.point_similarities = similarities[1:]
+        covered = self.point_similarities >= POINT_THRESHOLD
+        self.covered_points = [p for p, hit in zip(rubric.points, covered) if hit]
+        self.missed_points = [p for p, hit in zip(rubric.points, covered) if not hit]
+        point_score = float(np.clip(self.point_similarities, 0.0, 1.0).mean()) if len(rubric.points) else 0.0
+        self.semantic_score = REFERENCE_WEIGHT * self.reference_similarity + (1 - REFERENCE_WEIGHT) * point_score
+
+
+def _merged_rubrics() -> Dict[str, dict]:
+    rubrics = dict(RUBRICS)
+    for pack in get_content_snapshot().packs.values():
+        if pack.rubrics:
+            rubrics[pack.domain] = pack.rubrics
+    return rubrics
+
+
+class RubricStore:
+    """All rubrics with their precomputed embedding matrix and question lookup"""
+
+    def __init__(self, encoder=None, rubrics: Optional[Dict[str, dict]] = None):
+        # Without an encoder, the model manager's is fetched when the matrix is built
+        self.encoder = encoder
+        self.rubrics: Dict[Tuple[str, str, str], Rubric] = {}
+        for domain, concepts in (rubrics if rubrics is not None else _merged_rubrics()).items():
+            for concept, entry in concepts.items():
+                self._add((domain, "*", concept), entry)
+                for template_id, override in entry.get("templates", {}).items():
+                    self._add((domain, template_id, concept), override)
+        self._questions: Optional[Dict[str, Tuple[str, str, str]]] = None
+        self.matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def _add(self, key: Tuple[str, str, str], entry: dict):
+        self.rubrics[key] = Rubric(key, entry["reference_answer"], list(entry.get("points", [])))
+
+    def _question_index(self) -> Dict[str, Tuple[str, str, str]]:
+        if self._questions is None:
+            from .question_generator import QuestionGenerator
+            index = {}
+            for question in QuestionGenerator().enumerate_questions():
+                index.setdefault(question["text"], (question["domain"], question["template_id"], question["concept"]))
+            self._questions = index
+        return self._questions
+
+    def _ensure_matrix(self):
+        if self.matrix is not None:
+            return
+        with self._lock:
+            if self.matrix is not None:
+                return
+            texts = []
+            for rubric in self.rubrics.values():
+                rubric.start = len(texts)
+                texts.append(rubric.reference_answer)
+                texts.extend(rubric.points)
+                rubric.stop = len(texts)
+            if texts:
+                encoder = self.encoder
+                if encoder is None:
+                    from .model_manager import ENCODER, get_model_manager
+                    encoder = get_model_manager().get(ENCODER)
+                matrix = encoder.encode(texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+                # Always copy: encoders backed by the model host return views into a reusable ring
+                self.matrix = np.array(matrix, dtype=np.float32)
+            else:
+                self.matrix = np.zeros((0, 0), dtype=np.float32)
+            # The matrix is all we need; don't pin the encoder in memory
+            self.encoder = None
+
+    def lookup(self, domain: str, template_id: str, concept: str) -> Optional[Rubric]:
+        """Template-specific rubric first, then the concept-level one"""
+        return self.rubrics.get((domain, template_id, concept)) or self.rubrics.get((domain, "*", concept))
+
+    def rubric_for(self, question: str) -> Optional[Rubric]:
+        """Find the rubric for a generated question text, if one exists"""
+        key = self._question_index().get(question)
+        if key is None:
+            return None
+        return self.lookup(*key)
+
+    def score(self, response_embedding: np.ndarray, rubric: Rubric) -> RubricScore:
+        """Compare a normalized response embedding against every point of a rubric at once"""
+        self._ensure_matrix()
+        similarities = self.matrix[rubric.start:rubric.stop] @ np.asarray(response_embedding, dtype=np.float32)
+        return RubricScore(rubric, similarities)
+
+
+_stores: Dict[int, RubricStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_rubric_store(encoder=None) -> RubricStore:
+    """Process-wide rubric store, rebuilt when content packs change"""
+    generation = get_content_snapshot().generation
+    store = _stores.get(generation)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(generation)
+            if store is None:
+                store = RubricStore(encoder)
+                _stores.clear()
+                _stores[generation] = store
+    return store
@@ -0,0 +1,302 @@
+"""
+Priority scheduling of answer evaluation and sentence encoding.
+
+Live candidates and background jobs (regrading, re-embedding) share one
+sentence encoder per host. Work is split into units (one answer evaluation,
+one encoder call) and each unit takes a slot from the scheduler of its stage
+before it runs:
+
+- `evaluate` slots ($INTERVIEW_EVALUATE_CONCURRENCY, default: CPU count) are
+  held for a whole evaluation by `evaluate_response_components`;
+- `encode` slots ($INTERVIEW_ENCODE_CONCURRENCY, default 1) are held for each
+  call of the encoder returned by the model manager, and in the model host
+  for each encode request it serves.
+
+A thread's work belongs to a priority class, "interactive" unless it runs
+inside `with priority(BATCH):` (the API's `"priority": "batch"`, regrading
+replays, embedding reports). Waiting units are granted by start-time fair
+queuing: a unit's tag is max(virtual time, its class's previous tag + cost /
+weight), and the lowest tag runs next. When both classes are backlogged,
+interactive work (weight 8) gets eight slots for every batch one (weight 1).
+Batch work is limited to $INTERVIEW_BATCH_CONCURRENCY slots per stage
+(default 1), but otherwise soaks up idle capacity. Batch encoder calls are
+split into chunks of `BATCH_CHUNK` texts, each a separate unit, so they are
+preempted at chunk boundaries: interactive work waits for at most the chunk
+in progress.
+
+`get_scheduler_stats()` reports queue depth, running units, grants, how often
+a class was overtaken by the other, and wait times per class. Set
+INTERVIEW_SCHEDULER=0 to run everything unscheduled.
+
+    with priority(BATCH):
+        for answer in answers:
+            evaluate_response_components(...)
+"""
+
+import contextlib
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+from .metrics import percentile
+from .profiling import stage
+
+SCHEDULER_ENV = "INTERVIEW_SCHEDULER"
+EVALUATE_CONCURRENCY_ENV = "INTERVIEW_EVALUATE_CONCURRENCY"
+ENCODE_CONCURRENCY_ENV = "INTERVIEW_ENCODE_CONCURRENCY"
+BATCH_CONCURRENCY_ENV = "INTERVIEW_BATCH_CONCURRENCY"
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# In tie-breaking order
+PRIORITY_CLASSES = (INTERACTIVE, BATCH)
+DEFAULT_WEIGHTS = {INTERACTIVE: 8.0, BATCH: 1.0}
+
+# Scheduled stages
+EVALUATE = "evaluate"
+ENCODE = "encode"
+STAGES = (EVALUATE, ENCODE)
+
+# Texts per encoder call for batch work; batch encodes yield to interactive work between chunks
+BATCH_CHUNK = 32
+# Recent waits kept per class for the wait-time percentiles
+WAIT_WINDOW = 1000
+
+_NULL = contextlib.nullcontext()
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def priority(name: str):
+    """Run the enclosed work of this thread in priority class `name`"""
+    if name not in PRIORITY_CLASSES:
+        raise ValueError(f"unknown priority class {name!r}; use one of {PRIORITY_CLASSES}")
+    previous = current_priority()
+    _local.priority = name
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def current_priority() -> str:
+    return getattr(_local, "priority", INTERACTIVE)
+
+
+def _held() -> set:
+    """Stages in which this thread already holds a slot"""
+    held = getattr(_local, "held", None)
+    if held is None:
+        held = _local.held = set()
+    return held
+
+
+class _Waiter:
+    __slots__ = ("tag", "enqueued", "granted")
+
+    def __init__(self, tag: float):
+        self.tag = tag
+        self.enqueued = time.monotonic()
+        self.granted = False
+
+
+class _ClassState:
+    __slots__ = ("name", "rank", "weight", "limit", "last_tag", "queue", "running", "granted", "overtaken",
+                 "waits")
+
+    def __init__(self, name: str, rank: int, weight: float, limit: int):
+        self.name = name
+        self.rank = rank
+        self.weight = weight
+        self.limit = limit
+        self.last_tag = 0.0
+        # Tags only grow within a class, so its waiters are FIFO
+        self.queue: deque = deque()
+        self.running = 0
+        self.granted = 0
+        self.overtaken = 0
+        self.waits: deque = deque(maxlen=WAIT_WINDOW)
+
+
+class WorkScheduler:
+    """Weighted fair slots of one stage, with a concurrency limit per priority class"""
+
+    def __init__(self, name: str, capacity: int, limits: Optional[Dict[str, int]] = None,
+                 weights: Optional[Dict[str, float]] = None):
+        self.name = name
+        self.capacity = max(1, capacity)
+        limits = limits or {}
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self._classes = {
+            cls: _ClassState(cls, rank, weights[cls], max(1, min(limits.get(cls) or self.capacity, self.capacity)))
+            for rank, cls in enumerate(PRIORITY_CLASSES)
+        }
+        self._cond = threading.Condition()
+        self._virtual = 0.0
+        self._running = 0
+
+    def slot(self, cost: float = 1.0, priority_class: Optional[str] = None):
+        """
+        Context manager holding a slot for the enclosed unit of work, `cost` being its
+        relative size. A thread that already holds a slot of this stage runs nested
+        units inside it.
+        """
+        if self.name in _held():
+            return _NULL
+        cls = priority_class or current_priority()
+        if cls not in self._classes:
+            raise ValueError(f"unknown priority class {cls!r}; use one of {PRIORITY_CLASSES}")
+        return self._slot(cost, self._classes[cls])
+
+    @contextlib.contextmanager
+    def _slot(self, cost: float, state: _ClassState):
+        with stage(f"wait:{self.name}"):
+            self._acquire(cost, state)
+        held = _held()
+        held.add(self.name)
+        try:
+            yield
+        finally:
+            held.discard(self.name)
+            self._release(state)
+
+    def _acquire(self, cost: float, state: _ClassState):
+        with self._cond:
+            tag = max(self._virtual, state.last_tag)
+            state.last_tag = tag + max(cost, 1e-9) / state.weight
+            waiter = _Waiter(tag)
+            state.queue.append(waiter)
+            self._dispatch()
+            try:
+                while not waiter.granted:
+                    self._cond.wait()
+            except BaseException:
+                # Interrupted (KeyboardInterrupt, an async exception): give up the place or the slot
+                if waiter.granted:
+                    state.running -= 1
+                    self._running -= 1
+                    self._dispatch()
+                else:
+                    state.queue.remove(waiter)
+                raise
+            state.waits.append(time.monotonic() - waiter.enqueued)
+
+    def _release(self, state: _ClassState):
+        with self._cond:
+            state.running -= 1
+            self._running -= 1
+            self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to the lowest-tagged waiters of classes under their limit"""
+        granted = False
+        while self._running < self.capacity:
+            best = None
+            for state in self._classes.values():
+                if state.queue and state.running < state.limit and \
+                        (best is None or (state.queue[0].tag, state.rank) < (best.queue[0].tag, best.rank)):
+                    best = state
+            if best is None:
+                break
+            waiter = best.queue.popleft()
+            for other in self._classes.values():
+                if other is not best and other.queue and other.queue[0].enqueued < waiter.enqueued:
+                    other.overtaken += 1
+            waiter.granted = True
+            best.running += 1
+            best.granted += 1
+            self._running += 1
+            self._virtual = max(self._virtual, waiter.tag)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._cond:
+            classes = {}
+            for state in self._classes.values():
+                waits = sorted(state.waits)
+                classes[state.name] = {
+                    "weight": state.weight, "limit": state.limit, "queued": len(state.queue),
+                    "running": state.running, "granted": state.granted, "overtaken": state.overtaken,
+                    "wait_ms": {"mean": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+                                "p50": round(1000 * percentile(waits, 50), 2),
+                                "p95": round(1000 * percentile(waits, 95), 2),
+                                "max": round(1000 * waits[-1], 2) if waits else 0.0}
+                }
+            return {"capacity": self.capacity, "running": self._running, "classes": classes}
+
+
+class ScheduledEncoder:
+    """
+    Sentence encoder whose `encode` calls take `encode` slots. Batch-priority
+    calls with more than BATCH_CHUNK texts are encoded chunk by chunk.
+    Other attributes are those of the wrapped encoder.
+    """
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+
+    def __getattr__(self, name):
+        return getattr(self.encoder, name)
+
+    def encode(self, sentences, *args, **kwargs):
+        if isinstance(sentences, str):
+            with slot(ENCODE):
+                return self.encoder.encode(sentences, *args, **kwargs)
+        sentences = list(sentences)
+        if current_priority() != BATCH or len(sentences) <= BATCH_CHUNK:
+            with slot(ENCODE, max(1, len(sentences))):
+                return self.encoder.encode(sentences, *args, **kwargs)
+        parts = []
+        for start in range(0, len(sentences), BATCH_CHUNK):
+            chunk = sentences[start:start + BATCH_CHUNK]
+            with slot(ENCODE, len(chunk)):
+                parts.append(self.encoder.encode(chunk, *args, **kwargs))
+        if kwargs.get("convert_to_tensor"):
+            import torch
+            return torch.cat(parts)
+        if isinstance(parts[0], list):
+            return [embedding for part in parts for embedding in part]
+        # Also copies results out of the model host's reusable ring
+        return np.concatenate([np.asarray(part) for part in parts])
+
+
+_schedulers: Dict[str, WorkScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(name: str) -> Optional[WorkScheduler]:
+    """Process-wide scheduler of a stage; None when disabled with INTERVIEW_SCHEDULER=0"""
+    if os.environ.get(SCHEDULER_ENV) == "0":
+        return None
+    scheduler = _schedulers.get(name)
+    if scheduler is None:
+        if name not in STAGES:
+            raise ValueError(f"unknown stage {name!r}; use one of {STAGES}")
+        with _schedulers_lock:
+            scheduler = _schedulers.get(name)
+            if scheduler is None:
+                if name == EVALUATE:
+                    capacity = int(os.environ.get(EVALUATE_CONCURRENCY_ENV, 0)) or os.cpu_count() or 4
+                else:
+                    capacity = int(os.environ.get(ENCODE_CONCURRENCY_ENV, 1))
+                limits = {BATCH: int(os.environ.get(BATCH_CONCURRENCY_ENV, 1))}
+                scheduler = _schedulers[name] = WorkScheduler(name, capacity, limits)
+    return scheduler
+
+
+def slot(name: str, cost: float = 1.0):
+    """A slot of the stage's scheduler for the enclosed unit of work (no-op when scheduling is disabled)"""
+    scheduler = get_scheduler(name)
+    return _NULL if scheduler is None else scheduler.slot(cost)
+
+
+def get_scheduler_stats() -> Optional[Dict[str, object]]:
+    if os.environ.get(SCHEDULER_ENV) == "0":
+        return None
+    return {name: get_scheduler(name).get_stats() for name in STAGES}
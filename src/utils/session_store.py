@@ -0,0 +1,261 @@
+"""
+Compact, bounded per-session interview state.
+
+Messages are slotted records. Text produced from templates (questions,
+reference blocks, chat knowledge answers, fixed prompts) is stored once per
+process in a shared table and referenced by id. Scores live in a typed array
+and question history is a set of ids. When a session exceeds its message cap,
+the oldest messages are spilled to a per-session file on disk and read back
+only when the user pages through old history.
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import uuid
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional
+
+MAX_MESSAGES_ENV = "INTERVIEW_MAX_MESSAGES"
+SPILL_DIR_ENV = "INTERVIEW_SPILL_DIR"
+DEFAULT_MAX_MESSAGES = 200
+
+
+class SharedTextTable:
+    """Process-wide interning table for template-derived text"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._texts: List[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, text: str) -> int:
+        text_id = self._ids.get(text)
+        if text_id is None:
+            with self._lock:
+                text_id = self._ids.get(text)
+                if text_id is None:
+                    text_id = len(self._texts)
+                    self._texts.append(text)
+                    self._ids[text] = text_id
+        return text_id
+
+    def get(self, text_id: int) -> str:
+        return self._texts[text_id]
+
+    def lookup(self, text: str) -> Optional[int]:
+        return self._ids.get(text)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def size_bytes(self) -> int:
+        return sum(sys.getsizeof(t) for t in self._texts)
+
+
+SHARED_TEXT = SharedTextTable()
+
+
+class MessageRecord:
+    """One transcript entry: unique text plus an optional reference to shared text"""
+
+    __slots__ = ("role", "text", "shared_id", "score", "rendered")
+
+    def __init__(self, role: str, text: str = "", shared_id: int = -1, score: Optional[float] = None):
+        self.role = sys.intern(role)
+        self.text = text
+        self.shared_id = shared_id
+        self.score = score
+        # Cached markdown, filled in by the UI on first render
+        self.rendered = None
+
+    @property
+    def shared_text(self) -> Optional[str]:
+        return SHARED_TEXT.get(self.shared_id) if self.shared_id >= 0 else None
+
+    @property
+    def content(self) -> str:
+        if self.shared_id < 0:
+            return self.text
+        return self.text + SHARED_TEXT.get(self.shared_id)
+
+    def get(self, key: str, default=None):
+        """Dict-style access for code written against the old message dicts"""
+        if key == "content":
+            return self.content
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def size_bytes(self) -> int:
+        size = sys.getsizeof(self) + sys.getsizeof(self.text)
+        if self.rendered is not None:
+            size += sys.getsizeof(self.rendered)
+        return size
+
+    def to_json(self) -> str:
+        # Shared text is stored inline so spill files stay readable on their own
+        return json.dumps({"role": self.role, "text": self.text,
+                           "shared": SHARED_TEXT.get(self.shared_id) if self.shared_id >= 0 else None,
+                           "score": self.score})
+
+    @classmethod
+    def from_json(cls, line: str) -> "MessageRecord":
+        data = json.loads(line)
+        shared_id = SHARED_TEXT.intern(data["shared"]) if data.get("shared") is not None else -1
+        return cls(data["role"], data["text"], shared_id, data.get("score"))
+
+
+class QuestionHistory:
+    """Questions asked so far, as ids into the shared text table"""
+
+    __slots__ = ("ids", "_seen")
+
+    def __init__(self):
+        self.ids = array("i")
+        self._seen = set()
+
+    def append(self, question: str):
+        text_id = SHARED_TEXT.intern(question)
+        self.ids.append(text_id)
+        self._seen.add(text_id)
+
+    def __contains__(self, question: str) -> bool:
+        text_id = SHARED_TEXT.lookup(question)
+        return text_id is not None and text_id in self._seen
+
+    def __iter__(self) -> Iterator[str]:
+        return (SHARED_TEXT.get(text_id) for text_id in self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def size_bytes(self) -> int:
+        return sys.getsizeof(self.ids) + sys.getsizeof(self._seen)
+
+
+class SessionStore:
+    """Messages, scores and question history for one interview session"""
+
+    def __init__(self, max_messages: Optional[int] = None, spill_dir: Optional[str] = None,
+                 session_id: Optional[str] = None, seed: Optional[str] = None):
+        self.session_id = session_id or uuid.uuid4().hex
+        # Root of the session's random streams; recorded so a session can be replayed exactly
+        self.seed = seed if seed is not None else self.session_id
+        self.max_messages = max_messages or int(os.environ.get(MAX_MESSAGES_ENV, DEFAULT_MAX_MESSAGES))
+        self.spill_dir = spill_dir or os.environ.get(SPILL_DIR_ENV) or os.path.join(tempfile.gettempdir(), "interview_sessions")
+        self.scores = array("f")
+        self.questions = QuestionHistory()
+        self._messages: List[MessageRecord] = []
+        # Byte offset of every spilled message, so old pages can be read without scanning
+        self._spill_offsets = array("q")
+        self._spill_path: Optional[str] = None
+        # Called with (seq, record) for every new message, e.g. to persist it
+        self.on_message: Optional[Callable[[int, MessageRecord], None]] = None
+
+    # Messages
+
+    def add_message(self, role: str, content: str = "", score: Optional[float] = None,
+                    shared_text: Optional[str] = None) -> MessageRecord:
+        """
+        Append a message. `shared_text` is template-derived text stored once per process
+        and appended to `content` when the message is displayed.
+        """
+        shared_id = SHARED_TEXT.intern(shared_text) if shared_text else -1
+        record = MessageRecord(role, content, shared_id, score)
+        seq = len(self)
+        self._messages.append(record)
+        if self.on_message is not None:
+            self.on_message(seq, record)
+        if len(self._messages) > self.max_messages:
+            self._spill(len(self._messages) - self.max_messages // 2)
+        return record
+
+    def _spill(self, count: int):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        if self._spill_path is None:
+            self._spill_path = os.path.join(self.spill_dir, f"{self.session_id}.jsonl")
+        with open(self._spill_path, "ab") as f:
+            for record in self._messages[:count]:
+                self._spill_offsets.append(f.tell())
+                f.write(record.to_json().encode("utf-8") + b"\n")
+        del self._messages[:count]
+
+    @property
+    def spilled_count(self) -> int:
+        return len(self._spill_offsets)
+
+    def __len__(self):
+        return self.spilled_count + len(self._messages)
+
+    def __iter__(self) -> Iterator[MessageRecord]:
+        return iter(self[0:len(self)])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("SessionStore slices must be contiguous")
+            return self._read_spilled(start, min(stop, self.spilled_count)) + \
+                self._messages[max(0, start - self.spilled_count):max(0, stop - self.spilled_count)]
+        if index < 0:
+            index += len(self)
+        if index >= self.spilled_count:
+            return self._messages[index - self.spilled_count]
+        return self._read_spilled(index, index + 1)[0]
+
+    def _read_spilled(self, start: int, stop: int) -> List[MessageRecord]:
+        if start >= stop:
+            return []
+        records = []
+        with open(self._spill_path, "rb") as f:
+            f.seek(self._spill_offsets[start])
+            for _ in range(stop - start):
+                records.append(MessageRecord.from_json(f.readline().decode("utf-8")))
+        return records
+
+    # Randomness
+
+    def rng(self, stream: str) -> random.Random:
+        """
+        Reproducible random stream for one step of the session, e.g. "question/2"
+        or "feedback/2". Streams are independent, so skipping or adding a step
+        never shifts the randomness of the others.
+        """
+        return random.Random(f"{self.seed}/{stream}")
+
+    # Scores
+
+    def add_score(self, score: float):
+        self.scores.append(score)
+
+    # Lifecycle
+
+    def clear(self):
+        """Drop all state, including the spill file"""
+        self.close()
+        self.scores = array("f")
+        self.questions = QuestionHistory()
+        self._messages = []
+        self._spill_offsets = array("q")
+
+    def close(self):
+        if self._spill_path and os.path.exists(self._spill_path):
+            os.remove(self._spill_path)
+        self._spill_path = None
+
+    def memory_report(self) -> Dict[str, int]:
+        """Approximate memory held by this session (shared text is reported separately)"""
+        message_bytes = sys.getsizeof(self._messages) + sum(r.size_bytes() for r in self._messages)
+        return {
+            "messages_in_memory": len(self._messages),
+            "messages_spilled": self.spilled_count,
+            "message_bytes": message_bytes,
+            "score_bytes": sys.getsizeof(self.scores),
+            "question_bytes": self.questions.size_bytes(),
+            "spill_index_bytes": sys.getsizeof(self._spill_offsets),
+            "spill_file_bytes": os.path.getsize(self._spill_path) if self._spill_path and os.path.exists(self._spill_path) else 0,
+            "shared_text_entries": len(SHARED_TEXT),
+            "shared_text_bytes": SHARED_TEXT.size_bytes()
+        }
@@ -1,21 +1,30 @@
-import spacy
-import nltk
 from nltk.tokenize import word_tokenize
 from nltk.stem import WordNetLemmatizer
 from nltk.corpus import stopwords
 import re
+from typing import FrozenSet, Optional
+# The spaCy pipeline is fetched per call from the model manager, which loads it
+# on first use and may evict it when idle (see model_manager)
+from .nlp_resources import get_nlp_resources, load_spacy_model
 
-# Load spaCy model
-nlp = spacy.load('en_core_web_sm')
+_stop_words: Optional[FrozenSet[str]] = None
+
+def get_stop_words() -> FrozenSet[str]:
+    """
+    English stopwords, read once per process on first use. The NLP resources are
+    resolved first, so the corpus is found in a bundle and a missing one raises
+    NLPResourceError rather than NLTK's LookupError
+    """
+    global _stop_words
+    if _stop_words is None:
+        get_nlp_resources()
+        _stop_words = frozenset(stopwords.words('english'))
+    return _stop_words
 
 class TextProcessor:
     def __init__(self):
         self.lemmatizer = WordNetLemmatizer()
-        try:
-            self.stop_words = set(stopwords.words('english'))
-        except:
-            nltk.download('stopwords')
-            self.stop_words = set(stopwords.words('english'))
+        self.stop_words = get_stop_words()
 
     def preprocess_text(self, text):
         """
@@ -39,7 +48,7 @@ class TextProcessor:
         """
         Extract named entities using spaCy
         """
-        doc = nlp(text)
+        doc = load_spacy_model()(text)
         entities = [(ent.text, ent.label_) for ent in doc.ents]
         return entities
 
@@ -47,7 +56,7 @@ class TextProcessor:
         """
         Get Part of Speech tags
         """
-        doc = nlp(text)
+        doc = load_spacy_model()(text)
         pos_tags = [(token.text, token.pos_) for token in doc]
         return pos_tags
 
@@ -55,7 +64,7 @@ class TextProcessor:
         """
         Extract key phrases using noun chunks
         """
-        doc = nlp(text)
+        doc = load_spacy_model()(text)
         key_phrases = [chunk.text for chunk in doc.noun_chunks]
         return key_phrases
 
@@ -63,7 +72,7 @@ class TextProcessor:
         """
         Analyze syntactic dependencies
         """
-        doc = nlp(text)
+        doc = load_spacy_model()(text)
         dependencies = [(token.text, token.dep_, token.head.text) for token in doc]
         return dependencies
 